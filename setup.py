@@ -16,8 +16,12 @@ setup(
     package_data={'simple_drive': ['drive/*']},
     install_requires=[
         'colorama',
+        # Auth and the OAuth flow of the CLI use pydrive2.auth.GoogleAuth
         'pydrive2',
         'google-api-python-client',
         'oauth2client',
-    ]
+    ],
+    entry_points={
+        'console_scripts': ['simple-drive=simple_drive.cli:main'],
+    }
 )
\ No newline at end of file
@@ -1,5 +1,38 @@
-from .drive import Drive
-from .auth import Auth
-from .constants import MimeTypes, Roles, SearchTerms
+import importlib
+
 from colorama import just_fix_windows_console
-just_fix_windows_console()
\ No newline at end of file
+just_fix_windows_console()
+
+# Imported on first use, so the command-line tool starts without loading the Google API client
+_EXPORTS = {
+    'Drive': '.drive',
+    'DrivePool': '.drive.pool',
+    'BulkJob': '.drive.jobs',
+    'FileRecord': '.drive.records',
+    'FileTable': '.drive.records',
+    'WebhookReceiver': '.drive.channels',
+    'AdaptiveLimiter': '.limiter',
+    'Cassette': '.cassette',
+    'LocalBackend': '.backends',
+    'MemoryBackend': '.backends',
+    'S3Backend': '.backends',
+    'Auth': '.auth',
+    'MimeTypes': '.constants',
+    'Query': '.constants',
+    'Roles': '.constants',
+    'SearchTerms': '.constants',
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(_EXPORTS[name], __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
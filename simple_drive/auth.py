@@ -9,25 +9,43 @@ class Auth:
         self.auth_info = GoogleAuth()
 
     @classmethod
-    def from_service_account_info(cls, info):
+    def from_service_account_info(cls, info, subject=None):
         '''
         Create auth info from a Google service account as dict
         :param info: Google service account as dict
+        :param subject: User email to impersonate with domain-wide delegation (optional)
         :return: auth_info
         '''
         instance = cls()
         instance.auth_info.credentials = ServiceAccountCredentials.from_json_keyfile_dict(keyfile_dict=info, scopes=cls.SCOPES)
+        if subject:
+            instance.auth_info.credentials = instance.auth_info.credentials.create_delegated(subject)
         return instance.auth_info
 
     @classmethod
-    def from_service_account_file(cls, file='service_account.json'):
+    def from_service_account_file(cls, file='service_account.json', subject=None):
         '''
         Create auth info from a Google service account JSON file
         :param file: Google service account JSON file
+        :param subject: User email to impersonate with domain-wide delegation (optional)
         :return: auth_info
         '''
         instance = cls()
         instance.auth_info.credentials = ServiceAccountCredentials.from_json_keyfile_name(filename=file, scopes=cls.SCOPES)
+        if subject:
+            instance.auth_info.credentials = instance.auth_info.credentials.create_delegated(subject)
+        return instance.auth_info
+
+    @classmethod
+    def delegate(cls, auth_info, subject):
+        '''
+        Create auth info that impersonates a user with domain-wide delegation
+        :param auth_info: Auth info created from a Google service account
+        :param subject: User email to impersonate
+        :return: auth_info
+        '''
+        instance = cls()
+        instance.auth_info.credentials = auth_info.credentials.create_delegated(subject)
         return instance.auth_info
 
     @classmethod
@@ -0,0 +1,228 @@
+import asyncio
+import io
+import os
+import threading
+
+
+class Backend:
+    '''
+    A storage target for transfers. Drive content is piped to open_write() and uploads read from open_read(), chunk by chunk.
+    '''
+
+    def open_read(self, name):
+        '''
+        Open an object for reading.
+        :param name: Object name, e.g. 'reports/2024.xlsx'.
+        :return: A file-like object with read(size).
+        '''
+        raise NotImplementedError
+
+    def open_write(self, name):
+        '''
+        Open an object for writing, the object is complete when the returned file is closed.
+        :param name: Object name, e.g. 'reports/2024.xlsx'.
+        :return: A file-like object with write(data), use it as a context manager.
+        '''
+        raise NotImplementedError
+
+
+def is_backend(obj):
+    return isinstance(obj, Backend)
+
+
+class LocalBackend(Backend):
+    def __init__(self, root='.'):
+        '''
+        Local file system.
+        :param root: Root directory, object names are relative paths in it.
+        '''
+        self.root = root
+
+    def path(self, name):
+        return os.path.join(self.root, *name.split('/'))
+
+    def open_read(self, name):
+        return open(self.path(name), 'rb')
+
+    def open_write(self, name):
+        path = self.path(name)
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        return open(path, 'wb')
+
+
+class _MemoryWriter(io.BytesIO):
+    def __init__(self, backend, name):
+        super().__init__()
+        self.backend = backend
+        self.name = name
+
+    def close(self):
+        if not self.closed:
+            with self.backend._lock:
+                self.backend.objects[self.name] = self.getvalue()
+        super().close()
+
+
+class MemoryBackend(Backend):
+    def __init__(self):
+        '''
+        In-memory objects, mostly for tests and small files.
+        '''
+        self.objects = {}
+        self._lock = threading.Lock()
+
+    def get(self, name):
+        '''
+        Get the content of an object.
+        :param name: Object name.
+        :return: Bytes.
+        '''
+        return self.objects[name]
+
+    def open_read(self, name):
+        return io.BytesIO(self.objects[name])
+
+    def open_write(self, name):
+        return _MemoryWriter(self, name)
+
+
+class _S3Writer(io.RawIOBase):
+    def __init__(self, backend, key):
+        self.backend = backend
+        self.key = key
+        self.buffer = bytearray()
+        self.upload_id = None
+        self.parts = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.buffer.extend(data)
+        while len(self.buffer) >= self.backend.part_size:
+            self._upload_part(bytes(self.buffer[:self.backend.part_size]))
+            del self.buffer[:self.backend.part_size]
+        return len(data)
+
+    def _upload_part(self, data):
+        client = self.backend.client
+        if self.upload_id is None:
+            self.upload_id = client.create_multipart_upload(Bucket=self.backend.bucket, Key=self.key)['UploadId']
+        number = len(self.parts) + 1
+        response = client.upload_part(Bucket=self.backend.bucket, Key=self.key, UploadId=self.upload_id, PartNumber=number, Body=data)
+        self.parts.append({'PartNumber': number, 'ETag': response['ETag']})
+
+    def close(self):
+        if self.closed:
+            return
+        client = self.backend.client
+        if self.upload_id is None:
+            # Small object, a single request
+            client.put_object(Bucket=self.backend.bucket, Key=self.key, Body=bytes(self.buffer))
+        else:
+            if self.buffer:
+                self._upload_part(bytes(self.buffer))
+            client.complete_multipart_upload(Bucket=self.backend.bucket, Key=self.key, UploadId=self.upload_id,
+                                             MultipartUpload={'Parts': self.parts})
+        self.buffer = bytearray()
+        super().close()
+
+    def abort(self):
+        if self.upload_id is not None:
+            self.backend.client.abort_multipart_upload(Bucket=self.backend.bucket, Key=self.key, UploadId=self.upload_id)
+        self.buffer = bytearray()
+        super().close()
+
+    def __exit__(self, exc_type, exc, traceback):
+        if exc_type is not None:
+            self.abort()
+        else:
+            self.close()
+
+
+class S3Backend(Backend):
+    def __init__(self, bucket, prefix='', client=None, endpoint_url=None, part_size=8 * 1024 * 1024, **client_kwargs):
+        '''
+        Amazon S3 or any S3-compatible storage (MinIO, Cloudflare R2, ...). Writes use multipart uploads, so memory stays at one part.
+        Requires boto3 unless client is given.
+        :param bucket: Bucket name.
+        :param prefix: Key prefix, e.g. 'drive-backup/' (optional).
+        :param client: A boto3 S3 client (optional). None to create one.
+        :param endpoint_url: Endpoint of an S3-compatible storage, e.g. http://localhost:9000 (optional).
+        :param part_size: Multipart upload part size in bytes, at least 5 MB.
+        :param client_kwargs: Other boto3 client arguments, e.g. aws_access_key_id, aws_secret_access_key, region_name.
+        '''
+        if part_size < 5 * 1024 * 1024:
+            raise ValueError("part_size must be at least 5 MB.")
+
+        if client is None:
+            try:
+                import boto3
+            except ImportError:
+                raise ImportError("S3Backend requires boto3, please install it: pip install boto3")
+            client = boto3.client('s3', endpoint_url=endpoint_url, **client_kwargs)
+
+        self.client = client
+        self.bucket = bucket
+        self.prefix = prefix
+        self.part_size = part_size
+
+    def key(self, name):
+        return f"{self.prefix}{name}"
+
+    def open_read(self, name):
+        return self.client.get_object(Bucket=self.bucket, Key=self.key(name))['Body']
+
+    def open_write(self, name):
+        return _S3Writer(self, self.key(name))
+
+
+class AsyncStreamWriter(io.RawIOBase):
+    def __init__(self, stream, loop):
+        '''
+        Use an asyncio stream (e.g. asyncio.StreamWriter) as a transfer target from a worker thread, waiting for drain() after each chunk.
+        Do not call the transfer in the event loop thread, use loop.run_in_executor().
+        :param stream: An object with write(data) and optionally async drain().
+        :param loop: The event loop of the stream.
+        '''
+        self.stream = stream
+        self.loop = loop
+
+    def writable(self):
+        return True
+
+    async def _write(self, data):
+        result = self.stream.write(data)
+        if asyncio.iscoroutine(result):
+            await result
+        if hasattr(self.stream, 'drain'):
+            await self.stream.drain()
+
+    def write(self, data):
+        asyncio.run_coroutine_threadsafe(self._write(bytes(data)), self.loop).result()
+        return len(data)
+
+
+class AsyncStreamReader(io.RawIOBase):
+    def __init__(self, stream, loop, name=None):
+        '''
+        Use an asyncio stream (e.g. asyncio.StreamReader) as an upload source from a worker thread.
+        Do not call the transfer in the event loop thread, use loop.run_in_executor().
+        :param stream: An object with async read(size).
+        :param loop: The event loop of the stream.
+        :param name: File name used by upload when rename is not given (optional).
+        '''
+        self.stream = stream
+        self.loop = loop
+        self.name = name
+
+    def readable(self):
+        return True
+
+    def read(self, size=-1):
+        return asyncio.run_coroutine_threadsafe(self.stream.read(size), self.loop).result()
+
+    def readinto(self, buffer):
+        data = self.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
@@ -0,0 +1,234 @@
+import base64
+import hashlib
+import io
+import json
+import os
+import re
+import threading
+import time
+
+import httplib2
+from googleapiclient.errors import HttpError
+
+# googleapiclient multipart bodies use a random boundary
+MULTIPART_BOUNDARY = re.compile(rb'={15}\d+==')
+
+
+def _range(headers):
+    headers = headers or {}
+    return headers.get('Range') or headers.get('range')
+
+
+class Cassette:
+    MODES = ('record', 'replay', 'auto')
+
+    def __init__(self, path, mode='auto', time_scale=1.0):
+        '''
+        Record Drive HTTP exchanges to a file and replay them offline, e.g. to run and time scenarios in CI without network or credentials.
+        :param path: Cassette JSON file.
+        :param mode: record: call the Drive and save every exchange. replay: answer from the file, never call the Drive. auto: replay if the file exists, otherwise record.
+        :param time_scale: Replay latency as a multiple of the recorded one, e.g. 1 for the original timings, 0.5 for twice as fast, 0 for no waiting.
+        '''
+        if mode not in self.MODES:
+            raise ValueError(f"mode must be one of: {'; '.join(self.MODES)}")
+        if mode == 'auto':
+            mode = 'replay' if os.path.exists(path) else 'record'
+
+        self.path = path
+        self.mode = mode
+        self.time_scale = time_scale
+        self.interactions = []
+        self._lock = threading.Lock()
+        self._unused = {}
+
+        if mode == 'replay':
+            with open(path) as f:
+                self.interactions = json.load(f)['interactions']
+            for interaction in self.interactions:
+                self._unused.setdefault(self._key(interaction), []).append(interaction)
+
+    @property
+    def replaying(self):
+        return self.mode == 'replay'
+
+    @staticmethod
+    def _body_hash(body):
+        if body is None:
+            return None
+        if isinstance(body, str):
+            body = body.encode('utf-8')
+        return hashlib.sha1(MULTIPART_BOUNDARY.sub(b'BOUNDARY', body)).hexdigest()
+
+    @staticmethod
+    def _key(interaction):
+        return interaction['method'], interaction['uri'], interaction.get('range')
+
+    @staticmethod
+    def _encode(content):
+        try:
+            return {'text': content.decode('utf-8')}
+        except UnicodeDecodeError:
+            return {'base64': base64.b64encode(content).decode('ascii')}
+
+    @staticmethod
+    def _decode(interaction):
+        if 'text' in interaction:
+            return interaction['text'].encode('utf-8')
+        return base64.b64decode(interaction['base64'])
+
+    def _add(self, interaction):
+        with self._lock:
+            self.interactions.append(interaction)
+
+    def _find(self, method, uri, headers, body):
+        request = {'method': method, 'uri': uri, 'range': _range(headers)}
+        body_sha1 = self._body_hash(body)
+        with self._lock:
+            candidates = self._unused.get(self._key(request))
+            if candidates:
+                # Same body first, then the same request in recorded order (bodies with random IDs)
+                interaction = next((i for i in candidates if i.get('body_sha1') == body_sha1), candidates[0])
+                candidates.remove(interaction)
+                return interaction
+        raise ValueError(f"No recorded response in {self.path} for {method} {uri}")
+
+    def _wait(self, seconds):
+        if self.time_scale and seconds:
+            time.sleep(seconds * self.time_scale)
+
+    # httplib2 side, used by Drive.service and uploads
+    def wrap(self, http):
+        '''
+        Get an http object for the current mode.
+        :param http: The real authorized httplib2.Http, None when replaying.
+        :return: An object with request().
+        '''
+        return _ReplayHttp(self) if self.replaying else _RecordingHttp(self, http)
+
+    # Streaming side, used by open_stream
+    def open_stream(self, url, headers, open_real):
+        '''
+        Open a streaming GET response for the current mode.
+        :param url: URL.
+        :param headers: Request headers without Authorization.
+        :param open_real: A function that opens the real response, used when recording.
+        :return: A response with read(size).
+        '''
+        if self.replaying:
+            interaction = self._find('GET', url, headers, None)
+            self._wait(interaction['duration'])
+            if interaction['status'] >= 400:
+                raise HttpError(httplib2.Response({**interaction['headers'], 'status': interaction['status']}), self._decode(interaction), uri=url)
+            return _ReplayStream(self, interaction)
+
+        interaction = {'method': 'GET', 'uri': url, 'range': _range(headers), 'body_sha1': None, 'stream': True}
+        started = time.monotonic()
+        try:
+            response = open_real()
+        except HttpError as error:
+            self._add({**interaction, 'status': error.resp.status, 'headers': dict(error.resp), 'duration': time.monotonic() - started,
+                       'body_duration': 0, **self._encode(error.content or b'')})
+            raise
+        interaction.update({'status': response.status, 'headers': dict(response.headers), 'duration': time.monotonic() - started})
+        return _RecordingStream(self, interaction, response)
+
+    def save(self):
+        '''
+        Write the recorded exchanges to the cassette file.
+        '''
+        if self.replaying:
+            return
+        with self._lock:
+            with open(self.path, 'w') as f:
+                json.dump({'interactions': self.interactions}, f, indent=1)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.save()
+
+
+class _RecordingHttp:
+    def __init__(self, cassette, http):
+        self.cassette = cassette
+        self.http = http
+
+    def request(self, uri, method='GET', body=None, headers=None, *args, **kwargs):
+        started = time.monotonic()
+        response, content = self.http.request(uri, method, body, headers, *args, **kwargs)
+        self.cassette._add({'method': method, 'uri': uri, 'range': _range(headers),
+                            'body_sha1': self.cassette._body_hash(body), 'status': response.status,
+                            'headers': {k: v for k, v in response.items() if k != 'status'},
+                            'duration': time.monotonic() - started, **self.cassette._encode(content or b'')})
+        return response, content
+
+    def __getattr__(self, name):
+        return getattr(self.http, name)
+
+
+class _ReplayHttp:
+    def __init__(self, cassette):
+        self.cassette = cassette
+        self.redirect_codes = set()
+        self.timeout = None
+
+    def request(self, uri, method='GET', body=None, headers=None, *args, **kwargs):
+        interaction = self.cassette._find(method, uri, headers, body)
+        self.cassette._wait(interaction['duration'])
+        return httplib2.Response({**interaction['headers'], 'status': interaction['status']}), self.cassette._decode(interaction)
+
+
+class _RecordingStream(io.RawIOBase):
+    def __init__(self, cassette, interaction, response):
+        self.cassette = cassette
+        self.interaction = interaction
+        self.response = response
+        self.status = response.status
+        self.headers = response.headers
+        self.buffer = io.BytesIO()
+        self.started = time.monotonic()
+
+    def readable(self):
+        return True
+
+    def read(self, size=-1):
+        data = self.response.read(size) if size is not None and size >= 0 else self.response.read()
+        self.buffer.write(data)
+        return data
+
+    def readinto(self, buffer):
+        data = self.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+
+    def close(self):
+        if not self.closed:
+            # Keep the part of the body that was read, like the caller saw it
+            self.cassette._add({**self.interaction, 'body_duration': time.monotonic() - self.started, **self.cassette._encode(self.buffer.getvalue())})
+            self.response.close()
+        super().close()
+
+
+class _ReplayStream(io.RawIOBase):
+    def __init__(self, cassette, interaction):
+        self.cassette = cassette
+        self.status = interaction['status']
+        self.headers = interaction['headers']
+        self.content = io.BytesIO(cassette._decode(interaction))
+        self.size = len(self.content.getbuffer())
+        self.body_duration = interaction.get('body_duration', 0)
+
+    def readable(self):
+        return True
+
+    def read(self, size=-1):
+        data = self.content.read(size)
+        if self.size:
+            self.cassette._wait(self.body_duration * len(data) / self.size)
+        return data
+
+    def readinto(self, buffer):
+        data = self.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
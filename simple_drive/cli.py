@@ -0,0 +1,429 @@
+import argparse
+import contextlib
+import hashlib
+import json
+import os
+import sys
+from datetime import datetime
+
+from .constants import MimeTypes
+
+FILE_FIELDS = 'id, name, mimeType, size, modifiedTime, parents, md5Checksum'
+
+# stdout of the JSON lines while a command runs, the messages printed by the library go to stderr
+output = None
+
+
+def emit(record, stream=None):
+    '''
+    Write one JSON line right away.
+    :param record: A JSON-serializable dict.
+    :param stream: Defaults to stdout, errors go to stderr.
+    '''
+    stream = stream or output or sys.stdout
+    stream.write(json.dumps(record, ensure_ascii=False, default=str) + '\n')
+    stream.flush()
+
+
+def config_directory():
+    return os.environ.get('SIMPLE_DRIVE_CONFIG_DIR') or os.path.join(os.path.expanduser('~'), '.config', 'simple-drive')
+
+
+# Auth, with credentials cached between runs
+def get_auth(args):
+    if args.service_account:
+        from .auth import Auth
+        auth = Auth.from_service_account_file(file=args.service_account, subject=args.subject)
+        load_token(auth.credentials, token_key(args))
+        return auth
+
+    if args.client_secrets:
+        from pydrive2.auth import GoogleAuth
+        auth = GoogleAuth()
+        auth.DEFAULT_SETTINGS['client_config_file'] = args.client_secrets
+        path = os.path.join(config_directory(), 'user_credentials.json')
+        if os.path.exists(path):
+            auth.LoadCredentialsFile(path)
+        if auth.credentials is None:
+            auth.LocalWebserverAuth()
+        elif auth.access_token_expired:
+            auth.Refresh()
+        os.makedirs(config_directory(), exist_ok=True)
+        # The same JSON as auth.SaveCredentialsFile, written to a private file
+        with open_private(path) as f:
+            f.write(auth.credentials.to_json())
+        return auth
+
+    raise SystemExit("Please provide --service-account or --client-secrets (or SIMPLE_DRIVE_SERVICE_ACCOUNT / SIMPLE_DRIVE_CLIENT_SECRETS).")
+
+
+def token_key(args):
+    return hashlib.sha1(f"{os.path.abspath(args.service_account)}|{args.subject or ''}".encode()).hexdigest()
+
+
+def load_token(credentials, key):
+    # Reuse the access token of the previous run instead of signing a new one
+    path = os.path.join(config_directory(), 'tokens.json')
+    if not os.path.exists(path):
+        return
+    with open(path) as f:
+        token = json.load(f).get(key)
+    if token:
+        credentials.access_token = token['access_token']
+        credentials.token_expiry = datetime.fromisoformat(token['token_expiry'])
+
+
+def save_token(credentials, key):
+    if not getattr(credentials, 'access_token', None) or not getattr(credentials, 'token_expiry', None):
+        return
+    path = os.path.join(config_directory(), 'tokens.json')
+    tokens = {}
+    if os.path.exists(path):
+        with open(path) as f:
+            tokens = json.load(f)
+    tokens[key] = {'access_token': credentials.access_token, 'token_expiry': credentials.token_expiry.isoformat()}
+    os.makedirs(config_directory(), exist_ok=True)
+    with open_private(path) as f:
+        json.dump(tokens, f)
+
+
+def open_private(path):
+    # Created readable by the owner only, a chmod after writing would leave the tokens readable in between
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    # Files written by earlier versions keep their mode on open
+    os.fchmod(fd, 0o600)
+    return os.fdopen(fd, 'w')
+
+
+# Helpers
+def run_parallel(args, func, items):
+    '''
+    Run func for each item with args.jobs threads and retries, emitting one line per item as it completes.
+    :return: Number of failed items.
+    '''
+    from .utils import call_with_retries, iter_concurrently
+
+    failed = 0
+    for item, record, error in iter_concurrently(lambda item: call_with_retries(lambda: func(item), retries=args.retries), items, max_workers=args.jobs):
+        if error:
+            failed += 1
+            emit({'item': item, 'error': str(error)}, sys.stderr)
+        elif record is not None:
+            emit(record)
+    return failed
+
+
+def file_record(file):
+    return {key: file.get(key) for key in ('id', 'name', 'mimeType', 'size', 'modifiedTime', 'parents') if key in file}
+
+
+# Commands
+def command_ls(drive, args):
+    if args.recursive:
+        for parent, file in drive.Files.walk(args.folder_id, fields=FILE_FIELDS, drive_id=args.drive_id, max_workers=args.jobs):
+            emit(file_record(file))
+        return 0
+    for file in drive.Files._iter_files(q=f"'{args.folder_id}' in parents and trashed=false", fields=FILE_FIELDS, drive_id=args.drive_id):
+        emit(file_record(file))
+    return 0
+
+
+def command_find(drive, args):
+    query = args.query if args.trashed else f"({args.query}) and trashed=false"
+    for file in drive.Files._iter_files(q=query, fields=FILE_FIELDS, drive_id=args.drive_id):
+        emit(file_record(file))
+    return 0
+
+
+def command_get(drive, args):
+    from .backends import LocalBackend
+
+    backend = LocalBackend(root=args.output)
+
+    def get(file_id):
+        file = drive.Files.get(file_id=file_id, fields='id, name, mimeType')
+        if file['mimeType'].startswith('application/vnd.google-apps.'):
+            name = drive.Files.export(file_id=file_id, dest=backend, raise_errors=True)
+        else:
+            name = drive.Files.download(file_id=file_id, dest=backend, verify=args.verify, raise_errors=True)
+        return {'id': file_id, 'name': file['name'], 'path': backend.path(name)}
+
+    return run_parallel(args, get, args.file_ids)
+
+
+def command_put(drive, args):
+    def tasks():
+        for path in args.paths:
+            if not os.path.isdir(path):
+                yield path, args.parent
+                continue
+            if not args.recursive:
+                emit({'item': path, 'error': 'Is a directory, use -r'}, sys.stderr)
+                continue
+            # Folders are created top-down before their files are queued
+            folders = {}
+            root = os.path.abspath(path)
+            for directory, subdirectories, files in os.walk(root):
+                parent = folders.get(os.path.dirname(directory), args.parent) if directory != root else args.parent
+                folder = drive.Files.create(name=os.path.basename(directory), mime_type=MimeTypes.FOLDER, dest_folder_id=parent)
+                folders[directory] = folder['id']
+                emit(file_record(folder))
+                for name in files:
+                    yield os.path.join(directory, name), folder['id']
+
+    def put(task):
+        path, parent = task
+        file = drive.Files.upload(file=path, dest_folder_id=parent, verify=args.verify)
+        return {'path': path, 'id': file['id'], 'name': file['name'], 'parent': parent}
+
+    return run_parallel(args, put, tasks())
+
+
+def command_cp(drive, args):
+    source = drive.Files.get(file_id=args.source_id, fields='id, name, mimeType')
+    if source['mimeType'] != MimeTypes.FOLDER.value:
+        return run_parallel(args, lambda file_id: file_record(drive.Files.copy(file_id=file_id, name_prefix=None, dest_folder_id=args.dest_folder_id)),
+                            [args.source_id])
+    if not args.recursive:
+        emit({'item': args.source_id, 'error': 'Is a folder, use -r'}, sys.stderr)
+        return 1
+
+    def tasks():
+        root = drive.Files.create(name=source['name'], mime_type=MimeTypes.FOLDER, dest_folder_id=args.dest_folder_id)
+        emit(file_record(root))
+        folders = {args.source_id: root['id']}
+        # Breadth-first, so a folder is created before its children are listed
+        for parent, file in drive.Files.walk(args.source_id, fields='id, name, mimeType, parents', max_workers=args.jobs):
+            if file['mimeType'] == MimeTypes.FOLDER.value:
+                folder = drive.Files.create(name=file['name'], mime_type=MimeTypes.FOLDER, dest_folder_id=folders[parent])
+                folders[file['id']] = folder['id']
+                emit(file_record(folder))
+            else:
+                yield file['id'], folders[parent]
+
+    def copy(task):
+        file_id, parent = task
+        return {'source': file_id, **file_record(drive.Files.copy(file_id=file_id, name_prefix=None, dest_folder_id=parent))}
+
+    return run_parallel(args, copy, tasks())
+
+
+def command_mv(drive, args):
+    return run_parallel(args, lambda file_id: file_record(drive.Files.move(file_id=file_id, dest_folder_id=args.dest_folder_id)), args.file_ids)
+
+
+def command_rm(drive, args):
+    def remove(file_id):
+        if args.permanent:
+            drive.Files.delete(file_id=file_id)
+            return {'id': file_id, 'deleted': True}
+        drive.Files.trash(file_id=file_id)
+        return {'id': file_id, 'trashed': True}
+
+    return run_parallel(args, remove, args.file_ids)
+
+
+def command_share(drive, args):
+    def share(file_id):
+        permission = drive.Permissions.add(file_id=file_id, role=args.role, email=args.email, domain=args.domain, anyone=args.anyone)
+        return {'id': file_id, 'permission': permission}
+
+    return run_parallel(args, share, args.file_ids)
+
+
+def command_export(drive, args):
+    from .backends import LocalBackend
+
+    backend = LocalBackend(root=args.output)
+
+    def export(file_id):
+        name = drive.Files.export(file_id=file_id, format=args.format, dest=backend, raise_errors=True)
+        return {'id': file_id, 'path': backend.path(name)}
+
+    return run_parallel(args, export, args.file_ids)
+
+
+def command_du(drive, args):
+    stats = drive.Analytics.folder_sizes(folder_id=args.folder_id, cache_file=args.cache, drive_id=args.drive_id, max_workers=args.jobs)
+    folders = [args.folder_id] if args.summarize else sorted(stats, key=lambda folder_id: stats[folder_id]['size'], reverse=True)
+    for folder_id in folders:
+        emit({'id': folder_id, **stats[folder_id]})
+    return 0
+
+
+def command_sync(drive, args):
+    from .utils import md5_file
+
+    # Map relative directories to folder IDs with one listing pass
+    folders = {'': args.folder_id}
+    paths = {args.folder_id: ''}
+    for parent, file in drive.Files.walk(args.folder_id, fields='id, name, mimeType, parents', max_workers=args.jobs):
+        if file['mimeType'] == MimeTypes.FOLDER.value and parent in paths:
+            paths[file['id']] = os.path.join(paths[parent], file['name'])
+            folders.setdefault(paths[file['id']], file['id'])
+
+    root = os.path.abspath(args.local_directory)
+
+    def tasks():
+        for directory, subdirectories, files in os.walk(root):
+            relative = os.path.relpath(directory, root)
+            relative = '' if relative == '.' else relative
+            if relative not in folders:
+                parent = folders[os.path.dirname(relative)]
+                if args.dry_run or parent is None:
+                    folders[relative] = None
+                    emit({'path': directory, 'id': None, 'action': 'create', 'dry_run': True})
+                else:
+                    folder = drive.Files.create(name=os.path.basename(relative), mime_type=MimeTypes.FOLDER, dest_folder_id=parent)
+                    folders[relative] = folder['id']
+                    emit({'path': directory, 'id': folder['id'], 'action': 'created'})
+            for name in files:
+                yield os.path.join(directory, name), folders[relative]
+
+    def sync(task):
+        path, folder_id = task
+        md5_checksum, size = md5_file(path)
+        index = drive.Files.checksum_index(folder_id) if folder_id else {}
+        name = os.path.basename(path)
+        same_name = [f for f in index.values() if f.get('name') == name]
+        if same_name and same_name[0].get('md5Checksum') == md5_checksum:
+            return {'path': path, 'id': same_name[0]['id'], 'action': 'skipped'}
+        if args.dry_run:
+            return {'path': path, 'id': same_name[0]['id'] if same_name else None, 'action': 'update' if same_name else 'upload', 'dry_run': True}
+        if same_name:
+            file = drive.Files.update_content(file_id=same_name[0]['id'], file=path)
+            return {'path': path, 'id': file['id'], 'action': 'updated'}
+        file = drive.Files.upload(file=path, dest_folder_id=folder_id)
+        return {'path': path, 'id': file['id'], 'action': 'uploaded'}
+
+    return run_parallel(args, sync, tasks())
+
+
+def command_verify(drive, args):
+    report = drive.Files.verify(local_directory=args.local_directory, folder_id=args.folder_id, repair=args.repair,
+                                processes=args.processes, max_workers=args.jobs, retries=args.retries)
+    failed = 0
+    for entry in report:
+        if entry['status'] != 'ok' and not entry.get('repaired'):
+            failed += 1
+        if entry['status'] != 'ok' or args.all:
+            emit(entry)
+    return failed
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='simple-drive', description='Google Drive from the command line. Every result is printed as one JSON line.')
+    parser.add_argument('--service-account', default=os.environ.get('SIMPLE_DRIVE_SERVICE_ACCOUNT'), help='Service account JSON file.')
+    parser.add_argument('--subject', default=os.environ.get('SIMPLE_DRIVE_SUBJECT'), help='User email to impersonate with domain-wide delegation.')
+    parser.add_argument('--client-secrets', default=os.environ.get('SIMPLE_DRIVE_CLIENT_SECRETS'), help='OAuth client secrets JSON file, the user credentials are cached.')
+    parser.add_argument('-j', '--jobs', type=int, default=8, help='Number of parallel transfers.')
+    parser.add_argument('--retries', type=int, default=3, help='Retries of an item after a throttling or server error.')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    command = commands.add_parser('ls', help='List a folder.')
+    command.add_argument('folder_id', nargs='?', default='root')
+    command.add_argument('-r', '--recursive', action='store_true')
+    command.add_argument('--drive-id', help='Shared drive ID.')
+    command.set_defaults(func=command_ls)
+
+    command = commands.add_parser('find', help='Search files with a Drive query, e.g. "name contains \'report\'".')
+    command.add_argument('query')
+    command.add_argument('--trashed', action='store_true', help='Include trashed files.')
+    command.add_argument('--drive-id', help='Shared drive ID.')
+    command.set_defaults(func=command_find)
+
+    command = commands.add_parser('get', help='Download files, Google Workspace files are exported in their default format.')
+    command.add_argument('file_ids', nargs='+')
+    command.add_argument('-o', '--output', default='.', help='Destination directory.')
+    command.add_argument('--verify', action='store_true', help='Compare the md5Checksum while downloading.')
+    command.set_defaults(func=command_get)
+
+    command = commands.add_parser('put', help='Upload files or directories.')
+    command.add_argument('paths', nargs='+')
+    command.add_argument('-p', '--parent', help='Destination folder ID.')
+    command.add_argument('-r', '--recursive', action='store_true')
+    command.add_argument('--verify', action='store_true', help='Compare the md5Checksum while uploading.')
+    command.set_defaults(func=command_put)
+
+    command = commands.add_parser('cp', help='Copy a file, or a folder tree with -r.')
+    command.add_argument('source_id')
+    command.add_argument('dest_folder_id')
+    command.add_argument('-r', '--recursive', action='store_true')
+    command.set_defaults(func=command_cp)
+
+    command = commands.add_parser('mv', help='Move files to a folder.')
+    command.add_argument('file_ids', nargs='+')
+    command.add_argument('-t', '--to', dest='dest_folder_id', required=True, help='Destination folder ID.')
+    command.set_defaults(func=command_mv)
+
+    command = commands.add_parser('rm', help='Trash files.')
+    command.add_argument('file_ids', nargs='+')
+    command.add_argument('--permanent', action='store_true', help='Delete instead of trash.')
+    command.set_defaults(func=command_rm)
+
+    command = commands.add_parser('share', help='Add a permission to files.')
+    command.add_argument('file_ids', nargs='+')
+    command.add_argument('--role', default='reader', help='reader, commenter, writer, fileOrganizer, organizer.')
+    target = command.add_mutually_exclusive_group(required=True)
+    target.add_argument('--email')
+    target.add_argument('--domain')
+    target.add_argument('--anyone', action='store_true')
+    command.set_defaults(func=command_share)
+
+    command = commands.add_parser('export', help='Export Google Workspace files.')
+    command.add_argument('file_ids', nargs='+')
+    command.add_argument('-f', '--format', default='default', help='xlsx, docx, pdf, csv, ...')
+    command.add_argument('-o', '--output', default='.', help='Destination directory.')
+    command.set_defaults(func=command_export)
+
+    command = commands.add_parser('du', help='Folder sizes.')
+    command.add_argument('folder_id')
+    command.add_argument('-s', '--summarize', action='store_true', help='Only the root folder.')
+    command.add_argument('--cache', help='Cache file, later runs only apply the changes.')
+    command.add_argument('--drive-id', help='Shared drive ID.')
+    command.set_defaults(func=command_du)
+
+    command = commands.add_parser('sync', help='Upload new and changed files of a local directory to a folder.')
+    command.add_argument('local_directory')
+    command.add_argument('folder_id')
+    command.add_argument('-n', '--dry-run', action='store_true')
+    command.set_defaults(func=command_sync)
+
+    command = commands.add_parser('verify', help='Compare a local directory with a folder by md5Checksum.')
+    command.add_argument('local_directory')
+    command.add_argument('folder_id')
+    command.add_argument('--repair', choices=('download', 'upload'), help='Transfer the mismatched and missing files again.')
+    command.add_argument('--processes', type=int, help='Hashing processes, defaults to the number of CPUs.')
+    command.add_argument('-a', '--all', action='store_true', help='Also print the files that match.')
+    command.set_defaults(func=command_verify)
+
+    return parser
+
+
+def main(argv=None):
+    global output
+
+    args = build_parser().parse_args(argv)
+    auth = get_auth(args)
+
+    from .drive import Drive
+    # Throttles are retried per item with --retries, not again inside each request
+    drive = Drive(auth=auth, verbose=False, throttle_retries=0)
+    output = sys.stdout
+    try:
+        with contextlib.redirect_stdout(sys.stderr):
+            failed = args.func(drive, args)
+    except KeyboardInterrupt:
+        return 130
+    except Exception as error:
+        emit({'command': args.command, 'error': str(error)}, sys.stderr)
+        return 1
+    finally:
+        output = None
+        if args.service_account:
+            save_token(auth.credentials, token_key(args))
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
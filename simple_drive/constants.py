@@ -1,5 +1,15 @@
 from enum import Enum
 
+
+def escape(value: str) -> str:
+    '''
+    Escape a value for a search query string.
+    :param value: Raw value, e.g. Tom's file.
+    :return: Escaped value, e.g. Tom\\'s file.
+    '''
+    return str(value).replace('\\', '\\\\').replace("'", "\\'")
+
+
 class Roles(Enum):
     VIEWER = 'reader'
     EDITOR = 'writer'
@@ -36,19 +46,19 @@ class MimeTypes(Enum):
 class SearchTerms:
     @staticmethod
     def name_contains(value: str) -> str:
-        return f"name contains '{value}'"
+        return f"name contains '{escape(value)}'"
 
     @staticmethod
     def name_equal(value: str) -> str:
-        return f"name = '{value}'"
+        return f"name = '{escape(value)}'"
 
     @staticmethod
     def name_not_equal(value: str) -> str:
-        return f"name != '{value}'"
+        return f"name != '{escape(value)}'"
 
     @staticmethod
     def fullText_contains(value: str) -> str:
-        return f"fullText contains '{value}'"
+        return f"fullText contains '{escape(value)}'"
 
     @staticmethod
     def mimeType_contains(value: str) -> str:
@@ -57,7 +67,7 @@ class SearchTerms:
         '''
         if isinstance(value, Enum):
             value = value.value
-        return f"mimeType contains '{value}'"
+        return f"mimeType contains '{escape(value)}'"
 
     @staticmethod
     def mimeType_equal(value: str) -> str:
@@ -66,7 +76,7 @@ class SearchTerms:
         '''
         if isinstance(value, Enum):
             value = value.value
-        return f"mimeType = '{value}'"
+        return f"mimeType = '{escape(value)}'"
 
     @staticmethod
     def mimeType_not_equal(value: str) -> str:
@@ -75,55 +85,55 @@ class SearchTerms:
         '''
         if isinstance(value, Enum):
             value = value.value
-        return f"mimeType != '{value}'"
+        return f"mimeType != '{escape(value)}'"
 
     @staticmethod
     def modifiedTime_less_than(value: str) -> str:
-        return f"modifiedTime < '{value}'"
+        return f"modifiedTime < '{escape(value)}'"
 
     @staticmethod
     def modifiedTime_less_equal(value: str) -> str:
-        return f"modifiedTime <= '{value}'"
+        return f"modifiedTime <= '{escape(value)}'"
 
     @staticmethod
     def modifiedTime_equal(value: str) -> str:
-        return f"modifiedTime = '{value}'"
+        return f"modifiedTime = '{escape(value)}'"
 
     @staticmethod
     def modifiedTime_not_equal(value: str) -> str:
-        return f"modifiedTime != '{value}'"
+        return f"modifiedTime != '{escape(value)}'"
 
     @staticmethod
     def modifiedTime_greater_than(value: str) -> str:
-        return f"modifiedTime > '{value}'"
+        return f"modifiedTime > '{escape(value)}'"
 
     @staticmethod
     def modifiedTime_greater_equal(value: str) -> str:
-        return f"modifiedTime >= '{value}'"
+        return f"modifiedTime >= '{escape(value)}'"
 
     @staticmethod
     def viewedByMeTime_less_than(value: str) -> str:
-        return f"viewedByMeTime < '{value}'"
+        return f"viewedByMeTime < '{escape(value)}'"
 
     @staticmethod
     def viewedByMeTime_less_equal(value: str) -> str:
-        return f"viewedByMeTime <= '{value}'"
+        return f"viewedByMeTime <= '{escape(value)}'"
 
     @staticmethod
     def viewedByMeTime_equal(value: str) -> str:
-        return f"viewedByMeTime = '{value}'"
+        return f"viewedByMeTime = '{escape(value)}'"
 
     @staticmethod
     def viewedByMeTime_not_equal(value: str) -> str:
-        return f"viewedByMeTime != '{value}'"
+        return f"viewedByMeTime != '{escape(value)}'"
 
     @staticmethod
     def viewedByMeTime_greater_than(value: str) -> str:
-        return f"viewedByMeTime > '{value}'"
+        return f"viewedByMeTime > '{escape(value)}'"
 
     @staticmethod
     def viewedByMeTime_greater_equal(value: str) -> str:
-        return f"viewedByMeTime >= '{value}'"
+        return f"viewedByMeTime >= '{escape(value)}'"
 
     @staticmethod
     def trashed_equal(value: bool) -> str:
@@ -143,22 +153,22 @@ class SearchTerms:
 
     @staticmethod
     def folder_id(value: str) -> str:
-        return f"'{value}' in parents"
+        return f"'{escape(value)}' in parents"
 
     @staticmethod
     def parent_id(value: str) -> str:
-        return f"'{value}' in parents"
+        return f"'{escape(value)}' in parents"
     @staticmethod
     def owner_email(value: str) -> str:
-        return f"'{value}' in owners"
+        return f"'{escape(value)}' in owners"
 
     @staticmethod
     def writer_email(value: str) -> str:
-        return f"'{value}' in writers"
+        return f"'{escape(value)}' in writers"
 
     @staticmethod
     def reader_email(value: str) -> str:
-        return f"'{value}' in readers"
+        return f"'{escape(value)}' in readers"
 
     @staticmethod
     def sharedWithMe_equal(value: bool) -> str:
@@ -170,54 +180,181 @@ class SearchTerms:
 
     @staticmethod
     def createdTime_less_than(value: str) -> str:
-        return f"createdTime < '{value}'"
+        return f"createdTime < '{escape(value)}'"
 
     @staticmethod
     def createdTime_less_equal(value: str) -> str:
-        return f"createdTime <= '{value}'"
+        return f"createdTime <= '{escape(value)}'"
 
     @staticmethod
     def createdTime_equal(value: str) -> str:
-        return f"createdTime = '{value}'"
+        return f"createdTime = '{escape(value)}'"
 
     @staticmethod
     def createdTime_not_equal(value: str) -> str:
-        return f"createdTime != '{value}'"
+        return f"createdTime != '{escape(value)}'"
 
     @staticmethod
     def createdTime_greater_than(value: str) -> str:
-        return f"createdTime > '{value}'"
+        return f"createdTime > '{escape(value)}'"
 
     @staticmethod
     def createdTime_greater_equal(value: str) -> str:
-        return f"createdTime >= '{value}'"
+        return f"createdTime >= '{escape(value)}'"
 
     @staticmethod
     def properties_has(value: str) -> str:
-        return f"properties has '{value}'"
+        return f"properties has '{escape(value)}'"
 
     @staticmethod
     def appProperties_has(value: str) -> str:
-        return f"appProperties has '{value}'"
+        return f"appProperties has '{escape(value)}'"
 
     @staticmethod
     def visibility_equal(value: str) -> str:
         '''
         :param value: anyoneCanFind, anyoneWithLink, domainCanFind, domainWithLink, limited
         '''
-        return f"visibility = '{value}'"
+        return f"visibility = '{escape(value)}'"
 
     @staticmethod
     def visibility_not_equal(value: str) -> str:
         '''
         :param value: anyoneCanFind, anyoneWithLink, domainCanFind, domainWithLink, limited
         '''
-        return f"visibility != '{value}'"
+        return f"visibility != '{escape(value)}'"
 
     @staticmethod
     def shortcutDetails_targetId_equal(value: str) -> str:
-        return f"shortcutDetails.targetId = '{value}'"
+        return f"shortcutDetails.targetId = '{escape(value)}'"
 
     @staticmethod
     def shortcutDetails_targetId_not_equal(value: str) -> str:
-        return f"shortcutDetails.targetId != '{value}'"
\ No newline at end of file
+        return f"shortcutDetails.targetId != '{escape(value)}'"
+
+
+class Query:
+    def __init__(self, term=None, operator=None, children=()):
+        '''
+        Compose search terms into nested and / or / not expressions.
+        Use Query.all_of, Query.any_of, Query.not_ or the operators &, |, ~ instead of this constructor.
+        :param term: A search term, use SearchTerms.
+        :param operator: and, or, not.
+        :param children: Child queries.
+        '''
+        self.term = term
+        self.operator = operator
+        self.children = tuple(children)
+
+    @staticmethod
+    def _wrap(item):
+        return item if isinstance(item, Query) else Query(term=item)
+
+    @classmethod
+    def _flatten(cls, operator, items):
+        children = []
+        for item in map(cls._wrap, items):
+            children.extend(item.children if item.operator == operator else [item])
+        return cls(operator=operator, children=children)
+
+    @classmethod
+    def all_of(cls, *items):
+        return cls._flatten('and', items)
+
+    @classmethod
+    def any_of(cls, *items):
+        return cls._flatten('or', items)
+
+    @classmethod
+    def not_(cls, item):
+        return cls(operator='not', children=[cls._wrap(item)])
+
+    @classmethod
+    def any_in(cls, search_term, values):
+        '''
+        Match any of many values, e.g. Query.any_in(SearchTerms.parent_id, folder_ids).
+        :param search_term: A SearchTerms function.
+        :param values: A list of values.
+        '''
+        return cls.any_of(*[search_term(value) for value in values])
+
+    def __and__(self, other):
+        return Query.all_of(self, other)
+
+    def __or__(self, other):
+        return Query.any_of(self, other)
+
+    def __invert__(self):
+        return Query.not_(self)
+
+    def compile(self) -> str:
+        '''
+        :return: Query string for Files.list.
+        '''
+        if self.term is not None:
+            return self.term
+        if self.operator == 'not':
+            return f"not ({self.children[0].compile()})"
+        compiled = [child.compile() if child.term is not None else f"({child.compile()})" for child in self.children]
+        return f" {self.operator} ".join(compiled)
+
+    def __str__(self):
+        return self.compile()
+
+    def split(self, max_length=4000, max_terms=50):
+        '''
+        Split into several queries whose results together equal the results of this query.
+        The largest or-expression is cut in half until every query is short enough.
+        :param max_length: Max length of a query string.
+        :param max_terms: Max number of search terms in a query.
+        :return: List of query strings.
+        '''
+        queue = [self]
+        queries = []
+        while queue:
+            query = queue.pop()
+            if len(query.compile()) <= max_length and query._count_terms() <= max_terms:
+                queries.append(query.compile())
+                continue
+
+            path = query._largest_or_path()
+            if path is None:
+                raise ValueError(f"Can not split the query, it has no or-expression outside not: {query.compile()[:200]}...")
+
+            children = query._node(path).children
+            half = len(children) // 2
+            queue.append(query._replace(path, Query.any_of(*children[half:]) if len(children) - half > 1 else children[half]))
+            queue.append(query._replace(path, Query.any_of(*children[:half]) if half > 1 else children[0]))
+        return queries
+
+    # Support
+    def _count_terms(self):
+        return 1 if self.term is not None else sum(child._count_terms() for child in self.children)
+
+    def _node(self, path):
+        node = self
+        for index in path:
+            node = node.children[index]
+        return node
+
+    def _largest_or_path(self):
+        largest = self._largest_or()
+        return largest[0] if largest is not None else None
+
+    def _largest_or(self):
+        # (path relative to this node, number of terms) of the or-expression with the most terms
+        if self.term is not None or self.operator == 'not':
+            return None
+        best = ((), self._count_terms()) if self.operator == 'or' and len(self.children) > 1 else None
+        for index, child in enumerate(self.children):
+            found = child._largest_or()
+            if found is not None and (best is None or found[1] > best[1]):
+                best = ((index,) + found[0], found[1])
+        return best
+
+    def _replace(self, path, new_node):
+        if not path:
+            return new_node
+        children = list(self.children)
+        children[path[0]] = children[path[0]]._replace(path[1:], new_node)
+        return Query(term=self.term, operator=self.operator, children=children)
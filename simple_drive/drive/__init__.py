@@ -1,5 +1,4 @@
 from googleapiclient.discovery import build
-from pydrive2.drive import GoogleDrive
 
 from .comments import Comments
 from .files import Files
@@ -7,21 +6,35 @@ from .permissions import Permissions
 from .replies import Replies
 from .revisions import Revisions
 from .about import About
+from .drives import Drives
+from .analytics import Analytics
+from .channels import Channels
+from ..limiter import AdaptiveLimiter
+from ..transport import ThreadLocalHttp
 
 class Drive:
-    def __init__(self, auth, verbose=True):
+    def __init__(self, auth=None, verbose=True, single_flight=True, limiter=None, throttle_retries=5, backoff_seconds=1, cassette=None):
         '''
         Use Google Drive API in the simplest way
         :param auth_info: Use Auth class to authenticate with Google Drive
         :param verbose: Print result
+        :param single_flight: Concurrent identical read requests share one HTTP call, see drive.http.saved_calls
+        :param limiter: AdaptiveLimiter shared by every request of this Drive. None to create one, False to disable it
+        :param throttle_retries: Retries of a throttled request (429 or 403 rateLimitExceeded). 0 to raise the throttle right away, e.g. when a DrivePool or your own retries decide
+        :param backoff_seconds: First wait before a throttle retry, doubled on each retry
+        :param cassette: Cassette to record or replay every HTTP exchange (optional). auth can be None when replaying
         '''
-        self.verbose = verbose
+        if auth is None and (cassette is None or not cassette.replaying):
+            raise ValueError("Please provide auth, it can only be None when replaying a cassette.")
 
-        # For Upload
-        self.google_drive = GoogleDrive(auth)
+        self.verbose = verbose
+        self.auth = auth
 
-        # For other features
-        self.service = build(serviceName='drive', version='v3', credentials=auth.credentials)
+        # One connection per thread so workers can share this Drive
+        self.limiter = AdaptiveLimiter() if limiter is None else limiter or None
+        self.http = ThreadLocalHttp(credentials=auth.credentials if auth else None, single_flight=single_flight, limiter=self.limiter,
+                                    throttle_retries=throttle_retries, backoff_seconds=backoff_seconds, cassette=cassette)
+        self.service = build(serviceName='drive', version='v3', http=self.http)
 
         self.Files = Files(drive=self)
         self.Comments = Comments(drive=self)
@@ -29,6 +42,9 @@ class Drive:
         self.Replies = Replies(drive=self)
         self.Revisions = Revisions(drive=self)
         self.About = About(drive=self)
+        self.Drives = Drives(drive=self)
+        self.Analytics = Analytics(drive=self)
+        self.Channels = Channels(drive=self)
 
     # Support
     def print_if_verbose(self, *args):
@@ -3,6 +3,7 @@ from colorama import Fore
 class About:
     def __init__(self, drive):
         self.drive = drive
+        self.email_address = None
 
 
     def get(self, fields="*"):
@@ -15,6 +16,15 @@ class About:
             fields = ', '.join(fields)
         return self.drive.service.about().get(fields=fields).execute()
 
+    def get_email_address(self):
+        '''
+        Get the account email address, fetched once per Drive.
+        :return: Email address.
+        '''
+        if not self.email_address:
+            self.email_address = self.get(fields='user(emailAddress)')['user']['emailAddress']
+        return self.email_address
+
     def get_storage_quota(self):
         '''
         Get the account storage quota.
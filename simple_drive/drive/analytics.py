@@ -0,0 +1,244 @@
+import json
+import os
+import sqlite3
+
+from colorama import Fore
+
+from ..constants import MimeTypes
+from ..utils import iter_concurrently
+
+
+class Analytics:
+    CRAWL_FIELDS = 'id, name, mimeType, size, parents, owners(emailAddress)'
+
+    def __init__(self, drive):
+        self.drive = drive
+
+    def folder_sizes(self, folder_id, cache_file=None, refresh=False, drive_id=None, max_workers=8):
+        '''
+        Crawl a folder tree once and aggregate size, file count, bytes per mimeType and bytes per owner up the folder hierarchy.
+        With cache_file, later runs only apply the changes since the previous run (Changes API) instead of crawling again.
+        :param folder_id: Root folder ID.
+        :param cache_file: JSON file to cache the crawled tree (optional).
+        :param refresh: True to crawl again even if the cache exists.
+        :param drive_id: Shared drive ID when the folder is in a shared drive (optional).
+        :param max_workers: Number of threads.
+        :return: Dict of folder ID to {name, size, files, folders, mimeTypes, owners}, totals include all subfolders.
+        '''
+        cache = None
+        if cache_file and not refresh and os.path.exists(cache_file):
+            with open(cache_file) as f:
+                cache = json.load(f)
+            if cache.get('folder_id') != folder_id:
+                cache = None
+
+        if cache:
+            entries = cache['entries']
+            page_token = self._apply_changes(entries, cache['page_token'], drive_id, max_workers)
+        else:
+            page_token = self.drive.service.changes().getStartPageToken(supportsAllDrives=True, driveId=drive_id).execute()['startPageToken']
+            root = self.drive.service.files().get(fileId=folder_id, fields='id, name', supportsAllDrives=True).execute()
+            entries = {folder_id: [None, root['name'], MimeTypes.FOLDER.value, 0, None]}
+            self._crawl(entries, [folder_id], drive_id, max_workers)
+
+        if cache_file:
+            with open(cache_file, 'w') as f:
+                json.dump({'folder_id': folder_id, 'page_token': page_token, 'entries': entries}, f)
+
+        stats = self._aggregate(entries, folder_id)
+
+        root_stats = stats[folder_id]
+        self.drive.print_if_verbose(
+            f"{Fore.BLUE}Folder {Fore.RESET}{root_stats['name']}{Fore.BLUE}: {Fore.RESET}{root_stats['size'] / 1024 / 1024 / 1024:0,.2f} GB"
+            f"{Fore.BLUE} in {Fore.RESET}{root_stats['files']:,}{Fore.BLUE} files and {Fore.RESET}{root_stats['folders']:,}{Fore.BLUE} folders")
+        return stats
+
+    def find_duplicates(self, folder_id=None, query=None, action=None, drive_id=None, max_in_memory=1000000, max_workers=8):
+        '''
+        Find files with the same content (size and md5Checksum) in a folder tree or a query. The first file listed of each group is kept.
+        Files are grouped in memory up to max_in_memory files, then in a temporary SQLite file on disk.
+        :param folder_id: Root folder ID, the whole tree is searched.
+        :param query: Search query instead of folder_id, use SearchTerms or Query (optional).
+        :param action: None to only report. trash: trash the extra copies. shortcut: trash the extra copies and create a shortcut to the kept file in their place.
+        :param drive_id: Shared drive ID when the folder is in a shared drive (optional).
+        :param max_in_memory: Number of files grouped in memory before spilling to disk.
+        :param max_workers: Number of threads.
+        :return: Dict of groups (list of {size, md5Checksum, files}) and reclaimable_bytes.
+        '''
+        if (folder_id is None) == (query is None):
+            raise ValueError("Please provide exactly one of folder_id or query.")
+        if action not in (None, 'trash', 'shortcut'):
+            raise ValueError("action must be one of: None; trash; shortcut")
+
+        fields = 'id, name, size, md5Checksum, parents'
+        if folder_id:
+            files = (file for parent, file in self.drive.Files.walk([folder_id], fields, drive_id, max_workers))
+        else:
+            files = self.drive.Files._iter_files(q=f"({query}) and trashed=false", fields=fields, drive_id=drive_id)
+
+        groups = {}
+        count = 0
+        database = None
+        for file in files:
+            if not file.get('md5Checksum') or not file.get('size'):
+                continue
+            row = (int(file['size']), file['md5Checksum'], file['id'], file.get('name'), (file.get('parents') or [None])[0])
+            if database:
+                database.execute('INSERT INTO files VALUES (?, ?, ?, ?, ?)', row)
+            else:
+                groups.setdefault(row[:2], []).append(row[2:])
+                if count >= max_in_memory:
+                    database = self._spill(groups)
+                    groups = None
+            count += 1
+
+        if database:
+            duplicate_groups = self._iter_spilled_groups(database)
+        else:
+            duplicate_groups = ((key, rows) for key, rows in groups.items() if len(rows) > 1)
+
+        result = {'groups': [], 'reclaimable_bytes': 0}
+        for (size, md5_checksum), rows in duplicate_groups:
+            result['groups'].append({'size': size, 'md5Checksum': md5_checksum,
+                                     'files': [{'id': i, 'name': n, 'parent': p} for i, n, p in rows]})
+            result['reclaimable_bytes'] += size * (len(rows) - 1)
+
+        if database:
+            database.close()
+
+        self.drive.print_if_verbose(
+            f"{Fore.YELLOW}Found {Fore.RESET}{len(result['groups']):,}{Fore.YELLOW} groups of duplicates in {Fore.RESET}{count:,}{Fore.YELLOW} files, "
+            f"reclaimable {Fore.RESET}{result['reclaimable_bytes'] / 1024 / 1024 / 1024:0,.2f} GB")
+
+        if action:
+            self._remove_duplicates(result['groups'], action, max_workers)
+
+        return result
+
+    @staticmethod
+    def _spill(groups):
+        # An empty file name is a temporary on-disk database, deleted on close
+        database = sqlite3.connect('')
+        database.execute('CREATE TABLE files (size INTEGER, md5 TEXT, id TEXT, name TEXT, parent TEXT)')
+        rows = ((size, md5_checksum, *row) for (size, md5_checksum), group in groups.items() for row in group)
+        database.executemany('INSERT INTO files VALUES (?, ?, ?, ?, ?)', rows)
+        return database
+
+    @staticmethod
+    def _iter_spilled_groups(database):
+        database.execute('CREATE INDEX files_content ON files (size, md5)')
+        keys = database.execute('SELECT size, md5 FROM files GROUP BY size, md5 HAVING COUNT(*) > 1')
+        for size, md5_checksum in keys.fetchall():
+            rows = database.execute('SELECT id, name, parent FROM files WHERE size = ? AND md5 = ? ORDER BY rowid', (size, md5_checksum)).fetchall()
+            yield (size, md5_checksum), rows
+
+    def _remove_duplicates(self, groups, action, max_workers):
+        def remove(item):
+            kept, extra = item
+            self.drive.Files.trash(file_id=extra['id'])
+            if action == 'shortcut':
+                self.drive.Files.create_shortcut(file_id=kept['id'], name=extra['name'], dest_folder_id=extra['parent'])
+
+        extras = ((group['files'][0], extra) for group in groups for extra in group['files'][1:])
+        for (kept, extra), result, error in iter_concurrently(remove, extras, max_workers=max_workers):
+            if error:
+                print(f"An error occurred: {error}")
+
+    def _crawl(self, entries, folder_ids, drive_id, max_workers):
+        for parent, file in self.drive.Files.walk(folder_ids, self.CRAWL_FIELDS, drive_id, max_workers):
+            entries[file['id']] = self._entry(file, parent=parent)
+
+    @staticmethod
+    def _entry(file, parent):
+        owners = file.get('owners') or [{}]
+        return [parent, file.get('name'), file.get('mimeType'), int(file.get('size', 0)), owners[0].get('emailAddress')]
+
+    def _apply_changes(self, entries, page_token, drive_id, max_workers):
+        fields = f'nextPageToken, newStartPageToken, changes(fileId, removed, file(trashed, {self.CRAWL_FIELDS}))'
+        new_folders = []
+        while True:
+            response = self.drive.service.changes().list(pageToken=page_token, fields=fields, pageSize=1000, spaces='drive',
+                                                         driveId=drive_id, includeItemsFromAllDrives=True, supportsAllDrives=True).execute()
+            for change in response.get('changes', []):
+                file = change.get('file') or {}
+                parent = (file.get('parents') or [None])[0]
+                if change.get('removed') or file.get('trashed') or parent not in entries:
+                    self._remove(entries, change['fileId'])
+                    continue
+
+                is_new_folder = change['fileId'] not in entries and file.get('mimeType') == MimeTypes.FOLDER.value
+                entries[change['fileId']] = self._entry(file, parent=parent)
+                if is_new_folder:
+                    # A folder moved in from outside, its content is unknown
+                    new_folders.append(change['fileId'])
+
+            if 'newStartPageToken' in response:
+                page_token = response['newStartPageToken']
+                break
+            page_token = response['nextPageToken']
+
+        if new_folders:
+            self._crawl(entries, new_folders, drive_id, max_workers)
+
+        self.drive.print_if_verbose(f"{Fore.BLUE}Updated the cached tree with changes, crawled {Fore.RESET}{len(new_folders)}{Fore.BLUE} new folders")
+        return page_token
+
+    @staticmethod
+    def _remove(entries, file_id):
+        if file_id not in entries or entries[file_id][0] is None:  # Keep the root
+            return
+        if entries[file_id][2] != MimeTypes.FOLDER.value:
+            entries.pop(file_id)
+            return
+        children = {}
+        for entry_id, entry in entries.items():
+            children.setdefault(entry[0], []).append(entry_id)
+        stack = [file_id]
+        while stack:
+            entry_id = stack.pop()
+            entries.pop(entry_id, None)
+            stack.extend(children.get(entry_id, []))
+
+    @staticmethod
+    def _aggregate(entries, root_id):
+        stats = {}
+        for entry_id, (parent, name, mime_type, size, owner) in entries.items():
+            if mime_type == MimeTypes.FOLDER.value:
+                stats.setdefault(entry_id, {'name': name, 'size': 0, 'files': 0, 'folders': 0, 'mimeTypes': {}, 'owners': {}})['name'] = name
+
+        # Own children first
+        for entry_id, (parent, name, mime_type, size, owner) in entries.items():
+            if parent not in stats:
+                continue
+            parent_stats = stats[parent]
+            if mime_type == MimeTypes.FOLDER.value:
+                parent_stats['folders'] += 1
+                continue
+            parent_stats['files'] += 1
+            parent_stats['size'] += size
+            parent_stats['mimeTypes'][mime_type] = parent_stats['mimeTypes'].get(mime_type, 0) + size
+            parent_stats['owners'][owner] = parent_stats['owners'].get(owner, 0) + size
+
+        # Then add each folder into its parent, deepest folders first
+        depths = {root_id: 0}
+
+        def depth(folder_id):
+            path = []
+            while folder_id not in depths:
+                path.append(folder_id)
+                folder_id = entries[folder_id][0]
+            for i, item in enumerate(reversed(path)):
+                depths[item] = depths[folder_id] + i + 1
+            return depths[path[0]] if path else depths[folder_id]
+
+        for folder_id in sorted(stats, key=depth, reverse=True):
+            parent = entries[folder_id][0]
+            if parent is None or parent not in stats:
+                continue
+            parent_stats, folder_stats = stats[parent], stats[folder_id]
+            for key in ('size', 'files', 'folders'):
+                parent_stats[key] += folder_stats[key]
+            for key in ('mimeTypes', 'owners'):
+                for item, size in folder_stats[key].items():
+                    parent_stats[key][item] = parent_stats[key].get(item, 0) + size
+        return stats
@@ -0,0 +1,212 @@
+import queue
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from colorama import Fore
+
+
+class Channels:
+    def __init__(self, drive):
+        self.drive = drive
+        self.channels = {}
+
+    def watch_file(self, file_id, address, token=None, expiration=None):
+        '''
+        Create a channel that notifies an HTTPS address when a file changes.
+        :param file_id: File | folder ID.
+        :param address: HTTPS URL of the webhook receiver.
+        :param token: Secret sent back in every notification, checked by WebhookReceiver (optional).
+        :param expiration: Expiration time as Unix timestamp in milliseconds (optional). Defaults to 1 hour by Google.
+        :return: Channel info (id, resourceId, expiration, ...).
+        '''
+        body = self._channel_body(address, token, expiration)
+        channel = self.drive.service.files().watch(fileId=file_id, body=body, supportsAllDrives=True).execute()
+        self.channels[channel['id']] = {'kind': 'file', 'file_id': file_id, 'address': address, 'token': token, 'channel': channel}
+        self.drive.print_if_verbose(f"{Fore.GREEN}Watching file {Fore.RESET}{file_id}{Fore.GREEN} with channel {Fore.RESET}{channel['id']}")
+        return channel
+
+    def watch_changes(self, address, token=None, page_token=None, drive_id=None, expiration=None):
+        '''
+        Create a channel that notifies an HTTPS address when any file of the account (or a shared drive) changes.
+        :param address: HTTPS URL of the webhook receiver.
+        :param token: Secret sent back in every notification, checked by WebhookReceiver (optional).
+        :param page_token: Changes page token (optional). None to start from now.
+        :param drive_id: Shared drive ID (optional).
+        :param expiration: Expiration time as Unix timestamp in milliseconds (optional). Defaults to 1 week by Google.
+        :return: Channel info (id, resourceId, expiration, ...).
+        '''
+        if page_token is None:
+            page_token = self.drive.service.changes().getStartPageToken(driveId=drive_id, supportsAllDrives=True).execute()['startPageToken']
+
+        body = self._channel_body(address, token, expiration)
+        channel = self.drive.service.changes().watch(pageToken=page_token, driveId=drive_id, body=body, includeItemsFromAllDrives=True,
+                                                     supportsAllDrives=True).execute()
+        self.channels[channel['id']] = {'kind': 'changes', 'page_token': page_token, 'drive_id': drive_id, 'address': address, 'token': token, 'channel': channel}
+        self.drive.print_if_verbose(f"{Fore.GREEN}Watching changes with channel {Fore.RESET}{channel['id']}")
+        return channel
+
+    def renew(self, channel_id, expiration=None):
+        '''
+        Replace a channel created by this object with a new one on the same resource, then stop the old one.
+        :param channel_id: Channel ID.
+        :param expiration: Expiration time of the new channel as Unix timestamp in milliseconds (optional).
+        :return: New channel info.
+        '''
+        if channel_id not in self.channels:
+            raise ValueError(f"Channel not found: {channel_id}")
+
+        old = self.channels[channel_id]
+        if old['kind'] == 'file':
+            channel = self.watch_file(file_id=old['file_id'], address=old['address'], token=old['token'], expiration=expiration)
+        else:
+            channel = self.watch_changes(address=old['address'], token=old['token'], page_token=old['page_token'],
+                                         drive_id=old['drive_id'], expiration=expiration)
+
+        self.stop(channel_id=channel_id, resource_id=old['channel']['resourceId'])
+        return channel
+
+    def stop(self, channel_id, resource_id):
+        '''
+        Stop a channel.
+        :param channel_id: Channel ID.
+        :param resource_id: Resource ID returned when the channel was created.
+        '''
+        self.drive.service.channels().stop(body={'id': channel_id, 'resourceId': resource_id}).execute()
+        self.channels.pop(channel_id, None)
+        self.drive.print_if_verbose(f"{Fore.RED}Stopped channel {Fore.RESET}{channel_id}")
+
+    @staticmethod
+    def _channel_body(address, token, expiration):
+        body = {'id': str(uuid.uuid4()), 'type': 'web_hook', 'address': address}
+        if token:
+            body['token'] = token
+        if expiration:
+            body['expiration'] = str(int(expiration))
+        return body
+
+
+class WebhookReceiver:
+    HEADERS = {
+        'X-Goog-Channel-ID': 'channel_id',
+        'X-Goog-Channel-Token': 'token',
+        'X-Goog-Channel-Expiration': 'expiration',
+        'X-Goog-Resource-ID': 'resource_id',
+        'X-Goog-Resource-URI': 'resource_uri',
+        'X-Goog-Resource-State': 'resource_state',
+        'X-Goog-Changed': 'changed',
+        'X-Goog-Message-Number': 'message_number',
+    }
+
+    def __init__(self, host='0.0.0.0', port=8080, token=None, callback=None, async_queue=None, loop=None, ssl_context=None):
+        '''
+        A lightweight webhook receiver for Drive notifications, running in a background thread.
+        Notifications with a wrong channel token are rejected. Accepted ones go to the callback, the async queue and self.queue.
+        Google only sends to HTTPS addresses, use ssl_context or put the receiver behind a TLS proxy.
+        :param host: Host to listen on.
+        :param port: Port to listen on, 0 to pick a free port.
+        :param token: Expected channel token (optional). None to accept every notification.
+        :param callback: A function that takes a notification dict, called in the request thread (optional).
+        :param async_queue: An asyncio.Queue to put notifications in, requires loop (optional).
+        :param loop: The event loop of async_queue.
+        :param ssl_context: ssl.SSLContext to serve HTTPS (optional).
+        '''
+        self.token = token
+        self.callback = callback
+        self.async_queue = async_queue
+        self.loop = loop
+        self.queue = queue.Queue()
+
+        receiver = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length', 0))
+                if length:
+                    self.rfile.read(length)
+                status = receiver._receive(self.headers)
+                self.send_response(status)
+                self.end_headers()
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        if ssl_context:
+            self.server.socket = ssl_context.wrap_socket(self.server.socket, server_side=True)
+        self.ssl = ssl_context is not None
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f"{'https' if self.ssl else 'http'}://{'127.0.0.1' if host == '0.0.0.0' else host}:{port}/"
+
+    def _receive(self, headers):
+        notification = {key: headers.get(header) for header, key in self.HEADERS.items()}
+        if self.token is not None and notification['token'] != self.token:
+            return 403
+
+        if self.callback:
+            self.callback(notification)
+        if self.async_queue is not None:
+            self.loop.call_soon_threadsafe(self.async_queue.put_nowait, notification)
+        self.queue.put(notification)
+        return 200
+
+    def start(self):
+        '''
+        Start serving in a background thread.
+        :return: self.
+        '''
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        '''
+        Stop serving.
+        '''
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args):
+        self.stop()
+
+
+def send_notification(url, channel_id, resource_id='test-resource', resource_state='change', token=None, message_number=1, changed=None):
+    '''
+    Send a notification like Google does, to test a WebhookReceiver locally.
+    :param url: Receiver URL.
+    :param channel_id: Channel ID.
+    :param resource_id: Resource ID.
+    :param resource_state: sync, add, remove, update, trash, untrash, change.
+    :param token: Channel token (optional).
+    :param message_number: Message number.
+    :param changed: Comma-separated change types, e.g. content,properties (optional).
+    :return: HTTP status of the receiver.
+    '''
+    headers = {
+        'X-Goog-Channel-ID': channel_id,
+        'X-Goog-Resource-ID': resource_id,
+        'X-Goog-Resource-State': resource_state,
+        'X-Goog-Message-Number': str(message_number),
+        'X-Goog-Channel-Expiration': time.strftime('%a, %d %b %Y %H:%M:%S GMT', time.gmtime(time.time() + 3600)),
+    }
+    if token is not None:
+        headers['X-Goog-Channel-Token'] = token
+    if changed:
+        headers['X-Goog-Changed'] = changed
+
+    request = urllib.request.Request(url, data=b'', headers=headers, method='POST')
+    try:
+        with urllib.request.urlopen(request) as response:
+            return response.status
+    except urllib.error.HTTPError as error:
+        return error.code
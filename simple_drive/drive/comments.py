@@ -1,5 +1,12 @@
+import json
+import os
+from datetime import datetime, timezone
+
 from colorama import Fore
 
+from ..constants import MimeTypes
+from ..utils import call_batched, iter_concurrently
+
 
 class Comments:
     def __init__(self, drive):
@@ -23,6 +30,27 @@ class Comments:
 
         return result
 
+    def create_many(self, comments, batch_size=20, max_workers=4, retries=3):
+        '''
+        Create many comments across many files with batch requests, several batches at a time. Throttled comments are retried.
+        Comments have no idempotency key, so a batch call that fails as a whole is not sent again, its comments are reported as failed and may exist.
+        :param comments: List of (file_id, content).
+        :param batch_size: Comments per batch request, at most 100.
+        :param max_workers: Number of batch requests in flight.
+        :param retries: Number of retries of a comment after a throttling or server error.
+        :return: List of comment info in the order of comments, None for a failed comment.
+        '''
+        requests = [lambda file_id=file_id, content=content: self.drive.service.comments().create(fileId=file_id, body={'content': content}, fields='*')
+                    for file_id, content in comments]
+        results = []
+        for (file_id, content), (result, error) in zip(comments, call_batched(self.drive.service, requests, batch_size, max_workers, retries, idempotent=False)):
+            if error:
+                print(f"An error occurred: {file_id} {error}")
+            results.append(result)
+
+        self.drive.print_if_verbose(f"{Fore.GREEN}Commented {Fore.RESET}{sum(1 for r in results if r is not None)}{Fore.GREEN} of {Fore.RESET}{len(results)}{Fore.GREEN} comments")
+        return results
+
     def get(self, file_id, comment_id):
         '''
         Get a comment info.
@@ -51,13 +79,79 @@ class Comments:
         self.drive.print_if_verbose(f'{Fore.BLUE}Updated the content of comment {Fore.RESET}{comment_id}{Fore.BLUE} to {Fore.RESET}"{truncated_content}"')
         return result
 
-    def list(self, file_id):
+    def list(self, file_id, fields='*', start_modified_time=None, include_deleted=False):
         '''
-        List comments of a file.
+        List comments of a file, all pages.
         :param file_id: File ID.
+        :param fields: Fields of each comment, * is all fields (replies included).
+        :param start_modified_time: Only comments modified after this time, e.g. '2024-06-01T00:00:00Z' (optional).
+        :param include_deleted: True to include deleted comments (without content).
         :return: List of comments.
         '''
-        return self.drive.service.comments().list(fileId=file_id, fields='comments').execute()['comments']
+        return list(self._iter_comments(file_id, fields, start_modified_time, include_deleted))
+
+    def _iter_comments(self, file_id, fields='*', start_modified_time=None, include_deleted=False):
+        page_token = None
+        while True:
+            result = self.drive.service.comments().list(fileId=file_id, fields=f'nextPageToken, comments({fields})', pageSize=100,
+                                                        startModifiedTime=start_modified_time, includeDeleted=include_deleted,
+                                                        pageToken=page_token).execute()
+            yield from result.get('comments', [])
+            page_token = result.get('nextPageToken')
+            if not page_token:
+                return
+
+    def harvest(self, folder_id, state_file=None, include_replies=True, include_deleted=False, drive_id=None, max_workers=8):
+        '''
+        Stream the comments and replies of every file in a folder tree, files are read concurrently.
+        With state_file, later runs only fetch the activity since the previous complete run (startModifiedTime).
+        :param folder_id: Root folder ID.
+        :param state_file: JSON file to keep the time of the last complete run per folder (optional).
+        :param include_replies: True to also yield replies.
+        :param include_deleted: True to include deleted comments and replies.
+        :param drive_id: Shared drive ID when the folder is in a shared drive (optional).
+        :param max_workers: Number of threads.
+        :return: Generator of dicts with type (comment | reply), file_id, file_name, comment_id and the comment or reply fields.
+        '''
+        state = {}
+        if state_file and os.path.exists(state_file):
+            with open(state_file) as f:
+                state = json.load(f)
+        since = state.get(folder_id)
+        # Activity during this run is fetched again by the next one rather than missed
+        started = datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.%f')[:-3] + 'Z'
+
+        files = (file for parent, file in self.drive.Files.walk(folder_id, fields='id, name, mimeType', drive_id=drive_id, max_workers=max_workers)
+                 if file['mimeType'] not in (MimeTypes.FOLDER.value, MimeTypes.SHORTCUT.value))
+
+        count = 0
+        failed = 0
+        for file, comments, error in iter_concurrently(lambda file: self.list(file['id'], start_modified_time=since, include_deleted=include_deleted),
+                                                       files, max_workers=max_workers):
+            if error:
+                failed += 1
+                print(f"An error occurred: {file['id']} {error}")
+                continue
+            for comment in comments:
+                replies = comment.pop('replies', [])
+                count += 1
+                yield {'type': 'comment', 'file_id': file['id'], 'file_name': file['name'], 'comment_id': comment['id'], **comment}
+                if not include_replies:
+                    continue
+                for reply in replies:
+                    if since and reply.get('modifiedTime', '') < since:
+                        continue
+                    if reply.get('deleted') and not include_deleted:
+                        continue
+                    count += 1
+                    yield {'type': 'reply', 'file_id': file['id'], 'file_name': file['name'], 'comment_id': comment['id'], **reply}
+
+        if state_file and not failed:
+            state[folder_id] = started
+            with open(state_file, 'w') as f:
+                json.dump(state, f)
+
+        self.drive.print_if_verbose(f"{Fore.BLUE}Harvested {Fore.RESET}{count}{Fore.BLUE} comments and replies{f' since {Fore.RESET}{since}' if since else ''}")
 
     def delete(self, file_id, comment_id):
         '''
@@ -0,0 +1,64 @@
+import uuid
+
+from colorama import Fore
+
+
+class Drives:
+    def __init__(self, drive):
+        self.drive = drive
+
+    def create(self, name):
+        '''
+        Create a shared drive.
+        :param name: Shared drive name.
+        :return: Shared drive info.
+        '''
+        result = self.drive.service.drives().create(requestId=str(uuid.uuid4()), body={'name': name}, fields='*').execute()
+        self.drive.print_if_verbose(f"{Fore.GREEN}Created a shared drive as {Fore.RESET}{name}")
+        return result
+
+    def get(self, drive_id, use_domain_admin_access=False):
+        '''
+        Get a shared drive info.
+        :param drive_id: Shared drive ID.
+        :param use_domain_admin_access: True to request as a domain administrator.
+        :return: Shared drive info.
+        '''
+        return self.drive.service.drives().get(driveId=drive_id, useDomainAdminAccess=use_domain_admin_access, fields='*').execute()
+
+    def list(self, query=None, use_domain_admin_access=False):
+        '''
+        List shared drives.
+        :param query: Search query for shared drives, e.g. "name contains 'Team'" (optional).
+        :param use_domain_admin_access: True to list all shared drives of the domain as a domain administrator.
+        :return: List of shared drives.
+        '''
+        drives = []
+        page_token = None
+        while True:
+            response = self.drive.service.drives().list(q=query, useDomainAdminAccess=use_domain_admin_access, pageSize=100,
+                                                        pageToken=page_token, fields='nextPageToken, drives(id, name)').execute()
+            drives.extend(response.get('drives', []))
+            page_token = response.get('nextPageToken')
+            if page_token is None:
+                break
+        return drives
+
+    def rename(self, drive_id, name):
+        '''
+        Rename a shared drive.
+        :param drive_id: Shared drive ID.
+        :param name: Renamed name.
+        :return: Shared drive info.
+        '''
+        result = self.drive.service.drives().update(driveId=drive_id, body={'name': name}, fields='*').execute()
+        self.drive.print_if_verbose(f"{Fore.BLUE}Renamed shared drive {Fore.RESET}{drive_id} {Fore.BLUE}to {Fore.RESET}{name}")
+        return result
+
+    def delete(self, drive_id):
+        '''
+        Delete an empty shared drive.
+        :param drive_id: Shared drive ID.
+        '''
+        self.drive.service.drives().delete(driveId=drive_id).execute()
+        self.drive.print_if_verbose(f"{Fore.RED}Deleted shared drive {Fore.RESET}{drive_id}")
@@ -1,19 +1,59 @@
+import contextlib
+import csv
+import hashlib
 import io
+import json
+import mimetypes
 import os
 import os.path
+import posixpath
+import shutil
+import tarfile
+import tempfile
+import threading
+import urllib.parse
+import zipfile
+from datetime import datetime, timezone
 from enum import Enum
 
 from colorama import Fore
 from googleapiclient.errors import HttpError
-from googleapiclient.http import MediaIoBaseDownload
+from googleapiclient.http import MediaFileUpload, MediaIoBaseDownload
 
-from ..constants import MimeTypes
+from ..backends import is_backend
+from ..constants import MimeTypes, Query
+from ..utils import call_with_retries, iter_concurrently, md5_file, md5_files
+from .records import FileTable
+from .remote_file import RemoteFile
 
 
 class Files:
+    DEDUPE_POLICIES = ('skip', 'shortcut', 'revision')
+    VERIFY_REPAIRS = ('download', 'upload')
+    ARCHIVE_FORMATS = ('zip', 'tar', 'tar.gz', 'tar.zst')
+    STREAM_CHUNK_SIZE = 1024 * 1024
+    UPLOAD_CHUNK_SIZE = 8 * 1024 * 1024  # A multiple of 256 KB
+
+    # https://developers.google.com/drive/api/guides/ref-export-formats
+    default_export_mime_types = {
+        # Documents
+        MimeTypes.DOCS.value: MimeTypes.DOCX,
+        # Spreadsheets
+        MimeTypes.SHEETS.value: MimeTypes.XLSX,
+        # Presentations
+        MimeTypes.SLIDES.value: MimeTypes.PPTX,
+        # Drawings
+        MimeTypes.DRAWINGS.value: MimeTypes.PDF,
+        # Apps Script
+        MimeTypes.APPS_SCRIPT.value: MimeTypes.JSON
+    }
+
     def __init__(self, drive):
         self.drive = drive
         self.default_file_fields = 'id, name, mimeType, size, parents, webViewLink, owners'
+        self._checksum_indexes = {}
+        self._checksum_lock = threading.Lock()
+        self._checksum_folder_locks = {}
 
     def create(self, name, mime_type, dest_folder_id=None):
         '''
@@ -41,7 +81,7 @@ class Files:
         if dest_folder_id:
             body['parents'] = [dest_folder_id]
 
-        file = self.drive.service.files().create(body=body, fields=self.default_file_fields).execute()
+        file = self.drive.service.files().create(body=body, fields=self.default_file_fields, supportsAllDrives=True).execute()
 
         self.drive.print_if_verbose(
             f"{Fore.GREEN}Created {'an' if mime_type_name[0].lower() in 'ueoai' else 'a'} {mime_type_name} as {Fore.RESET}{name}{f'{Fore.GREEN} in folder {Fore.RESET}{dest_folder_id}' if dest_folder_id else ''}")
@@ -60,7 +100,7 @@ class Files:
             name = self.get(file_id=file_id).get('name')
 
         shortcut_metadata = {
-            'Name': name,
+            'name': name,
             'mimeType': MimeTypes.SHORTCUT.value,
             'shortcutDetails': {
                 'targetId': file_id
@@ -71,36 +111,231 @@ class Files:
             shortcut_metadata['parents'] = [dest_folder_id]
 
         shortcut = self.drive.service.files().create(body=shortcut_metadata,
-                                                     fields=f'{self.default_file_fields},shortcutDetails').execute()
+                                                     fields=f'{self.default_file_fields},shortcutDetails', supportsAllDrives=True).execute()
 
         self.drive.print_if_verbose(f"{Fore.GREEN}Created a shortcut of {Fore.RESET}{file_id}{Fore.GREEN} as {Fore.RESET}{name}")
         return shortcut
 
-    def upload(self, file, dest_folder_id=None, rename=None):
+    def upload(self, file, dest_folder_id=None, rename=None, dedupe=None, dedupe_folder_ids=None, source=None, verify=False):
         '''
         Upload a file.
-        :param file: Local file.
+        :param file: Local file, a readable file-like object, or an object name in source.
         :param dest_folder_id: Destination folder (optional).
         :param rename: Rename file before uploading (optional).
-        :return: File info.
+        :param dedupe: None to always upload. skip: return the file with the same content in the destination folder. shortcut: like skip, and also create a shortcut in the destination folder to the same content found in dedupe_folder_ids. revision: like skip, otherwise upload as a new revision of the file with the same name.
+        :param dedupe_folder_ids: Other folders to look for the same content, used with dedupe='shortcut' (optional).
+        :param source: A storage backend (LocalBackend, MemoryBackend, S3Backend, ...) to read file from, streamed in chunks (optional).
+        :param verify: True to hash the content while uploading and compare it with the md5Checksum of the Drive. A corrupted upload is deleted and sent once more, then IOError is raised.
+        :return: File info (v3 fields: id, name, mimeType, size, parents, webViewLink, owners). With dedupe, the existing file or shortcut when the same content is found.
+        Deprecated since 2.1.0: a local file used to be uploaded with PyDrive2 and returned as a GoogleDriveFile with v2 fields (title, fileSize, alternateLink), read the v3 fields instead.
         '''
+        if source is not None or not isinstance(file, (str, os.PathLike)):
+            if dedupe:
+                raise ValueError("dedupe needs a local file.")
+            return self._upload_stream(file, source, dest_folder_id, rename, verify)
+
         title = rename if rename else os.path.split(file)[-1]  # Avoid local dir in name
-        parents = [{'id': dest_folder_id}] if dest_folder_id else None
 
-        metadata = {
-            'title': title,
-            'parents': parents
-        }
+        if dedupe:
+            if dedupe not in self.DEDUPE_POLICIES:
+                raise ValueError(f"dedupe must be one of: {'; '.join(self.DEDUPE_POLICIES)}")
+
+            md5_checksum, size = md5_file(file)
+            index = self.checksum_index(dest_folder_id)
+
+            same_content = [f for f in index.values() if f.get('md5Checksum') == md5_checksum and int(f.get('size', -1)) == size]
+            if same_content:
+                self.drive.print_if_verbose(f"{Fore.YELLOW}Skipped {Fore.RESET}{title}{Fore.YELLOW}, same content as {Fore.RESET}{same_content[0]['id']}")
+                return same_content[0]
+
+            if dedupe == 'shortcut':
+                for folder_id in dedupe_folder_ids or []:
+                    same_content = [f for f in self.checksum_index(folder_id).values() if f.get('md5Checksum') == md5_checksum and int(f.get('size', -1)) == size]
+                    if same_content:
+                        target_id = same_content[0]['id']
+                        shortcuts = [f for f in index.values() if f.get('shortcutDetails', {}).get('targetId') == target_id]
+                        if shortcuts:
+                            self.drive.print_if_verbose(f"{Fore.YELLOW}Skipped {Fore.RESET}{title}{Fore.YELLOW}, shortcut exists as {Fore.RESET}{shortcuts[0]['id']}")
+                            return shortcuts[0]
+                        shortcut = self.create_shortcut(file_id=target_id, name=title, dest_folder_id=dest_folder_id)
+                        self._add_to_checksum_index(dest_folder_id, shortcut)
+                        return shortcut
+
+            if dedupe == 'revision':
+                same_name = [f for f in index.values() if f.get('name') == title]
+                if same_name:
+                    updated_file = self.update_content(file_id=same_name[0]['id'], file=file)
+                    self._add_to_checksum_index(dest_folder_id, {**same_name[0], 'md5Checksum': md5_checksum, 'size': str(size)})
+                    return updated_file
+
+        if verify:
+            with open(file, 'rb') as f:
+                new_file = self._upload_stream(f, None, dest_folder_id, title, verify)
+        else:
+            # Through the shared transport like the other uploads, so every upload returns the same v3 file info
+            metadata = {'name': title}
+            if dest_folder_id:
+                metadata['parents'] = [dest_folder_id]
+
+            resumable = os.path.getsize(file) > 5 * 1024 * 1024
+            media = MediaFileUpload(file, resumable=resumable, chunksize=10 * 1024 * 1024 if resumable else -1)
+            request = self.drive.service.files().create(body=metadata, media_body=media, fields=self.default_file_fields, supportsAllDrives=True)
+            if resumable:
+                new_file = None
+                while new_file is None:
+                    status, new_file = request.next_chunk()
+                    if status:
+                        self.drive.print_if_verbose(f"Upload {int(status.progress() * 100)}.")
+            else:
+                new_file = request.execute()
+            self.drive.print_if_verbose(
+                f"{Fore.GREEN}Uploaded {Fore.RESET}{title}{f'{Fore.GREEN} to folder {Fore.RESET}{dest_folder_id}' if dest_folder_id else ''}")
+
+        if dedupe:
+            self._add_to_checksum_index(dest_folder_id, {'id': new_file['id'], 'name': title, 'md5Checksum': md5_checksum, 'size': str(size)})
+
+        return new_file
 
-        new_file = self.drive.google_drive.CreateFile(metadata=metadata)
-        new_file.SetContentFile(file)
-        new_file.Upload()
+    def _upload_stream(self, file, source, dest_folder_id, rename, verify=False):
+        if rename:
+            title = rename
+        elif source is not None:
+            title = posixpath.basename(file)
+        else:
+            title = os.path.basename(getattr(file, 'name', None) or '')
+        if not title:
+            raise ValueError("Please provide rename to upload a file-like object without a name.")
+
+        metadata = {'name': title}
+        if dest_folder_id:
+            metadata['parents'] = [dest_folder_id]
+
+        start = file.tell() if verify and source is None and file.seekable() else None
+        for attempt in range(2 if verify else 1):
+            md5 = hashlib.md5() if verify else None
+            with (contextlib.closing(source.open_read(file)) if source is not None else contextlib.nullcontext(file)) as f:
+                new_file = self._resumable_upload(f, metadata, md5)
+            if not verify or self._check_md5(new_file['id'], new_file.get('md5Checksum'), md5.hexdigest()):
+                break
+            self.delete(file_id=new_file['id'])
+            if attempt or (source is None and start is None):
+                raise IOError(f"Checksum mismatch after uploading {title}")
+            if source is None:
+                file.seek(start)
 
         self.drive.print_if_verbose(
             f"{Fore.GREEN}Uploaded {Fore.RESET}{title}{f'{Fore.GREEN} to folder {Fore.RESET}{dest_folder_id}' if dest_folder_id else ''}")
-
         return new_file
 
+    def _resumable_upload(self, f, metadata, md5=None):
+        # A resumable upload with unknown size, so at most two chunks are in memory. md5 is updated with every chunk sent.
+        # https://developers.google.com/drive/api/guides/manage-uploads#resumable
+        fields = f"{self.default_file_fields}, md5Checksum" if md5 is not None else self.default_file_fields
+        url = f"https://www.googleapis.com/upload/drive/v3/files?uploadType=resumable&supportsAllDrives=true&fields={urllib.parse.quote(fields)}"
+        mime_type = mimetypes.guess_type(metadata['name'])[0] or 'application/octet-stream'
+        response, content = self.drive.http.request(url, 'POST', body=json.dumps(metadata),
+                                                    headers={'Content-Type': 'application/json; charset=UTF-8', 'X-Upload-Content-Type': mime_type})
+        if response.status >= 400:
+            raise HttpError(response, content, uri=url)
+        session = response['location']
+
+        offset = 0
+        chunk = self._read_full(f, self.UPLOAD_CHUNK_SIZE)
+        while True:
+            if md5 is not None:
+                md5.update(chunk)
+            next_chunk = self._read_full(f, self.UPLOAD_CHUNK_SIZE) if len(chunk) == self.UPLOAD_CHUNK_SIZE else b''
+            total = '*' if next_chunk else str(offset + len(chunk))
+            content_range = f"bytes {offset}-{offset + len(chunk) - 1}/{total}" if chunk else f"bytes */{total}"
+            response, content = self.drive.http.request(session, 'PUT', body=chunk, headers={'Content-Range': content_range})
+            if response.status in (200, 201):
+                return json.loads(content)
+            if response.status != 308:
+                raise HttpError(response, content, uri=session)
+            offset += len(chunk)
+            chunk = next_chunk
+
+    @staticmethod
+    def _read_full(f, size):
+        data = bytearray()
+        while len(data) < size:
+            part = f.read(size - len(data))
+            if not part:
+                break
+            data.extend(part)
+        return bytes(data)
+
+    def update_content(self, file_id, file, keep_revision_forever=False, resumable_threshold=5 * 1024 * 1024, chunk_size=10 * 1024 * 1024):
+        '''
+        Upload new content to an existing file as a new revision. The file ID, sharing and comments are kept.
+        :param file_id: File ID.
+        :param file: Local file.
+        :param keep_revision_forever: True to keep the new revision forever.
+        :param resumable_threshold: Files larger than this (bytes) use a resumable upload.
+        :param chunk_size: Chunk size (bytes) of the resumable upload, a multiple of 256 KB.
+        :return: File info.
+        '''
+        resumable = os.path.getsize(file) > resumable_threshold
+        media = MediaFileUpload(file, resumable=resumable, chunksize=chunk_size if resumable else -1)
+        request = self.drive.service.files().update(fileId=file_id, media_body=media,
+                                                    keepRevisionForever=keep_revision_forever,
+                                                    fields=f'{self.default_file_fields}, headRevisionId', supportsAllDrives=True)
+
+        if resumable:
+            result = None
+            while result is None:
+                status, result = request.next_chunk()
+                if status:
+                    self.drive.print_if_verbose(f"Upload {int(status.progress() * 100)}.")
+        else:
+            result = request.execute()
+
+        self.drive.print_if_verbose(f"{Fore.GREEN}Uploaded {Fore.RESET}{os.path.split(file)[-1]}{Fore.GREEN} as a new revision of {Fore.RESET}{file_id}")
+
+        return result
+
+    def checksum_index(self, folder_id=None, refresh=False):
+        '''
+        Get the cached checksum index of a folder, listed once and updated by uploads with dedupe.
+        :param folder_id: Folder ID. None for Root.
+        :param refresh: True to list the folder again.
+        :return: Dict of file ID to file info (id, name, md5Checksum, size, shortcutDetails), a copy that later uploads do not change.
+        '''
+        key = folder_id or 'root'
+        with self._checksum_lock:
+            if key in self._checksum_indexes and not refresh:
+                return dict(self._checksum_indexes[key])
+            folder_lock = self._checksum_folder_locks.setdefault(key, threading.Lock())
+
+        # One thread lists a folder, the others wait for its index
+        with folder_lock:
+            with self._checksum_lock:
+                if key in self._checksum_indexes and not refresh:
+                    return dict(self._checksum_indexes[key])
+
+            files = self._iter_files(q=f"'{key}' in parents and trashed=false", fields='id, name, md5Checksum, size, shortcutDetails')
+            index = {f['id']: f for f in files}
+            with self._checksum_lock:
+                self._checksum_indexes[key] = index
+                return dict(index)
+
+    def clear_checksum_index(self, folder_id=None):
+        '''
+        Clear the cached checksum index.
+        :param folder_id: Folder ID (optional). None to clear all folders.
+        '''
+        with self._checksum_lock:
+            if folder_id:
+                self._checksum_indexes.pop(folder_id, None)
+            else:
+                self._checksum_indexes.clear()
+
+    def _add_to_checksum_index(self, folder_id, file):
+        with self._checksum_lock:
+            index = self._checksum_indexes.get(folder_id or 'root')
+            if index is not None:
+                index[file['id']] = file
+
     def get(self, file_id, fields='*'):
         '''
         Get a file or folder info.
@@ -110,7 +345,7 @@ class Files:
         '''
         if isinstance(file_id, list):
             fields = ', '.join(fields)
-        return self.drive.service.files().get(fileId=file_id, fields=fields).execute()
+        return self.drive.service.files().get(fileId=file_id, fields=fields, supportsAllDrives=True).execute()
 
     def move(self, file_id, dest_folder_id):
         '''
@@ -119,12 +354,12 @@ class Files:
         :param dest_folder_id: Destination folder.
         :return: File|folder info.
         '''
-        file = self.drive.service.files().get(fileId=file_id, fields=self.default_file_fields).execute()
+        file = self.drive.service.files().get(fileId=file_id, fields=self.default_file_fields, supportsAllDrives=True).execute()
         remove_parents = file['parents'][0]
         result = self.drive.service.files().update(fileId=file_id,
                                                    addParents=dest_folder_id,
                                                    removeParents=remove_parents,
-                                                   fields=self.default_file_fields).execute()
+                                                   fields=self.default_file_fields, supportsAllDrives=True).execute()
 
         self.drive.print_if_verbose(
             f"{Fore.BLUE}Moved {Fore.RESET}{result.get('name', file_id)}{Fore.BLUE} to folder {Fore.RESET}{dest_folder_id}")
@@ -140,7 +375,7 @@ class Files:
         :param dest_folder_id: Destination folder (optional). None to make a copy in the same place with the original file.
         :return: File info.
         '''
-        current_file = self.drive.service.files().get(fileId=file_id, fields=self.default_file_fields).execute()
+        current_file = self.drive.service.files().get(fileId=file_id, fields=self.default_file_fields, supportsAllDrives=True).execute()
         current_name = current_file['name']
         new_name = f"{name_prefix if name_prefix else ''}{current_name}{name_suffix if name_suffix else ''}"
 
@@ -149,7 +384,7 @@ class Files:
             body['parents'] = [dest_folder_id]
 
         new_file = self.drive.service.files().copy(fileId=file_id, body=body,
-                                                   fields=self.default_file_fields).execute()
+                                                   fields=self.default_file_fields, supportsAllDrives=True).execute()
 
         self.drive.print_if_verbose(
             f"{Fore.GREEN}Copied {Fore.RESET}{current_name}{Fore.GREEN} to {Fore.RESET}{new_name}{f'{Fore.GREEN} in folder {Fore.RESET}{dest_folder_id}' if dest_folder_id else ''}")
@@ -165,7 +400,7 @@ class Files:
         '''
         body = {'name': name}
         result = self.drive.service.files().update(fileId=file_id, body=body,
-                                                   fields=self.default_file_fields).execute()
+                                                   fields=self.default_file_fields, supportsAllDrives=True).execute()
         self.drive.print_if_verbose(f"{Fore.BLUE}Renamed {Fore.RESET}{file_id} {Fore.BLUE}to {Fore.RESET}{name}")
         return result
 
@@ -184,18 +419,21 @@ class Files:
 
         result = self.drive.service.files().update(fileId=file_id,
                                                    body={'contentRestrictions': [content_restriction]},
-                                                   fields=f"{self.default_file_fields},contentRestrictions").execute();
+                                                   fields=f"{self.default_file_fields},contentRestrictions", supportsAllDrives=True).execute();
 
         self.drive.print_if_verbose(f"{Fore.BLUE}Updated content restriction for {Fore.RESET}{file_id}")
 
         return result
 
-    def list(self, *args, fields='*', operator='and', deep_folder=False):
+    def list(self, *args, fields='*', operator='and', deep_folder=False, compact=False, corpora=None, drive_id=None):
         '''
         List files related to this account.
         :param args: Use SearchTerms or visit https://developers.google.com/drive/api/guides/ref-search-terms.
         :param operator: and, or.
         :param deep_folder: If true, recursively search for folders.
+        :param compact: If true, return a FileTable (columnar, interned strings) instead of a list of dicts, for huge listings. fields defaults to FileTable.FIELDS.
+        :param corpora: user, domain, drive, allDrives (optional). None for the default (user).
+        :param drive_id: Shared drive ID, implies corpora='drive' (optional).
         :return: List of files.
         '''
 
@@ -205,6 +443,9 @@ class Files:
         if isinstance(fields, list):
             fields = ','.join(fields)
 
+        if compact and fields == '*':
+            fields = FileTable.FIELDS
+
         if deep_folder and 'mimeType' not in fields:
             fields += ",mimeType"
 
@@ -212,7 +453,7 @@ class Files:
         # https://developers.google.com/drive/api/guides/search-files#python
         try:
             # create drive api client
-            files = []
+            files = FileTable() if compact else []
             page_token = None
             while True:
                 response = (
@@ -222,6 +463,7 @@ class Files:
                         spaces="drive",
                         fields=f"nextPageToken, files({fields})",
                         pageToken=page_token,
+                        **self._corpora_params(corpora, drive_id),
                     )
                     .execute()
                 )
@@ -232,7 +474,7 @@ class Files:
 
                     # Support deep
                     if deep_folder and file['mimeType'] == 'application/vnd.google-apps.folder':
-                        files.extend(self.list(f"'{file['id']}' in parents", deep_folder=deep_folder))
+                        files.extend(self.list(f"'{file['id']}' in parents", deep_folder=deep_folder, compact=compact, corpora=corpora, drive_id=drive_id))
 
                 files.extend(response.get("files", []))
                 page_token = response.get("nextPageToken", None)
@@ -245,24 +487,150 @@ class Files:
 
         return files
 
-    def download(self, file_id, dest_directory=None, get_value=False):
+    def search(self, query, fields='*', max_length=4000, max_terms=50, max_workers=8):
+        '''
+        List files matching a Query. Long or-expressions are split into several queries that run in parallel, results are merged by file ID.
+        :param query: Query, e.g. Query.any_in(SearchTerms.parent_id, folder_ids) & SearchTerms.trashed_equal(False).
+        :param fields: * is all fields.
+        :param max_length: Max length of a query string.
+        :param max_terms: Max number of search terms in a query.
+        :param max_workers: Number of threads.
+        :return: List of files.
+        '''
+        if not isinstance(query, Query):
+            query = Query(term=query)
+
+        if isinstance(fields, list):
+            fields = ','.join(fields)
+        if fields != '*' and 'id' not in [f.strip() for f in fields.split(',')]:
+            fields += ',id'
+
+        queries = query.split(max_length=max_length, max_terms=max_terms)
+        if len(queries) > 1:
+            self.drive.print_if_verbose(f"{Fore.BLUE}Split query into {Fore.RESET}{len(queries)}{Fore.BLUE} queries")
+
+        files = {}
+        for q, result, error in iter_concurrently(lambda q: list(self._iter_files(q=q, fields=fields)), queries, max_workers=max_workers):
+            if error:
+                raise error
+            for file in result:
+                if file['id'] not in files:
+                    files[file['id']] = file
+                    self.drive.print_if_verbose(f"{Fore.BLUE}Found file: {Fore.RESET}{file.get('name', file['id'])}")
+        return list(files.values())
+
+    def search_all_drives(self, *args, fields='*', operator='and', include_my_drive=True, max_workers=8):
+        '''
+        List files in My Drive and every shared drive. Each shared drive is listed concurrently with corpora='drive', which is faster than corpora='allDrives'.
+        :param args: Use SearchTerms or visit https://developers.google.com/drive/api/guides/ref-search-terms.
+        :param fields: * is all fields.
+        :param operator: and, or.
+        :param include_my_drive: True to also list My Drive.
+        :param max_workers: Number of threads.
+        :return: List of files.
+        '''
+        q = f" {operator} ".join(args) if args else None
+
+        if isinstance(fields, list):
+            fields = ','.join(fields)
+        if fields != '*' and 'id' not in [f.strip() for f in fields.split(',')]:
+            fields += ',id'
+
+        drive_ids = [d['id'] for d in self.drive.Drives.list()]
+        if include_my_drive:
+            drive_ids.insert(0, None)
+
+        files = {}
+        for drive_id, result, error in iter_concurrently(lambda drive_id: list(self._iter_files(q=q, fields=fields, drive_id=drive_id)), drive_ids, max_workers=max_workers):
+            if error:
+                raise error
+            for file in result:
+                files.setdefault(file['id'], file)
+            self.drive.print_if_verbose(f"{Fore.BLUE}Found {Fore.RESET}{len(result)}{Fore.BLUE} files in {Fore.RESET}{drive_id or 'My Drive'}")
+        return list(files.values())
+
+    def walk(self, folder_ids, fields='id, name, mimeType, parents', drive_id=None, max_workers=8):
+        '''
+        Walk folder trees breadth-first, every folder of a level is listed concurrently.
+        :param folder_ids: Folder ID or list of folder IDs.
+        :param fields: Fields of each file, mimeType is always included.
+        :param drive_id: Shared drive ID when the folders are in a shared drive (optional).
+        :param max_workers: Number of threads.
+        :return: Generator of (parent folder ID, file info).
+        '''
+        if isinstance(folder_ids, str):
+            folder_ids = [folder_ids]
+        if 'mimeType' not in fields:
+            fields += ', mimeType'
+
+        def list_children(folder_id):
+            q = f"'{folder_id}' in parents and trashed=false"
+            return list(self._iter_files(q=q, fields=fields, drive_id=drive_id))
+
+        frontier = list(folder_ids)
+        while frontier:
+            next_frontier = []
+            for folder_id, children, error in iter_concurrently(list_children, frontier, max_workers=max_workers):
+                if error:
+                    raise error
+                for file in children:
+                    yield folder_id, file
+                    if file.get('mimeType') == MimeTypes.FOLDER.value:
+                        next_frontier.append(file['id'])
+            frontier = next_frontier
+
+    @staticmethod
+    def _corpora_params(corpora=None, drive_id=None):
+        if drive_id:
+            return {'corpora': 'drive', 'driveId': drive_id, 'includeItemsFromAllDrives': True, 'supportsAllDrives': True}
+        if corpora:
+            return {'corpora': corpora, 'includeItemsFromAllDrives': corpora != 'user', 'supportsAllDrives': True}
+        return {}
+
+    def _iter_files(self, q, fields, corpora=None, drive_id=None):
+        page_token = None
+        while True:
+            response = self.drive.service.files().list(q=q, spaces='drive', fields=f'nextPageToken, files({fields})',
+                                                       pageToken=page_token, pageSize=1000,
+                                                       **self._corpora_params(corpora, drive_id)).execute()
+            yield from response.get('files', [])
+            page_token = response.get('nextPageToken')
+            if page_token is None:
+                break
+
+    def download(self, file_id, dest_directory=None, get_value=False, dest=None, verify=False, raise_errors=False):
         '''
         Download a file from the Drive.
         :param file_id: File ID.
-        :param dest_directory: Destination directory (optional). None to save the file to current directory.
+        :param dest_directory: Destination directory (optional). None to save the file to current directory. A name prefix when dest is a backend.
         :param get_value: False to save the file, True to get the file value only.
-        :return: File value when get_value is True.
+        :param dest: A writable file-like object or a storage backend (LocalBackend, MemoryBackend, S3Backend, ...) to stream the file to in chunks (optional).
+        :param verify: True to hash the content while downloading and compare it with the md5Checksum of the Drive. A corrupted download is fetched once more (if dest can be rewritten), then IOError is raised.
+        :param raise_errors: True to raise HttpError instead of printing it and returning None, e.g. to retry it.
+        :return: File value when get_value is True. Object name when dest is a backend.
         '''
+        md5_checksum = self.get(file_id=file_id, fields='md5Checksum').get('md5Checksum') if verify else None
+
+        if dest is not None:
+            url = f"https://www.googleapis.com/drive/v3/files/{file_id}?alt=media&supportsAllDrives=true"
+            name = self.get(file_id=file_id, fields='name')['name'] if is_backend(dest) else None
+            return self._stream_to(file_id, url, dest, name, dest_directory, md5_checksum, raise_errors)
 
         # https://developers.google.com/drive/api/guides/manage-downloads
         try:
-            request = self.drive.service.files().get_media(fileId=file_id)
-            file = io.BytesIO()
-            downloader = MediaIoBaseDownload(file, request)
-            done = False
-            while done is False:
-                status, done = downloader.next_chunk()
-                self.drive.print_if_verbose(f"Download {int(status.progress() * 100)}.")
+            for attempt in range(2 if md5_checksum else 1):
+                request = self.drive.service.files().get_media(fileId=file_id, supportsAllDrives=True)
+                file = io.BytesIO()
+                downloader = MediaIoBaseDownload(file, request)
+                done = False
+                while done is False:
+                    status, done = downloader.next_chunk()
+                    self.drive.print_if_verbose(f"Download {int(status.progress() * 100)}.")
+
+                if not md5_checksum or self._check_md5(file_id, md5_checksum, hashlib.md5(file.getbuffer()).hexdigest()):
+                    break
+                if attempt:
+                    raise IOError(f"Checksum mismatch after downloading {file_id}")
 
             if not get_value:
                 file_info = self.get(file_id)
@@ -282,17 +650,35 @@ class Files:
                 return file.getvalue()
 
         except HttpError as error:
+            if raise_errors:
+                raise
             print(f"An error occurred: {error}")
 
 
-    def export(self, file_id, format='default', dest_directory=None, get_value=False):
+    def open(self, file_id, block_size=1024 * 1024, cache_blocks=64, cache_directory=None, read_ahead=4):
+        '''
+        Open a file for lazy reading, e.g. by zipfile, pyarrow or pandas. Only the blocks read are downloaded, with HTTP Range requests.
+        :param file_id: File ID, not a Google Workspace file.
+        :param block_size: Bytes per block.
+        :param cache_blocks: Number of blocks kept in memory (LRU).
+        :param cache_directory: Directory of a temporary file for blocks evicted from memory (optional). None to drop them.
+        :param read_ahead: Number of blocks fetched in one request when reading sequentially.
+        :return: A seekable read-only file object (io.RawIOBase).
+        '''
+        file = RemoteFile(self.drive, file_id, block_size=block_size, cache_blocks=cache_blocks, cache_directory=cache_directory, read_ahead=read_ahead)
+        self.drive.print_if_verbose(f"{Fore.BLUE}Opened {Fore.RESET}{file.name}{Fore.BLUE}, {Fore.RESET}{file.size:,} bytes")
+        return file
+
+    def export(self, file_id, format='default', dest_directory=None, get_value=False, dest=None, raise_errors=False):
         '''
         Export the Google Workspace documents.
         :param file_id: File ID
         :param format: xlsx, docx, pdf, pptx, json, csv, etc. Defaults to 'default' (Sheets:xlsx, Docs:docx, Slides:pptx, Drawings:pdf, AppScript:json). Read more: https://developers.google.com/drive/api/guides/ref-export-formats.
-        :param dest_directory: Destination directory (optional). None to save the file to current directory.
+        :param dest_directory: Destination directory (optional). None to save the file to current directory. A name prefix when dest is a backend.
         :param get_value: False to save the file, True to get the file value only,
-        :return: File value when get_value is True.
+        :param dest: A writable file-like object or a storage backend (LocalBackend, MemoryBackend, S3Backend, ...) to stream the file to in chunks (optional).
+        :param raise_errors: True to raise HttpError instead of printing it and returning None, e.g. to retry it.
+        :return: File value when get_value is True. Object name when dest is a backend.
         '''
 
         # Prepare export mimeType and format (file mimeType is different with export mimeType)
@@ -305,26 +691,16 @@ class Files:
             raise ValueError(
                 f"You can export {file_id} with formats: {'; '.join(export_formats)}, because it is {file_mime_type}. Read more: https://developers.google.com/drive/api/guides/ref-export-formats")
 
-        # https://developers.google.com/drive/api/guides/ref-export-formats
-        default_export_mime_types = {
-            # Documents
-            MimeTypes.DOCS.value: MimeTypes.DOCX,
-            # Spreadsheets
-            MimeTypes.SHEETS.value: MimeTypes.XLSX,
-            # Presentations
-            MimeTypes.SLIDES.value: MimeTypes.PPTX,
-            # Drawings
-            MimeTypes.DRAWINGS.value: MimeTypes.PDF,
-            # Apps Script
-            MimeTypes.APPS_SCRIPT.value: MimeTypes.JSON
-        }
-
         if format == 'default':
-            export_mime_type = default_export_mime_types[file_mime_type].value
-            format = default_export_mime_types[file_mime_type].name.lower()
+            export_mime_type = self.default_export_mime_types[file_mime_type].value
+            format = self.default_export_mime_types[file_mime_type].name.lower()
         else:
             export_mime_type = export_formats[format]
 
+        if dest is not None:
+            url = f"https://www.googleapis.com/drive/v3/files/{file_id}/export?mimeType={urllib.parse.quote(export_mime_type, safe='')}"
+            return self._stream_to(file_id, url, dest, f"{file_info.get('name')}.{format}", dest_directory, raise_errors=raise_errors)
+
         # https://developers.google.com/drive/api/guides/manage-downloads
         try:
             request = self.drive.service.files().export_media(fileId=file_id, mimeType=export_mime_type)
@@ -353,9 +729,483 @@ class Files:
 
 
         except HttpError as error:
+            if raise_errors:
+                raise
             print(f"An error occurred: {error}")
 
 
+    def _stream_to(self, file_id, url, dest, name, dest_directory=None, md5_checksum=None, raise_errors=False):
+        if name and dest_directory:
+            name = posixpath.join(dest_directory, name)
+        # A backend object is simply written again, a file-like object only if it can be rewound
+        start = dest.tell() if md5_checksum and not is_backend(dest) and getattr(dest, 'seekable', lambda: False)() else None
+        try:
+            for attempt in range(2 if md5_checksum else 1):
+                with self.drive.http.open_stream(url) as response:
+                    with dest.open_write(name) if is_backend(dest) else contextlib.nullcontext(dest) as f:
+                        if md5_checksum:
+                            actual = self._copy_hashed(response, f)
+                        else:
+                            shutil.copyfileobj(response, f, self.STREAM_CHUNK_SIZE)
+
+                if not md5_checksum or self._check_md5(file_id, md5_checksum, actual):
+                    break
+                if attempt or (not is_backend(dest) and start is None):
+                    raise IOError(f"Checksum mismatch after downloading {file_id}")
+                if start is not None:
+                    dest.seek(start)
+                    dest.truncate()
+        except HttpError as error:
+            if raise_errors:
+                raise
+            print(f"An error occurred: {error}")
+            return
+
+        self.drive.print_if_verbose(f"{Fore.GREEN}Saved {Fore.RESET}{file_id}{Fore.GREEN} as {Fore.RESET}{name if name else type(dest).__name__}")
+        return name
+
+    def _copy_hashed(self, response, f):
+        # Copy a stream and compute its MD5 checksum in the same pass
+        md5 = hashlib.md5()
+        for chunk in iter(lambda: response.read(self.STREAM_CHUNK_SIZE), b''):
+            md5.update(chunk)
+            f.write(chunk)
+        return md5.hexdigest()
+
+    def _check_md5(self, file_id, expected, actual):
+        if expected == actual:
+            return True
+        self.drive.print_if_verbose(f"{Fore.RED}Checksum mismatch of {Fore.RESET}{file_id}{Fore.RED}: expected {Fore.RESET}{expected}{Fore.RED}, got {Fore.RESET}{actual}")
+        return False
+
+    def export_rows(self, file_id, gid=None):
+        '''
+        Stream a Google Sheets file as CSV rows while it is downloading, with constant memory.
+        :param file_id: Sheets file ID.
+        :param gid: Sheet (tab) ID, the number after #gid= in the URL (optional). None for the first sheet.
+        :return: Generator of rows as lists of strings, the header row first.
+        '''
+        # The Sheets export link has no size cap, unlike files.export which fails above 10 MB with exportSizeLimitExceeded
+        url = f"https://docs.google.com/spreadsheets/d/{file_id}/export?format=csv"
+        if gid is not None:
+            url += f"&gid={gid}"
+
+        with self.drive.http.open_stream(url) as response:
+            yield from csv.reader(io.TextIOWrapper(response, encoding='utf-8', newline=''))
+
+    def export_record_batches(self, file_id, gid=None, batch_size=10000, schema=None):
+        '''
+        Stream a Google Sheets file as pyarrow RecordBatches while it is downloading, with constant memory.
+        Every batch has the same schema, so they can go to pa.Table.from_batches or a ParquetWriter.
+        :param file_id: Sheets file ID.
+        :param gid: Sheet (tab) ID (optional). None for the first sheet.
+        :param batch_size: Number of rows per batch.
+        :param schema: pyarrow.Schema of the columns (optional). None to infer int64, double or string per column from the first batch. A later value that does not fit raises ValueError.
+        :return: Generator of pyarrow.RecordBatch.
+        '''
+        import pyarrow as pa
+
+        rows = self.export_rows(file_id=file_id, gid=gid)
+        header = next(rows, None)
+        if header is None:
+            return
+        if schema is not None and len(schema) != len(header):
+            raise ValueError(f"schema has {len(schema)} columns, the sheet has {len(header)}: {header}")
+
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= batch_size:
+                schema = self._infer_schema(header, batch) if schema is None else schema
+                yield self._record_batch(batch, schema)
+                batch = []
+        if batch:
+            schema = self._infer_schema(header, batch) if schema is None else schema
+            yield self._record_batch(batch, schema)
+
+    @staticmethod
+    def _infer_schema(header, rows):
+        # The narrowest of int64, double and string that fits every value of a column
+        import pyarrow as pa
+
+        fields = []
+        for i, name in enumerate(header):
+            values = [row[i] for row in rows if i < len(row) and row[i] != '']
+            for type, parse in ((pa.int64(), int), (pa.float64(), float), (pa.string(), str)):
+                try:
+                    for value in values:
+                        parse(value)
+                    break
+                except (ValueError, OverflowError):
+                    continue
+            fields.append((name, type))
+        return pa.schema(fields)
+
+    @staticmethod
+    def _record_batch(rows, schema):
+        import pyarrow as pa
+
+        columns = []
+        for i, field in enumerate(schema):
+            values = [row[i] if i < len(row) else '' for row in rows]
+            try:
+                if field.type == pa.int64():
+                    column = pa.array([int(value) if value != '' else None for value in values], type=pa.int64())
+                elif field.type == pa.float64():
+                    column = pa.array([float(value) if value != '' else None for value in values], type=pa.float64())
+                else:
+                    column = pa.array([value if value != '' else None for value in values], type=pa.string())
+                    if field.type != pa.string():
+                        column = column.cast(field.type)
+            except (ValueError, OverflowError, pa.ArrowInvalid) as error:
+                raise ValueError(f"Column {field.name} does not fit {field.type}, pass a schema: {error}") from error
+            columns.append(column)
+        return pa.RecordBatch.from_arrays(columns, schema=schema)
+
+    def export_folder(self, folder_id=None, query=None, dest_directory='.', formats=None, download_others=False, drive_id=None, max_workers=8, retries=3):
+        '''
+        Export many Google Workspace files concurrently. The metadata comes from one listing pass and the folder tree is mirrored on disk.
+        :param folder_id: Root folder ID, the whole tree is exported.
+        :param query: Search query instead of folder_id, files are saved flat in dest_directory (optional).
+        :param dest_directory: Destination directory.
+        :param formats: Export format per mimeType, e.g. {MimeTypes.SHEETS: 'csv'} (optional). Others use default_export_mime_types.
+        :param download_others: True to also download files that are not Google Workspace files.
+        :param drive_id: Shared drive ID when the folder is in a shared drive (optional).
+        :param max_workers: Number of threads.
+        :param retries: Number of retries of a file after a throttling or server error.
+        :return: List of saved file paths.
+        '''
+        if (folder_id is None) == (query is None):
+            raise ValueError("Please provide exactly one of folder_id or query.")
+
+        formats = {(k.value if isinstance(k, Enum) else k): v for k, v in (formats or {}).items()}
+        files = list(self._iter_tree_files(folder_id, query, 'id, name, mimeType, parents, exportLinks', drive_id, max_workers))
+
+        # Names are made unique before the threads start, two files with the same name would write to the same path
+        tasks = []
+        names = set()
+        for directory, file in files:
+            try:
+                target = self._export_target(file, formats, download_others)
+            except ValueError as error:
+                print(f"An error occurred: {file['id']} {error}")
+                continue
+            if target is None:
+                continue
+            name, url = target
+            name = self._unique_name(posixpath.join(directory, name) if directory else name, names)
+            names.add(name)
+            tasks.append((file, os.path.join(dest_directory, *name.split('/')), url))
+
+        def export_file(task):
+            file, path, url = task
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+
+            def fetch():
+                with self.drive.http.open_stream(url) as response, open(path, 'wb') as f:
+                    shutil.copyfileobj(response, f, self.STREAM_CHUNK_SIZE)
+
+            call_with_retries(fetch, retries=retries)
+            return path
+
+        paths = []
+        for (file, _, _), path, error in iter_concurrently(export_file, tasks, max_workers=max_workers):
+            if error:
+                print(f"An error occurred: {file['id']} {error}")
+            else:
+                paths.append(path)
+                self.drive.print_if_verbose(f"{Fore.GREEN}Saved {Fore.RESET}{file['id']}{Fore.GREEN} as {Fore.RESET}{path}")
+
+        self.drive.print_if_verbose(f"{Fore.GREEN}Exported {Fore.RESET}{len(paths)}{Fore.GREEN} of {Fore.RESET}{len(files)}{Fore.GREEN} files to {Fore.RESET}{dest_directory}")
+        return paths
+
+    def download_folder_as_archive(self, folder_id, dest=None, format='zip', formats=None, download_others=True, drive_id=None,
+                                   max_workers=8, retries=3, spool_size=8 * 1024 * 1024):
+        '''
+        Download a folder tree as one archive, streaming files into the archive as they arrive. Google Workspace files are exported.
+        Memory is bounded: each file in flight is spooled to a temporary file beyond spool_size.
+        :param folder_id: Root folder ID, the whole tree is archived under the folder name.
+        :param dest: Archive file path or a writable file-like object (optional). None to get a generator of bytes, e.g. for an HTTP response.
+        :param format: zip, tar, tar.gz or tar.zst (requires zstandard).
+        :param formats: Export format per mimeType, e.g. {MimeTypes.SHEETS: 'csv'} (optional). Others use default_export_mime_types.
+        :param download_others: True to also include files that are not Google Workspace files.
+        :param drive_id: Shared drive ID when the folder is in a shared drive (optional).
+        :param max_workers: Number of threads.
+        :param retries: Number of retries of a file after a throttling or server error.
+        :param spool_size: Bytes of a file kept in memory before spilling to a temporary file.
+        :return: Generator of bytes when dest is None, otherwise list of archived names.
+        '''
+        if format not in self.ARCHIVE_FORMATS:
+            raise ValueError(f"format must be one of: {'; '.join(self.ARCHIVE_FORMATS)}")
+        if format == 'tar.zst':
+            try:
+                import zstandard
+            except ImportError:
+                raise ImportError("tar.zst requires zstandard, please install it: pip install zstandard")
+
+        chunks = self._iter_archive(folder_id, format, formats, download_others, drive_id, max_workers, retries, spool_size)
+        if dest is None:
+            return chunks
+
+        with open(dest, 'wb') if isinstance(dest, (str, os.PathLike)) else contextlib.nullcontext(dest) as f:
+            for chunk in chunks:
+                f.write(chunk)
+        return chunks.names
+
+    def _iter_archive(self, folder_id, format, formats, download_others, drive_id, max_workers, retries, spool_size):
+        formats = {(k.value if isinstance(k, Enum) else k): v for k, v in (formats or {}).items()}
+        root = self.drive.service.files().get(fileId=folder_id, fields='name', supportsAllDrives=True).execute()
+        root_name = root['name'].replace('/', '_')
+        files = self._iter_tree_files(folder_id, None, 'id, name, mimeType, parents, exportLinks, modifiedTime', drive_id, max_workers)
+
+        def fetch_file(item):
+            directory, file = item
+            target = self._export_target(file, formats, download_others)
+            if target is None:
+                return None
+            name, url = target
+
+            def fetch():
+                spool = tempfile.SpooledTemporaryFile(max_size=spool_size)
+                try:
+                    with self.drive.http.open_stream(url) as response:
+                        shutil.copyfileobj(response, spool, self.STREAM_CHUNK_SIZE)
+                except BaseException:
+                    spool.close()
+                    raise
+                return spool
+
+            spool = call_with_retries(fetch, retries=retries)
+            return posixpath.join(root_name, directory, name), spool
+
+        return _ArchiveStream(self._write_archive(format, iter_concurrently(fetch_file, files, max_workers=max_workers)))
+
+    def _write_archive(self, format, results):
+        out = _ChunkWriter()
+        names = set()
+        if format == 'zip':
+            archive = zipfile.ZipFile(out, 'w', compression=zipfile.ZIP_DEFLATED, allowZip64=True)
+        elif format == 'tar.zst':
+            import zstandard
+            compressor = zstandard.ZstdCompressor().stream_writer(out, closefd=False)
+            archive = tarfile.open(fileobj=compressor, mode='w|')
+        else:
+            archive = tarfile.open(fileobj=out, mode='w|gz' if format == 'tar.gz' else 'w|')
+
+        for (directory, file), result, error in results:
+            if error:
+                print(f"An error occurred: {file['id']} {error}")
+                continue
+            if result is None:
+                continue
+
+            name, spool = result
+            name = self._unique_name(name, names)
+            names.add(name)
+            modified = _to_datetime(file.get('modifiedTime'))
+            with spool:
+                size = spool.tell()
+                spool.seek(0)
+                if format == 'zip':
+                    info = zipfile.ZipInfo(name, date_time=max(modified, datetime(1980, 1, 1, tzinfo=timezone.utc)).timetuple()[:6])
+                    info.compress_type = zipfile.ZIP_DEFLATED
+                    info.file_size = size
+                    with archive.open(info, 'w', force_zip64=size > 0x7FFFFFFF) as entry:
+                        for chunk in iter(lambda: spool.read(self.STREAM_CHUNK_SIZE), b''):
+                            entry.write(chunk)
+                            yield out.drain()
+                else:
+                    info = tarfile.TarInfo(name)
+                    info.size = size
+                    info.mtime = modified.timestamp()
+                    # Like TarFile.addfile, but drained chunk by chunk instead of copying the whole file at once
+                    header = info.tobuf(archive.format, archive.encoding, archive.errors)
+                    archive.fileobj.write(header)
+                    for chunk in iter(lambda: spool.read(self.STREAM_CHUNK_SIZE), b''):
+                        archive.fileobj.write(chunk)
+                        yield out.drain()
+                    blocks, remainder = divmod(size, tarfile.BLOCKSIZE)
+                    if remainder:
+                        archive.fileobj.write(tarfile.NUL * (tarfile.BLOCKSIZE - remainder))
+                        blocks += 1
+                    archive.offset += len(header) + blocks * tarfile.BLOCKSIZE
+                    archive.members.append(info)
+            yield out.drain()
+            self.drive.print_if_verbose(f"{Fore.GREEN}Archived {Fore.RESET}{file['id']}{Fore.GREEN} as {Fore.RESET}{name}")
+
+        archive.close()
+        if format == 'tar.zst':
+            compressor.close()
+        yield out.drain()
+        return sorted(names)
+
+    @staticmethod
+    def _unique_name(name, names):
+        # Drive allows the same name twice in a folder, an archive should not
+        if name not in names:
+            return name
+        stem, extension = posixpath.splitext(name)
+        i = 1
+        while f"{stem} ({i}){extension}" in names:
+            i += 1
+        return f"{stem} ({i}){extension}"
+
+    def _iter_tree_files(self, folder_id, query, fields, drive_id, max_workers):
+        # (relative directory, file) of every file, the folder tree is rebuilt from the listing
+        directories = {folder_id: ''} if folder_id else {}
+        if folder_id:
+            listing = self.walk(folder_id, fields=fields, drive_id=drive_id, max_workers=max_workers)
+        else:
+            listing = ((None, file) for file in self._iter_files(q=query, fields=fields, drive_id=drive_id))
+        for parent, file in listing:
+            if file['mimeType'] == MimeTypes.FOLDER.value:
+                directories[file['id']] = posixpath.join(directories[parent], file['name'].replace('/', '_'))
+            else:
+                yield directories.get(parent, ''), file
+
+    def _export_target(self, file, formats, download_others):
+        # (file name, URL) to fetch a file, None to skip it
+        name = file['name'].replace('/', '_')
+        export_links = file.get('exportLinks')
+        if export_links:
+            export_formats = {export_links[v].split('=')[-1]: v for v in export_links}
+            format = formats.get(file['mimeType'])
+            if format is None:
+                default_mime_type = self.default_export_mime_types.get(file['mimeType'])
+                if default_mime_type is None or default_mime_type.value not in export_links:
+                    return None
+                format = default_mime_type.name.lower()
+                url = export_links[default_mime_type.value]
+            elif format in export_formats:
+                url = export_links[export_formats[format]]
+            else:
+                raise ValueError(f"You can export {file['id']} with formats: {'; '.join(export_formats)}")
+            return f"{name}.{format}", url
+
+        if download_others and not file['mimeType'].startswith('application/vnd.google-apps.'):
+            return name, f"https://www.googleapis.com/drive/v3/files/{file['id']}?alt=media&supportsAllDrives=true"
+        return None
+
+    def verify(self, local_directory, folder_id, repair=None, drive_id=None, processes=None, max_workers=8, retries=3):
+        '''
+        Verify a local directory tree against a folder tree on the Drive by md5Checksum. Local files are hashed in a process pool
+        with memory-mapped reads, and only when the sizes are equal. Google Workspace files and shortcuts are ignored (no md5Checksum).
+        :param local_directory: Local directory.
+        :param folder_id: Root folder ID.
+        :param repair: None to only report. download: fetch mismatched and missing local files from the Drive. upload: send mismatched files as a new revision and upload missing ones, creating missing folders.
+        :param drive_id: Shared drive ID when the folder is in a shared drive (optional).
+        :param processes: Number of hashing processes. None for the number of CPUs.
+        :param max_workers: Number of threads for listing and repairs.
+        :param retries: Number of retries of a repair after a throttling or server error.
+        :return: List of {path, id, status, size, local_size, md5Checksum, local_md5Checksum}, status is ok, mismatch, missing_local, missing_remote or error. Repaired entries have repaired=True.
+        '''
+        if repair is not None and repair not in self.VERIFY_REPAIRS:
+            raise ValueError(f"repair must be one of: {'; '.join(self.VERIFY_REPAIRS)}")
+
+        # Relative posix paths on both sides, the folder tree is rebuilt from one listing pass
+        directories = {folder_id: ''}
+        folders = {'': folder_id}
+        remote = {}
+        for parent, file in self.walk(folder_id, fields='id, name, mimeType, parents, size, md5Checksum', drive_id=drive_id, max_workers=max_workers):
+            path = posixpath.join(directories[parent], file['name'].replace('/', '_'))
+            if file['mimeType'] == MimeTypes.FOLDER.value:
+                directories[file['id']] = path
+                folders.setdefault(path, file['id'])
+            elif 'md5Checksum' in file:
+                remote.setdefault(path, file)
+
+        local = {}
+        for directory, _, names in os.walk(local_directory):
+            for name in names:
+                path = os.path.join(directory, name)
+                local[os.path.relpath(path, local_directory).replace(os.sep, '/')] = path
+
+        entries = {}
+        to_hash = []
+        for relative in sorted(remote.keys() | local.keys()):
+            file = remote.get(relative)
+            path = local.get(relative) or os.path.join(local_directory, *relative.split('/'))
+            entry = {'path': path, 'id': file['id'] if file else None, 'status': None,
+                     'size': int(file['size']) if file else None, 'local_size': os.path.getsize(path) if relative in local else None,
+                     'md5Checksum': file['md5Checksum'] if file else None, 'local_md5Checksum': None}
+            if file is None:
+                entry['status'] = 'missing_remote'
+            elif relative not in local:
+                entry['status'] = 'missing_local'
+            elif entry['size'] != entry['local_size']:
+                entry['status'] = 'mismatch'
+            else:
+                to_hash.append(path)
+            entries[path] = entry
+
+        for path, result, error in md5_files(to_hash, processes=processes):
+            entry = entries[path]
+            if error:
+                entry['status'] = 'error'
+                entry['error'] = str(error)
+                continue
+            entry['local_md5Checksum'] = result[0]
+            entry['status'] = 'ok' if result[0] == entry['md5Checksum'] else 'mismatch'
+
+        report = list(entries.values())
+        for entry in report:
+            if entry['status'] != 'ok':
+                self.drive.print_if_verbose(f"{Fore.RED if entry['status'] in ('mismatch', 'error') else Fore.YELLOW}{entry['status'].capitalize().replace('_', ' ')}: {Fore.RESET}{entry['path']}")
+
+        if repair:
+            self._repair(report, repair, local_directory, folders, max_workers, retries)
+
+        counts = {}
+        for entry in report:
+            counts[entry['status']] = counts.get(entry['status'], 0) + 1
+        self.drive.print_if_verbose(f"{Fore.BLUE}Verified {Fore.RESET}{len(report)}{Fore.BLUE} files: {Fore.RESET}{', '.join(f'{count} {status}' for status, count in sorted(counts.items()))}")
+        return report
+
+    def _repair(self, report, repair, local_directory, folders, max_workers, retries):
+        if repair == 'download':
+            todo = [entry for entry in report if entry['status'] in ('mismatch', 'missing_local')]
+        else:
+            todo = [entry for entry in report if entry['status'] in ('mismatch', 'missing_remote')]
+            # Missing folders are created before the concurrent uploads
+            for entry in todo:
+                if entry['status'] == 'missing_remote':
+                    self._ensure_folder(folders, os.path.dirname(os.path.relpath(entry['path'], local_directory)).replace(os.sep, '/'))
+
+        def repair_file(entry):
+            if repair == 'download':
+                os.makedirs(os.path.dirname(entry['path']) or '.', exist_ok=True)
+                url = f"https://www.googleapis.com/drive/v3/files/{entry['id']}?alt=media&supportsAllDrives=true"
+
+                def fetch():
+                    for attempt in range(2):
+                        with self.drive.http.open_stream(url) as response, open(entry['path'], 'wb') as f:
+                            actual = self._copy_hashed(response, f)
+                        if self._check_md5(entry['id'], entry['md5Checksum'], actual):
+                            return
+                    raise IOError(f"Checksum mismatch after downloading {entry['id']}")
+
+                call_with_retries(fetch, retries=retries)
+            elif entry['status'] == 'mismatch':
+                call_with_retries(lambda: self.update_content(file_id=entry['id'], file=entry['path']), retries=retries)
+            else:
+                directory = os.path.dirname(os.path.relpath(entry['path'], local_directory)).replace(os.sep, '/')
+                new_file = call_with_retries(lambda: self.upload(file=entry['path'], dest_folder_id=folders[directory], verify=True), retries=retries)
+                entry['id'] = new_file['id']
+
+        for entry, _, error in iter_concurrently(repair_file, todo, max_workers=max_workers):
+            if error:
+                print(f"An error occurred: {entry['path']} {error}")
+            else:
+                entry['repaired'] = True
+                self.drive.print_if_verbose(f"{Fore.GREEN}Repaired {Fore.RESET}{entry['path']}{Fore.GREEN} by {repair}")
+
+    def _ensure_folder(self, folders, directory):
+        # Folder ID of a relative directory, missing folders are created top-down
+        if directory not in folders:
+            parent = self._ensure_folder(folders, posixpath.dirname(directory))
+            folders[directory] = self.create(name=posixpath.basename(directory), mime_type=MimeTypes.FOLDER, dest_folder_id=parent)['id']
+        return folders[directory]
+
     def empty_trash(self):
         '''
         Empty the trash.
@@ -372,7 +1222,7 @@ class Files:
         '''
         body = {'trashed': not restore}
         result = self.drive.service.files().update(fileId=file_id, body=body,
-                                                   fields=self.default_file_fields).execute()
+                                                   fields=self.default_file_fields, supportsAllDrives=True).execute()
         if restore:
             self.drive.print_if_verbose(
                 f"{Fore.GREEN}Restored {Fore.RESET}{file_id}{Fore.GREEN} from trash{Fore.RESET}")
@@ -385,5 +1235,53 @@ class Files:
         Delete a file or folder.
         :param file_id: File | folder ID.
         '''
-        self.drive.service.files().delete(fileId=file_id).execute()
+        self.drive.service.files().delete(fileId=file_id, supportsAllDrives=True).execute()
         self.drive.print_if_verbose(f"{Fore.RED}Deleted {Fore.RESET}{file_id}")
+
+
+def _to_datetime(value):
+    if not value:
+        return datetime.now(timezone.utc)
+    return datetime.fromisoformat(value.replace('Z', '+00:00'))
+
+
+class _ChunkWriter:
+    # A non-seekable sink, archive writers append to it and the archive generator drains it
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        if data:
+            self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+class _ArchiveStream:
+    # Iterate archive bytes, the archived names are available once it is exhausted
+    def __init__(self, generator):
+        self.generator = generator
+        self.names = None
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        while True:
+            try:
+                chunk = next(self.generator)
+            except StopIteration as stop:
+                self.names = stop.value
+                raise
+            if chunk:
+                return chunk
+
+    def close(self):
+        self.generator.close()
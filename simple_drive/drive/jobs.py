@@ -0,0 +1,141 @@
+import hashlib
+import json
+import sqlite3
+import time
+
+from colorama import Fore
+
+from ..utils import call_with_retries, iter_concurrently
+from .pool import DrivePool
+
+
+class BulkJob:
+    def __init__(self, drive, journal='simple_drive_job.sqlite', retries=5, backoff_seconds=2):
+        '''
+        Run many Drive operations concurrently and record the status of each one in a SQLite journal, so a restarted job skips completed work.
+        :param drive: Drive or DrivePool.
+        :param journal: SQLite journal file.
+        :param retries: Number of retries of an operation after a throttling or server error.
+        :param backoff_seconds: First wait before a retry, doubled on each retry.
+        '''
+        self.drive = drive
+        self.journal = journal
+        self.retries = retries
+        self.backoff_seconds = backoff_seconds
+
+        self.connection = sqlite3.connect(journal)
+        # Each finished operation is committed, WAL keeps these commits cheap and survives a killed process
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('PRAGMA synchronous=NORMAL')
+        self.connection.execute('''
+            CREATE TABLE IF NOT EXISTS operations (
+                key TEXT PRIMARY KEY,
+                method TEXT,
+                kwargs TEXT,
+                status TEXT,
+                result TEXT,
+                error TEXT,
+                updated_at REAL
+            )''')
+        self.connection.commit()
+
+    @staticmethod
+    def operation_key(method, kwargs):
+        '''
+        Key of an operation in the journal, the same method and arguments always give the same key.
+        :param method: e.g. 'Files.move'.
+        :param kwargs: Arguments as dict.
+        :return: Key.
+        '''
+        payload = json.dumps([method, kwargs], sort_keys=True, default=str)
+        return hashlib.sha1(payload.encode()).hexdigest()
+
+    def run(self, operations, max_workers=8, progress_seconds=5):
+        '''
+        Run operations, skipping the ones already done in the journal. An operation listed more than once runs once.
+        :param operations: A list of (method, kwargs), e.g. [('Files.move', {'file_id': 'AbcFileId', 'dest_folder_id': 'MyFolderId'})].
+            method is '<Resource>.<function>' of Drive, e.g. Files.trash, Files.delete, Permissions.transfer_ownership.
+        :param max_workers: Number of threads.
+        :param progress_seconds: Print progress (throughput and ETA) at most this often.
+        :return: Status counts of this job, see status().
+        '''
+        done_keys = {row[0] for row in self.connection.execute("SELECT key FROM operations WHERE status = 'done'")}
+
+        todo = []
+        queued = set()
+        repeated = 0
+        for method, kwargs in operations:
+            key = self.operation_key(method, kwargs)
+            if key in queued:
+                repeated += 1
+            elif key not in done_keys:
+                queued.add(key)
+                todo.append((key, method, kwargs))
+                self.connection.execute("INSERT OR IGNORE INTO operations (key, method, kwargs, status, updated_at) VALUES (?, ?, ?, 'pending', ?)",
+                                        (key, method, json.dumps(kwargs, default=str), time.time()))
+        self.connection.commit()
+
+        if repeated:
+            self._print_if_verbose(f"{Fore.YELLOW}Skipped {Fore.RESET}{repeated}{Fore.YELLOW} repeated operations")
+        skipped = len(operations) - len(todo) - repeated
+        if skipped:
+            self._print_if_verbose(f"{Fore.YELLOW}Skipped {Fore.RESET}{skipped}{Fore.YELLOW} operations done in {Fore.RESET}{self.journal}")
+
+        started = last_print = time.time()
+        finished = failed = 0
+        for (key, method, kwargs), result, error in iter_concurrently(self._execute, todo, max_workers=max_workers):
+            if error:
+                failed += 1
+                self.connection.execute("UPDATE operations SET status = 'failed', error = ?, updated_at = ? WHERE key = ?",
+                                        (str(error), time.time(), key))
+            else:
+                self.connection.execute("UPDATE operations SET status = 'done', result = ?, error = NULL, updated_at = ? WHERE key = ?",
+                                        (json.dumps(result, default=str), time.time(), key))
+            # Commit right away, so a killed job does not run finished operations again
+            self.connection.commit()
+            finished += 1
+
+            now = time.time()
+            if now - last_print >= progress_seconds or finished == len(todo):
+                last_print = now
+                rate = finished / max(now - started, 1e-9)
+                eta = (len(todo) - finished) / rate if rate else 0
+                self._print_if_verbose(f"{Fore.BLUE}Progress {Fore.RESET}{finished}/{len(todo)} ({failed} failed){Fore.BLUE}, {Fore.RESET}{rate:0,.1f} ops/s{Fore.BLUE}, ETA {Fore.RESET}{eta:0,.0f}s")
+
+        return self.status()
+
+    def _execute(self, operation):
+        key, method, kwargs = operation
+        resource, function = method.split('.')
+
+        if isinstance(self.drive, DrivePool):
+            # DrivePool moves throttled operations to other accounts, server errors are retried here
+            call = lambda: self.drive.run(lambda drive: getattr(getattr(drive, resource), function)(**kwargs))
+        else:
+            func = getattr(getattr(self.drive, resource), function)
+            call = lambda: func(**kwargs)
+        return call_with_retries(call, retries=self.retries, backoff_seconds=self.backoff_seconds)
+
+    def status(self):
+        '''
+        Count operations in the journal by status.
+        :return: Dict of status (pending, done, failed) to count.
+        '''
+        rows = self.connection.execute("SELECT status, COUNT(*) FROM operations GROUP BY status").fetchall()
+        return {'pending': 0, 'done': 0, 'failed': 0, **dict(rows)}
+
+    def failures(self):
+        '''
+        Get failed operations.
+        :return: List of (method, kwargs, error).
+        '''
+        rows = self.connection.execute("SELECT method, kwargs, error FROM operations WHERE status = 'failed'").fetchall()
+        return [(method, json.loads(kwargs), error) for method, kwargs, error in rows]
+
+    def close(self):
+        self.connection.close()
+
+    # Support
+    def _print_if_verbose(self, *args):
+        if getattr(self.drive, 'verbose', True):
+            print(*args)
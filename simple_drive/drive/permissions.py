@@ -40,7 +40,7 @@ class Permissions:
         elif domain:
             body = {"type": "domain", "role": role_value, "domain": domain}
 
-        result = self.drive.service.permissions().create(fileId=file_id, body=body, fields="*").execute()
+        result = self.drive.service.permissions().create(fileId=file_id, body=body, fields="*", supportsAllDrives=True).execute()
 
         self.drive.print_if_verbose(f"{Fore.GREEN}Added {Fore.RESET}{role_name} {Fore.GREEN}permission for {Fore.RESET}{email or domain} {Fore.GREEN}to {Fore.RESET}{file_id}")
         return result
@@ -57,8 +57,7 @@ class Permissions:
         email = email.lower().strip()
 
         if not self.email_address:
-            about = self.drive.service.about().get(fields='*').execute()
-            self.email_address = about['user']['emailAddress']
+            self.email_address = self.drive.About.get_email_address()
 
         current_domain = self.email_address.split('@')[-1]
         new_domain = email.split('@')[-1]
@@ -68,18 +67,18 @@ class Permissions:
 
         if '@gmail.' not in email:
             body = {'type': 'user', 'role': 'owner', 'emailAddress': email}
-            result = self.drive.service.permissions().create(fileId=file_id, body=body, transferOwnership=True, fields='*').execute()
+            result = self.drive.service.permissions().create(fileId=file_id, body=body, transferOwnership=True, fields='*', supportsAllDrives=True).execute()
             self.drive.print_if_verbose(f"{Fore.BLUE}Transferred Ownership of {Fore.RESET}{file_id} {Fore.BLUE}to {Fore.RESET}{email}")
         else:
             # https://developers.google.com/drive/api/guides/manage-sharing?hl=vi#transfer-consumer-account
             # pendingOwner does not work as the docs, it maybe a bug, hope it will be fixed in the future.
             body = {"type": "user", "role": 'writer', "emailAddress": email, 'pendingOwner': True}
-            permission = self.drive.service.permissions().create(fileId=file_id, body=body, fields="*").execute()
+            permission = self.drive.service.permissions().create(fileId=file_id, body=body, fields="*", supportsAllDrives=True).execute()
             if not permission.get('pendingOwner'):
                 # https://stackoverflow.com/questions/78308635/unable-to-transfer-ownership-in-google-drive-v3-api-in-my-node-project
                 # pendingOwner will works in update command, but the new owner will not receive any notification. Fortunately, the create command above will send a notification about sharing file.
                 body = {'role': 'writer', 'pendingOwner': True}
-                result = self.drive.service.permissions().update(fileId=file_id, permissionId=permission['id'], body=body, fields='*').execute()
+                result = self.drive.service.permissions().update(fileId=file_id, permissionId=permission['id'], body=body, fields='*', supportsAllDrives=True).execute()
             else:
                 result = permission
 
@@ -96,8 +95,7 @@ class Permissions:
         :return: Permission info.
         '''
         if not self.email_address:
-            about = self.drive.service.about().get(fields='*').execute()
-            self.email_address = about['user']['emailAddress']
+            self.email_address = self.drive.About.get_email_address()
 
         if '@gmail.' not in self.email_address:
             current_domain = self.email_address.split('@')[-1]
@@ -110,11 +108,11 @@ class Permissions:
 
         elif accept:
             body = {'type': 'user', 'role': 'owner', 'emailAddress': self.email_address}
-            permission = self.drive.service.permissions().create(fileId=file_id, body=body, transferOwnership=True, fields="*").execute()
+            permission = self.drive.service.permissions().create(fileId=file_id, body=body, transferOwnership=True, fields="*", supportsAllDrives=True).execute()
             self.drive.print_if_verbose(f"{Fore.GREEN}Accepted pending owner of {Fore.RESET}{file_id}")
         elif not accept:
             body = {'role': 'writer' ,'pendingOwner': False}
-            permission = self.drive.service.permissions().update(fileId=file_id, permissionId=permission['id'], body=body,fields='*').execute()
+            permission = self.drive.service.permissions().update(fileId=file_id, permissionId=permission['id'], body=body,fields='*', supportsAllDrives=True).execute()
             self.drive.print_if_verbose(f"{Fore.RED}Declined pending owner of {Fore.RESET}{file_id}")
         return permission
 
@@ -140,7 +138,7 @@ class Permissions:
             permission_id = 'anyoneWithLink'
 
         if permission_id:
-            return self.drive.service.permissions().get(fileId=file_id, permissionId=permission_id, fields='*').execute()
+            return self.drive.service.permissions().get(fileId=file_id, permissionId=permission_id, fields='*', supportsAllDrives=True).execute()
 
         elif email or domain:
             permissions = self.list(file_id=file_id)
@@ -200,7 +198,7 @@ class Permissions:
             else:
                 raise ValueError(f"Permission not found: {email or domain}")
 
-        result = self.drive.service.permissions().update(fileId=file_id, permissionId=permission_id, body=body, fields='*').execute()
+        result = self.drive.service.permissions().update(fileId=file_id, permissionId=permission_id, body=body, fields='*', supportsAllDrives=True).execute()
 
         self.drive.print_if_verbose(f"{Fore.BLUE}Updated {Fore.RESET}{email or domain or permission_id}{Fore.BLUE}'s permission in file {Fore.RESET}{file_id}{Fore.BLUE} to {Fore.RESET}{role_name}")
 
@@ -212,7 +210,7 @@ class Permissions:
         :param file_id: File | folder ID.
         :return: Permission info.
         '''
-        return self.drive.service.permissions().list(fileId=file_id, fields='permissions').execute()['permissions']
+        return self.drive.service.permissions().list(fileId=file_id, fields='permissions', supportsAllDrives=True).execute()['permissions']
 
     def remove(self, file_id, permission_id=None, email=None, domain=None, anyone=False):
         '''
@@ -245,5 +243,5 @@ class Permissions:
             else:
                 raise ValueError(f"Permission not found: {email or domain}")
 
-        self.drive.service.permissions().delete(fileId=file_id, permissionId=permission_id).execute()
+        self.drive.service.permissions().delete(fileId=file_id, permissionId=permission_id, supportsAllDrives=True).execute()
         self.drive.print_if_verbose(f"{Fore.RED}Removed {Fore.RESET}{email or domain or permission_id}{Fore.RED}'s permission from {Fore.RESET}{file_id}")
\ No newline at end of file
@@ -0,0 +1,165 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from colorama import Fore
+
+from . import Drive
+from ..auth import Auth
+from ..utils import is_rate_limited
+
+
+class DrivePool:
+    def __init__(self, auths, subjects=None, verbose=True, throttle_seconds=30, max_throttle_seconds=600):
+        '''
+        Spread calls across several accounts to get past per-user quotas.
+        :param auths: A list of auth info created by the Auth class.
+        :param subjects: User emails to impersonate with domain-wide delegation (optional). Every service account auth is delegated to every subject.
+        :param verbose: Print result.
+        :param throttle_seconds: Seconds an account rests after its first throttling response, doubled on each consecutive one.
+        :param max_throttle_seconds: Upper bound of the rest time.
+        '''
+        self.verbose = verbose
+        self.throttle_seconds = throttle_seconds
+        self.max_throttle_seconds = max_throttle_seconds
+        self._lock = threading.Lock()
+
+        if subjects:
+            auths = [Auth.delegate(auth_info=auth, subject=subject) for auth in auths for subject in subjects]
+
+        self.drives = {}
+        self.subjects = {}
+        self.stats = {}
+        for index, auth in enumerate(auths):
+            name, subject = self._account_name(auth, index)
+            if name in self.drives:
+                raise ValueError(f"Duplicate account: {name}. Please provide each auth (and subject) once.")
+            # Throttles reach run() right away, so the call moves to another account instead of waiting on this one
+            self.drives[name] = Drive(auth=auth, verbose=verbose, throttle_retries=0)
+            self.subjects[name] = subject
+            self.stats[name] = {'in_flight': 0, 'calls': 0, 'errors': 0, 'throttles': 0, 'consecutive_throttles': 0, 'throttled_until': 0}
+
+        if not self.drives:
+            raise ValueError("Please provide at least one auth.")
+
+    @staticmethod
+    def _account_name(auth, index):
+        # (name, impersonated email), the same user can be impersonated by several service accounts
+        credentials = auth.credentials
+        subject = getattr(credentials, '_kwargs', {}).get('sub')
+        service_account_email = getattr(credentials, 'service_account_email', None)
+        id_token = getattr(credentials, 'id_token', None) or {}
+        if subject:
+            return f"{service_account_email or f'account-{index}'}/{subject}", subject
+        return service_account_email or id_token.get('email') or f'account-{index}', None
+
+    @property
+    def accounts(self):
+        '''
+        Account names (<service account email>/<impersonated email>, service account email or account-<index>).
+        '''
+        return list(self.drives)
+
+    def get(self, account=None):
+        '''
+        Get a Drive of the pool.
+        :param account: Account name or impersonated email for operations that need a specific owner (optional). None to pick the least-loaded account that is not throttled.
+        :return: Drive.
+        '''
+        return self.drives[self._pick(account)]
+
+    def _pick(self, account=None, exclude=()):
+        names = list(self.drives)
+        if account is not None:
+            if account in self.drives:
+                return account
+            # An impersonated email, any service account that impersonates it will do
+            names = [name for name, subject in self.subjects.items() if subject == account]
+            if not names:
+                raise ValueError(f"Account not found: {account}. Available accounts: {'; '.join(self.drives)}")
+
+        now = time.time()
+        with self._lock:
+            candidates = [name for name in names if name not in exclude] or names
+            ready = [name for name in candidates if self.stats[name]['throttled_until'] <= now]
+            if ready:
+                return min(ready, key=lambda name: (self.stats[name]['in_flight'], self.stats[name]['calls']))
+            # Every account is throttled, take the one that recovers first
+            return min(candidates, key=lambda name: self.stats[name]['throttled_until'])
+
+    def run(self, func, account=None, retries=3):
+        '''
+        Run a function with a Drive of the pool. Throttled calls are retried on another account.
+        :param func: A function that takes a Drive, e.g. lambda drive: drive.Files.get(file_id).
+        :param account: Account name or impersonated email for operations that need a specific owner (optional).
+        :param retries: Number of retries after a throttling response.
+        :return: The function result.
+        '''
+        tried = []
+        for attempt in range(retries + 1):
+            name = self._pick(account, exclude=tried)
+            tried.append(name)
+
+            wait = self.stats[name]['throttled_until'] - time.time()
+            if wait > 0:
+                time.sleep(wait)
+
+            with self._lock:
+                self.stats[name]['in_flight'] += 1
+                self.stats[name]['calls'] += 1
+            try:
+                result = func(self.drives[name])
+            except Exception as error:
+                with self._lock:
+                    if is_rate_limited(error):
+                        self._mark_throttled(name)
+                    else:
+                        self.stats[name]['errors'] += 1
+                if not is_rate_limited(error) or attempt == retries:
+                    raise
+                self._print_if_verbose(f"{Fore.YELLOW}Throttled {Fore.RESET}{name}{Fore.YELLOW}, retrying{Fore.RESET}")
+            else:
+                with self._lock:
+                    self.stats[name]['consecutive_throttles'] = 0
+                return result
+            finally:
+                with self._lock:
+                    self.stats[name]['in_flight'] -= 1
+
+    def _mark_throttled(self, name):
+        stat = self.stats[name]
+        stat['throttles'] += 1
+        stat['consecutive_throttles'] += 1
+        rest = min(self.throttle_seconds * 2 ** (stat['consecutive_throttles'] - 1), self.max_throttle_seconds)
+        stat['throttled_until'] = time.time() + rest
+
+    def map(self, func, items, max_workers=None, account=None):
+        '''
+        Run a function for many items concurrently across the accounts.
+        :param func: A function that takes a Drive and an item, e.g. lambda drive, file_id: drive.Files.trash(file_id).
+        :param items: A list of items.
+        :param max_workers: Number of threads, defaults to 4 per account.
+        :param account: Account name or impersonated email for operations that need a specific owner (optional).
+        :return: List of results, in the same order as items.
+        '''
+        max_workers = max_workers or 4 * len(self.drives)
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = [executor.submit(self.run, lambda drive, item=item: func(drive, item), account) for item in items]
+            return [future.result() for future in futures]
+
+    def health(self):
+        '''
+        Get the load and throttle state of each account.
+        :return: Dict of account name to stats, including the limiter metrics of the account.
+        '''
+        now = time.time()
+        with self._lock:
+            health = {name: {**stat, 'throttled': stat['throttled_until'] > now} for name, stat in self.stats.items()}
+        for name, drive in self.drives.items():
+            health[name]['limiter'] = drive.limiter.metrics() if drive.limiter else None
+        return health
+
+    # Support
+    def _print_if_verbose(self, *args):
+        if self.verbose:
+            print(*args)
@@ -0,0 +1,144 @@
+import sys
+from array import array
+from datetime import datetime, timezone
+
+
+def _to_millis(value):
+    if not value:
+        return -1
+    return int(datetime.fromisoformat(value.replace('Z', '+00:00')).timestamp() * 1000)
+
+
+def _from_millis(value):
+    if value < 0:
+        return None
+    return datetime.fromtimestamp(value / 1000, tz=timezone.utc).isoformat(timespec='milliseconds').replace('+00:00', 'Z')
+
+
+class FileRecord:
+    '''
+    A compact file info, one attribute per column of FileTable instead of a nested dict.
+    '''
+    __slots__ = ('id', 'name', 'mimeType', 'size', 'parent', 'owner', 'md5Checksum', 'modifiedTime', 'createdTime')
+
+    def __init__(self, id, name, mimeType, size, parent, owner, md5Checksum, modifiedTime, createdTime):
+        self.id = id
+        self.name = name
+        self.mimeType = mimeType
+        self.size = size
+        self.parent = parent
+        self.owner = owner
+        self.md5Checksum = md5Checksum
+        self.modifiedTime = modifiedTime
+        self.createdTime = createdTime
+
+    def to_dict(self):
+        return {key: getattr(self, key) for key in self.__slots__}
+
+    def __repr__(self):
+        return f"FileRecord(id={self.id!r}, name={self.name!r}, mimeType={self.mimeType!r}, size={self.size!r})"
+
+
+class FileTable:
+    '''
+    A columnar table of file info for huge listings.
+    Strings that repeat (mimeType, parent, owner email) are interned, size and times are stored in int64 arrays.
+    '''
+    STRING_COLUMNS = ('id', 'name', 'mimeType', 'parent', 'owner', 'md5Checksum')
+    INTERNED_COLUMNS = ('mimeType', 'parent', 'owner')
+    INT_COLUMNS = ('size', 'modifiedTime', 'createdTime')
+    FIELDS = 'id, name, mimeType, size, parents, owners(emailAddress), md5Checksum, modifiedTime, createdTime'
+
+    def __init__(self):
+        self.columns = {column: [] for column in self.STRING_COLUMNS}
+        self.columns.update({column: array('q') for column in self.INT_COLUMNS})
+
+    def __len__(self):
+        return len(self.columns['id'])
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def __getitem__(self, i):
+        c = self.columns
+        size = c['size'][i]
+        return FileRecord(id=c['id'][i], name=c['name'][i], mimeType=c['mimeType'][i], size=None if size < 0 else size,
+                          parent=c['parent'][i], owner=c['owner'][i], md5Checksum=c['md5Checksum'][i],
+                          modifiedTime=_from_millis(c['modifiedTime'][i]), createdTime=_from_millis(c['createdTime'][i]))
+
+    def append(self, file):
+        '''
+        Add a file info as returned by the API.
+        :param file: File info dict.
+        '''
+        parents = file.get('parents') or [None]
+        owners = file.get('owners') or [{}]
+        values = {
+            'id': file.get('id'),
+            'name': file.get('name'),
+            'mimeType': file.get('mimeType'),
+            'parent': parents[0],
+            'owner': owners[0].get('emailAddress'),
+            'md5Checksum': file.get('md5Checksum'),
+        }
+        for column in self.STRING_COLUMNS:
+            value = values[column]
+            if value is not None and column in self.INTERNED_COLUMNS:
+                value = sys.intern(value)
+            self.columns[column].append(value)
+
+        self.columns['size'].append(int(file.get('size', -1)))
+        self.columns['modifiedTime'].append(_to_millis(file.get('modifiedTime')))
+        self.columns['createdTime'].append(_to_millis(file.get('createdTime')))
+
+    def extend(self, files):
+        '''
+        Add many file infos or another FileTable.
+        :param files: Iterable of file info dicts, or a FileTable.
+        '''
+        if isinstance(files, FileTable):
+            for column, values in files.columns.items():
+                self.columns[column].extend(values)
+        else:
+            for file in files:
+                self.append(file)
+
+    def to_pandas(self):
+        '''
+        Convert to a pandas DataFrame. Int columns are copied once from their arrays, so the table can still grow, interned columns become categoricals.
+        :return: pandas.DataFrame.
+        '''
+        import numpy as np  # A dependency of pandas
+        import pandas as pd
+
+        data = {}
+        for column in self.STRING_COLUMNS:
+            values = self.columns[column]
+            data[column] = pd.Categorical(values) if column in self.INTERNED_COLUMNS else values
+        # np.array copies: a view of an array('q') would lock its buffer, then append raises BufferError while the DataFrame is alive
+        size = np.array(self.columns['size'], dtype=np.int64)
+        data['size'] = pd.arrays.IntegerArray(size, size < 0)
+        for column in ('modifiedTime', 'createdTime'):
+            millis = np.array(self.columns[column], dtype=np.int64)
+            data[column] = pd.to_datetime(pd.Series(millis).where(lambda s: s >= 0), unit='ms', utc=True)
+        return pd.DataFrame(data, copy=False)
+
+    def to_arrow(self):
+        '''
+        Convert to a pyarrow Table, numpy is not needed. Int columns are copied from their arrays, so the table can still grow, interned columns become dictionary arrays.
+        :return: pyarrow.Table.
+        '''
+        import pyarrow as pa
+        import pyarrow.compute as pc
+
+        arrays = {}
+        for column in self.STRING_COLUMNS:
+            values = pa.array(self.columns[column], type=pa.string())
+            arrays[column] = values.dictionary_encode() if column in self.INTERNED_COLUMNS else values
+        for column, type in (('size', pa.int64()), ('modifiedTime', pa.timestamp('ms', tz='UTC')), ('createdTime', pa.timestamp('ms', tz='UTC'))):
+            values = self.columns[column]
+            # tobytes() copies: a view of an array('q') would lock its buffer, then append raises BufferError while the Table is alive
+            values = pa.Array.from_buffers(pa.int64(), len(values), [None, pa.py_buffer(values.tobytes())])
+            arrays[column] = pc.if_else(pc.less(values, 0), pa.scalar(None, pa.int64()), values).cast(type)
+        return pa.table(arrays)
@@ -0,0 +1,139 @@
+import io
+import tempfile
+import threading
+from collections import OrderedDict
+
+from ..utils import call_with_retries
+
+
+class RemoteFile(io.RawIOBase):
+    def __init__(self, drive, file_id, block_size=1024 * 1024, cache_blocks=64, cache_directory=None, read_ahead=4, retries=3):
+        '''
+        A seekable read-only file on the Drive. Blocks are fetched with HTTP Range requests on demand and kept in an LRU cache.
+        :param drive: Drive.
+        :param file_id: File ID, not a Google Workspace file (export those instead).
+        :param block_size: Bytes per block.
+        :param cache_blocks: Number of blocks kept in memory.
+        :param cache_directory: Directory of a temporary file for blocks evicted from memory (optional). None to drop them.
+        :param read_ahead: Number of blocks fetched in one request when reading sequentially.
+        :param retries: Number of retries of a request after a throttling or server error.
+        '''
+        super().__init__()
+        info = drive.Files.get(file_id=file_id, fields='id, name, size, mimeType')
+        if 'size' not in info:
+            raise ValueError(f"{file_id} has no binary content ({info.get('mimeType')}), please use export instead.")
+
+        self.drive = drive
+        self.file_id = file_id
+        self.name = info['name']
+        self.size = int(info['size'])
+        self.block_size = block_size
+        self.cache_blocks = max(cache_blocks, 1)
+        self.read_ahead = max(read_ahead, 1)
+        self.retries = retries
+        self.url = f"https://www.googleapis.com/drive/v3/files/{file_id}?alt=media&supportsAllDrives=true"
+        self.stats = {'requests': 0, 'bytes_fetched': 0, 'hits': 0, 'disk_hits': 0}
+
+        self._position = 0
+        self._last_block = None
+        self._blocks = OrderedDict()
+        self._lock = threading.Lock()
+        self._spill = tempfile.TemporaryFile(dir=cache_directory) if cache_directory else None
+        self._spilled = set()
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self._position
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_SET:
+            position = offset
+        elif whence == io.SEEK_CUR:
+            position = self._position + offset
+        elif whence == io.SEEK_END:
+            position = self.size + offset
+        else:
+            raise ValueError(f"Invalid whence: {whence}")
+        if position < 0:
+            raise ValueError(f"Negative seek position: {position}")
+        self._position = position
+        return position
+
+    def readinto(self, buffer):
+        if self.closed:
+            raise ValueError("I/O operation on closed file.")
+        view = memoryview(buffer).cast('B')
+        written = 0
+        with self._lock:
+            while written < len(view) and self._position < self.size:
+                index, offset = divmod(self._position, self.block_size)
+                block = self._get_block(index)
+                count = min(len(view) - written, len(block) - offset)
+                view[written:written + count] = block[offset:offset + count]
+                written += count
+                self._position += count
+        return written
+
+    def readall(self):
+        return self.read(max(self.size - self._position, 0))
+
+    def _get_block(self, index):
+        if index in self._blocks:
+            self.stats['hits'] += 1
+            self._blocks.move_to_end(index)
+            block = self._blocks[index]
+        elif index in self._spilled:
+            self.stats['disk_hits'] += 1
+            self._spill.seek(index * self.block_size)
+            block = self._spill.read(self._block_length(index))
+            self._cache(index, block)
+        else:
+            # Sequential reads fetch the next blocks too
+            count = self.read_ahead if self._last_block is not None and index == self._last_block + 1 else 1
+            count = min(count, self.cache_blocks, (self.size - 1) // self.block_size - index + 1)
+            data = self._fetch(index * self.block_size, (index + count) * self.block_size - 1)
+            for i in range(count):
+                self._cache(index + i, data[i * self.block_size:(i + 1) * self.block_size])
+            self._blocks.move_to_end(index)
+            block = self._blocks[index]
+        self._last_block = index
+        return block
+
+    def _block_length(self, index):
+        return min(self.block_size, self.size - index * self.block_size)
+
+    def _cache(self, index, block):
+        self._blocks[index] = block
+        while len(self._blocks) > self.cache_blocks:
+            evicted, evicted_block = self._blocks.popitem(last=False)
+            if self._spill is not None and evicted not in self._spilled:
+                self._spill.seek(evicted * self.block_size)
+                self._spill.write(evicted_block)
+                self._spilled.add(evicted)
+
+    def _fetch(self, start, end):
+        end = min(end, self.size - 1)
+
+        def fetch():
+            with self.drive.http.open_stream(self.url, headers={'Range': f'bytes={start}-{end}'}) as response:
+                return response.read()
+
+        data = call_with_retries(fetch, retries=self.retries)
+        self.stats['requests'] += 1
+        self.stats['bytes_fetched'] += len(data)
+        return data
+
+    def close(self):
+        if not self.closed:
+            self._blocks.clear()
+            if self._spill is not None:
+                self._spill.close()
+        super().close()
+
+    def __repr__(self):
+        return f"RemoteFile(file_id={self.file_id!r}, name={self.name!r}, size={self.size!r})"
@@ -1,5 +1,7 @@
 from colorama import Fore
 
+from ..utils import call_batched
+
 
 class Replies:
     def __init__(self, drive):
@@ -25,6 +27,29 @@ class Replies:
         return result
 
 
+    def create_many(self, replies, batch_size=20, max_workers=4, retries=3):
+        '''
+        Create many replies across many comments with batch requests, several batches at a time. Throttled replies are retried.
+        Replies have no idempotency key, so a batch call that fails as a whole is not sent again, its replies are reported as failed and may exist.
+        :param replies: List of (file_id, comment_id, content).
+        :param batch_size: Replies per batch request, at most 100.
+        :param max_workers: Number of batch requests in flight.
+        :param retries: Number of retries of a reply after a throttling or server error.
+        :return: List of reply info in the order of replies, None for a failed reply.
+        '''
+        requests = [lambda file_id=file_id, comment_id=comment_id, content=content:
+                    self.drive.service.replies().create(fileId=file_id, commentId=comment_id, body={'content': content}, fields='*')
+                    for file_id, comment_id, content in replies]
+        results = []
+        for (file_id, comment_id, content), (result, error) in zip(replies, call_batched(self.drive.service, requests, batch_size, max_workers, retries, idempotent=False)):
+            if error:
+                print(f"An error occurred: {comment_id} {error}")
+            results.append(result)
+
+        self.drive.print_if_verbose(f"{Fore.GREEN}Replied {Fore.RESET}{sum(1 for r in results if r is not None)}{Fore.GREEN} of {Fore.RESET}{len(results)}{Fore.GREEN} replies")
+        return results
+
+
     def get(self, file_id, comment_id, reply_id):
         '''
         Get repy info.
@@ -56,14 +81,24 @@ class Replies:
         return result
 
 
-    def list(self, file_id, comment_id):
+    def list(self, file_id, comment_id, fields='*', include_deleted=False):
         '''
-        List replies.
+        List replies, all pages.
         :param file_id: File ID.
         :param comment_id: Comment ID.
+        :param fields: Fields of each reply, * is all fields.
+        :param include_deleted: True to include deleted replies (without content).
         :return: List of replies.
         '''
-        return self.drive.service.replies().list(fileId=file_id, commentId=comment_id, fields='replies').execute()['replies']
+        replies = []
+        page_token = None
+        while True:
+            result = self.drive.service.replies().list(fileId=file_id, commentId=comment_id, fields=f'nextPageToken, replies({fields})', pageSize=100,
+                                                       includeDeleted=include_deleted, pageToken=page_token).execute()
+            replies.extend(result.get('replies', []))
+            page_token = result.get('nextPageToken')
+            if not page_token:
+                return replies
 
 
     def delete(self, file_id, comment_id, reply_id):
@@ -1,4 +1,13 @@
+import io
+import json
+import os
+import threading
+
 from colorama import Fore
+from googleapiclient.http import HttpRequest, MediaIoBaseDownload
+
+from ..utils import iter_concurrently
+from .files import _to_datetime
 
 
 class Revisions:
@@ -14,13 +23,135 @@ class Revisions:
         '''
         return self.drive.service.revisions().get(fileId=file_id, revisionId=revision_id, fields='*').execute()
 
-    def list(self, file_id):
+    def list(self, file_id, fields='*'):
         '''
         List all revisions
         :param file_id: File ID
+        :param fields: * is all fields
         :return: List of revisions
         '''
-        return self.drive.service.revisions().list(fileId=file_id, fields='revisions').execute()['revisions']
+        if isinstance(fields, list):
+            fields = ', '.join(fields)
+
+        revisions = []
+        page_token = None
+        while True:
+            response = self.drive.service.revisions().list(fileId=file_id, fields=f'nextPageToken, revisions({fields})',
+                                                           pageToken=page_token).execute()
+            revisions.extend(response.get('revisions', []))
+            page_token = response.get('nextPageToken')
+            if page_token is None:
+                break
+        return revisions
+
+    def download(self, file_id, revision_id, dest_directory=None, get_value=False):
+        '''
+        Download the content of a revision of a binary file, e.g. PDF, XLSX. Use export for Google Workspace files.
+        :param file_id: File ID
+        :param revision_id: Revision ID
+        :param dest_directory: Destination directory (optional). None to save the file to current directory
+        :param get_value: False to save the file as <revision_id>_<file name>, True to get the file value only
+        :return: File path, or file value when get_value is True
+        '''
+        request = self.drive.service.revisions().get_media(fileId=file_id, revisionId=revision_id)
+        if get_value:
+            return self._fetch(request)
+
+        name = self.drive.service.files().get(fileId=file_id, fields='name', supportsAllDrives=True).execute()['name'].replace('/', '_')
+        path = os.path.join(dest_directory or '', f"{revision_id}_{name}")
+        self._fetch(request, path)
+        self.drive.print_if_verbose(f"{Fore.GREEN}Saved revision {Fore.RESET}{revision_id}{Fore.GREEN} of {Fore.RESET}{file_id}{Fore.GREEN} as {Fore.RESET}{path}")
+        return path
+
+    def export(self, file_id, revision_id, format='default', dest_directory=None, get_value=False):
+        '''
+        Export a revision of a Google Workspace file.
+        :param file_id: File ID
+        :param revision_id: Revision ID
+        :param format: xlsx, docx, pdf, pptx, csv, etc. Defaults to 'default' (Sheets:xlsx, Docs:docx, Slides:pptx, Drawings:pdf)
+        :param dest_directory: Destination directory (optional). None to save the file to current directory
+        :param get_value: False to save the file as <revision_id>_<file name>.<format>, True to get the file value only
+        :return: File path, or file value when get_value is True
+        '''
+        file_info = self.drive.service.files().get(fileId=file_id, fields='name, mimeType', supportsAllDrives=True).execute()
+        revision = self.drive.service.revisions().get(fileId=file_id, revisionId=revision_id, fields='id, exportLinks').execute()
+        url, format = self._export_link(file_info, revision, format)
+
+        request = HttpRequest(self.drive.http, lambda resp, content: content, url)
+        if get_value:
+            return self._fetch(request)
+
+        path = os.path.join(dest_directory or '', f"{revision_id}_{file_info['name'].replace('/', '_')}.{format}")
+        self._fetch(request, path)
+        self.drive.print_if_verbose(f"{Fore.GREEN}Saved revision {Fore.RESET}{revision_id}{Fore.GREEN} of {Fore.RESET}{file_id}{Fore.GREEN} as {Fore.RESET}{path}")
+        return path
+
+    def download_history(self, file_ids, dest_directory, max_workers=8):
+        '''
+        Download all revisions of many files concurrently to <dest_directory>/<file_id>/. Google Workspace files are exported in their default formats.
+        Downloaded revisions are recorded in <dest_directory>/manifest.jsonl by revision ID and md5Checksum and skipped on later runs.
+        :param file_ids: File ID or list of file IDs
+        :param dest_directory: Destination directory
+        :param max_workers: Number of threads
+        :return: List of manifest entries downloaded in this run
+        '''
+        if isinstance(file_ids, str):
+            file_ids = [file_ids]
+
+        os.makedirs(dest_directory, exist_ok=True)
+        manifest_path = os.path.join(dest_directory, 'manifest.jsonl')
+        manifest = {}
+        if os.path.exists(manifest_path):
+            with open(manifest_path) as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        manifest[(entry['file_id'], entry['revision_id'])] = entry
+
+        def list_revisions(file_id):
+            file_info = self.drive.service.files().get(fileId=file_id, fields='id, name, mimeType', supportsAllDrives=True).execute()
+            revisions = self.list(file_id=file_id, fields='id, md5Checksum, modifiedTime, exportLinks')
+            return [(file_info, revision) for revision in revisions]
+
+        todo = []
+        for file_id, result, error in iter_concurrently(list_revisions, file_ids, max_workers=max_workers):
+            if error:
+                print(f"An error occurred: {error}")
+                continue
+            for file_info, revision in result:
+                entry = manifest.get((file_info['id'], revision['id']))
+                if entry and entry.get('md5Checksum') == revision.get('md5Checksum') and os.path.exists(os.path.join(dest_directory, entry['path'])):
+                    continue
+                todo.append((file_info, revision))
+
+        def fetch(item):
+            file_info, revision = item
+            os.makedirs(os.path.join(dest_directory, file_info['id']), exist_ok=True)
+            name = file_info['name'].replace('/', '_')
+            if revision.get('exportLinks'):
+                url, format = self._export_link(file_info, revision)
+                request = HttpRequest(self.drive.http, lambda resp, content: content, url)
+                path = os.path.join(file_info['id'], f"{revision['id']}_{name}.{format}")
+            else:
+                request = self.drive.service.revisions().get_media(fileId=file_info['id'], revisionId=revision['id'])
+                path = os.path.join(file_info['id'], f"{revision['id']}_{name}")
+            self._fetch(request, os.path.join(dest_directory, path))
+            return {'file_id': file_info['id'], 'revision_id': revision['id'], 'md5Checksum': revision.get('md5Checksum'),
+                    'modifiedTime': revision.get('modifiedTime'), 'path': path}
+
+        downloaded = []
+        manifest_lock = threading.Lock()
+        for item, entry, error in iter_concurrently(fetch, todo, max_workers=max_workers):
+            if error:
+                print(f"An error occurred: {error}")
+                continue
+            with manifest_lock, open(manifest_path, 'a') as f:
+                f.write(json.dumps(entry) + '\n')
+            downloaded.append(entry)
+            self.drive.print_if_verbose(f"{Fore.GREEN}Saved revision {Fore.RESET}{entry['revision_id']}{Fore.GREEN} as {Fore.RESET}{entry['path']}")
+
+        self.drive.print_if_verbose(f"{Fore.GREEN}Downloaded {Fore.RESET}{len(downloaded)}{Fore.GREEN} revisions, skipped {Fore.RESET}{len(manifest)}{Fore.GREEN} in manifest")
+        return downloaded
 
     def delete(self, file_id, revision_id):
         '''
@@ -29,4 +160,76 @@ class Revisions:
         :param revision_id: Revision ID
         '''
         self.drive.service.revisions().delete(fileId=file_id, revisionId=revision_id).execute()
-        self.drive.print_if_verbose(f"{Fore.RED}Deleted revision {Fore.RESET}{revision_id}")
\ No newline at end of file
+        self.drive.print_if_verbose(f"{Fore.RED}Deleted revision {Fore.RESET}{revision_id}")
+
+    def prune(self, file_ids, keep_last=10, older_than=None, keep_forever=True, max_workers=8):
+        '''
+        Delete old revisions of many files in parallel. The head revision is always kept.
+        :param file_ids: File ID or list of file IDs
+        :param keep_last: Number of newest revisions to keep per file
+        :param older_than: Only delete revisions modified before this time, e.g. '2024-06-01T00:00:00Z' (optional)
+        :param keep_forever: True to keep revisions marked as keepForever
+        :param max_workers: Number of threads
+        :return: List of deleted revisions as (file_id, revision_id)
+        '''
+        if isinstance(file_ids, str):
+            file_ids = [file_ids]
+
+        keep_last = max(keep_last, 1)
+
+        def expired_revisions(file_id):
+            revisions = sorted(self.list(file_id=file_id, fields='id, modifiedTime, keepForever'), key=lambda r: r['modifiedTime'])
+            expired = revisions[:-keep_last]
+            if older_than:
+                # As datetimes, the API adds milliseconds that a string comparison would put before the same second
+                expired = [r for r in expired if _to_datetime(r['modifiedTime']) < _to_datetime(older_than)]
+            if keep_forever:
+                expired = [r for r in expired if not r.get('keepForever')]
+            return [(file_id, r['id']) for r in expired]
+
+        to_delete = []
+        for file_id, result, error in iter_concurrently(expired_revisions, file_ids, max_workers=max_workers):
+            if error:
+                print(f"An error occurred: {error}")
+            else:
+                to_delete.extend(result)
+
+        deleted = []
+        for item, result, error in iter_concurrently(lambda item: self.delete(*item), to_delete, max_workers=max_workers):
+            if error:
+                print(f"An error occurred: {error}")
+            else:
+                deleted.append(item)
+
+        self.drive.print_if_verbose(f"{Fore.RED}Pruned {Fore.RESET}{len(deleted)}{Fore.RED} revisions of {Fore.RESET}{len(file_ids)}{Fore.RED} files")
+        return deleted
+
+    # Support
+    def _export_link(self, file_info, revision, format='default'):
+        export_links = revision.get('exportLinks') or {}
+        export_formats = {export_links[v].split('=')[-1]: v for v in export_links}
+
+        format = format.lower()
+        if format == 'default':
+            mime_type = self.drive.Files.default_export_mime_types.get(file_info['mimeType'])
+            if mime_type is None or mime_type.value not in export_links:
+                raise ValueError(f"No default export format for {file_info['mimeType']}, please choose one of: {'; '.join(export_formats)}")
+            return export_links[mime_type.value], mime_type.name.lower()
+
+        if format not in export_formats:
+            raise ValueError(f"You can export revision {revision['id']} with formats: {'; '.join(export_formats)}")
+        return export_links[export_formats[format]], format
+
+    @staticmethod
+    def _fetch(request, path=None):
+        # Stream to the destination file chunk by chunk
+        file = open(path, 'wb') if path else io.BytesIO()
+        try:
+            downloader = MediaIoBaseDownload(file, request)
+            done = False
+            while done is False:
+                status, done = downloader.next_chunk()
+            if not path:
+                return file.getvalue()
+        finally:
+            file.close()
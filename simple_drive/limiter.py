@@ -0,0 +1,137 @@
+import threading
+import time
+from contextlib import contextmanager
+from urllib.parse import urlparse
+
+from googleapiclient.errors import HttpError
+
+from .utils import is_rate_limited, is_retryable
+
+
+class AdaptiveLimiter:
+    def __init__(self, initial_limit=8, min_limit=1, max_limit=64, increase=1, decrease=0.5, latency_tolerance=3.0):
+        '''
+        An AIMD concurrency limiter with one limit per operation type, e.g. 'GET files' or 'POST files.permissions'.
+        The limit grows additively while calls succeed with a healthy latency, and is cut multiplicatively on throttling or server errors.
+        :param initial_limit: Starting number of concurrent calls of an operation.
+        :param min_limit: Lower bound of a limit.
+        :param max_limit: Upper bound of a limit.
+        :param increase: Limit added per window of successful calls (a window is `limit` calls).
+        :param decrease: Factor applied to a limit on throttling, at most once per round trip.
+        :param latency_tolerance: The limit only grows while the average latency is below this multiple of the best latency seen.
+        '''
+        self.initial_limit = initial_limit
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.increase = increase
+        self.decrease = decrease
+        self.latency_tolerance = latency_tolerance
+        self._states = {}
+        self._condition = threading.Condition()
+
+    def _state(self, operation):
+        state = self._states.get(operation)
+        if state is None:
+            state = self._states[operation] = {'limit': float(self.initial_limit), 'in_flight': 0, 'waiting': 0, 'successes': 0,
+                                               'throttles': 0, 'errors': 0, 'latency': None, 'min_latency': None, 'last_decrease': 0}
+        return state
+
+    def acquire(self, operation):
+        '''
+        Wait for a free slot of an operation.
+        :param operation: Operation type.
+        :return: Start time, pass it to release().
+        '''
+        with self._condition:
+            state = self._state(operation)
+            state['waiting'] += 1
+            while state['in_flight'] >= int(state['limit']):
+                self._condition.wait()
+            state['waiting'] -= 1
+            state['in_flight'] += 1
+        return time.monotonic()
+
+    def release(self, operation, started, throttled=False, error=False):
+        '''
+        Free a slot and adapt the limit of an operation to the outcome.
+        :param operation: Operation type.
+        :param started: Start time returned by acquire().
+        :param throttled: True if the call got a throttling response (429 or 403 rateLimitExceeded).
+        :param error: True if the call got a server error (5xx).
+        '''
+        now = time.monotonic()
+        latency = now - started
+        with self._condition:
+            state = self._state(operation)
+            saturated = state['in_flight'] >= int(state['limit'])
+            state['in_flight'] -= 1
+            state['latency'] = latency if state['latency'] is None else 0.8 * state['latency'] + 0.2 * latency
+            state['min_latency'] = latency if state['min_latency'] is None else min(state['min_latency'], latency)
+
+            if throttled or error:
+                state['throttles' if throttled else 'errors'] += 1
+                # Calls in flight during a cut fail together, count them as one signal
+                if now - state['last_decrease'] > state['latency']:
+                    state['limit'] = max(self.min_limit, state['limit'] * self.decrease)
+                    state['last_decrease'] = now
+            else:
+                state['successes'] += 1
+                healthy = state['latency'] <= state['min_latency'] * self.latency_tolerance
+                if healthy and (saturated or state['waiting']):
+                    state['limit'] = min(self.max_limit, state['limit'] + self.increase / state['limit'])
+            self._condition.notify_all()
+
+    @contextmanager
+    def slot(self, operation):
+        '''
+        Run a block of code in a slot of an operation. An HttpError is classified like a Drive response, any other exception (e.g. a connection error) counts as an error.
+        The block reports a response that is not raised through the yielded dict, e.g. outcome['throttled'] = True.
+        :param operation: Operation type, e.g. 'export'.
+        :return: Outcome dict with throttled and error, both False by default.
+        '''
+        started = self.acquire(operation)
+        outcome = {'throttled': False, 'error': False}
+        try:
+            yield outcome
+        except BaseException as error:
+            throttled = is_rate_limited(error)
+            self.release(operation, started, throttled=throttled, error=not throttled and (is_retryable(error) or not isinstance(error, HttpError)))
+            raise
+        self.release(operation, started, **outcome)
+
+    def metrics(self):
+        '''
+        Get the state of every operation type.
+        :return: Dict of operation to {limit, in_flight, waiting, successes, throttles, errors, latency_ms, min_latency_ms}.
+        '''
+        with self._condition:
+            return {operation: {
+                'limit': int(state['limit']),
+                'in_flight': state['in_flight'],
+                'waiting': state['waiting'],
+                'successes': state['successes'],
+                'throttles': state['throttles'],
+                'errors': state['errors'],
+                'latency_ms': round(state['latency'] * 1000, 1) if state['latency'] is not None else None,
+                'min_latency_ms': round(state['min_latency'] * 1000, 1) if state['min_latency'] is not None else None,
+            } for operation, state in self._states.items()}
+
+
+def operation_name(method, uri):
+    '''
+    Operation type of a Drive API request, IDs are dropped.
+    :param method: HTTP method.
+    :param uri: Request URL.
+    :return: e.g. 'GET files', 'POST files.permissions', 'PUT upload.files', 'POST batch', 'GET spreadsheets.export'.
+    '''
+    parts = urlparse(uri).path.strip('/').split('/')
+    if parts and parts[0] == 'batch':
+        return f"{method} batch"
+    if len(parts) > 2 and parts[1] == 'd':
+        # Editor links: spreadsheets/d/<file_id>/export
+        return f"{method} {'.'.join([parts[0], *parts[3:]])}"
+    prefix = 'upload.' if parts and parts[0] == 'upload' else ''
+    if 'v3' in parts:
+        parts = parts[parts.index('v3') + 1:]
+    # Collections and IDs alternate: files/<id>/permissions/<id>
+    return f"{method} {prefix}{'.'.join(parts[0::2]) or 'other'}"
@@ -0,0 +1,138 @@
+import contextlib
+import threading
+import time
+import urllib.error
+import urllib.request
+
+import httplib2
+from googleapiclient.errors import HttpError
+from googleapiclient.http import build_http
+
+from .limiter import operation_name
+from .utils import is_rate_limited_response
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class ThreadLocalHttp:
+    def __init__(self, credentials, single_flight=True, limiter=None, throttle_retries=5, backoff_seconds=1, cassette=None):
+        '''
+        An httplib2.Http stand-in that keeps one authorized connection per thread, so a Drive can be shared by worker threads.
+        :param credentials: oauth2client credentials, e.g. auth.credentials.
+        :param single_flight: True to let concurrent identical GET requests share one HTTP call and its response.
+        :param limiter: AdaptiveLimiter to bound concurrent requests per operation type (optional).
+        :param throttle_retries: Number of retries of a throttled request (429 or 403 rateLimitExceeded).
+        :param backoff_seconds: First wait before a retry, doubled on each retry.
+        :param cassette: Cassette to record or replay every exchange (optional). credentials can be None when replaying.
+        '''
+        self.credentials = credentials
+        self.cassette = cassette
+        self.single_flight = single_flight
+        self.limiter = limiter
+        self.throttle_retries = throttle_retries
+        self.backoff_seconds = backoff_seconds
+        self.saved_calls = 0
+        self._local = threading.local()
+        self._flights = {}
+        self._flights_lock = threading.Lock()
+
+        def request(uri, method='GET', body=None, headers=None, *args, **kwargs):
+            return self._request(uri, method, body, headers, *args, **kwargs)
+
+        # googleapiclient reads http.request.credentials
+        request.credentials = credentials
+        self._request_function = request
+
+    def get_http(self):
+        '''
+        Get the authorized http object of the current thread.
+        :return: httplib2.Http.
+        '''
+        http = getattr(self._local, 'http', None)
+        if http is None:
+            if self.cassette is not None and self.cassette.replaying:
+                http = self.cassette.wrap(None)
+            else:
+                http = self.credentials.authorize(build_http())
+                if self.cassette is not None:
+                    http = self.cassette.wrap(http)
+            self._local.http = http
+        return http
+
+    def open_stream(self, url, headers=None, timeout=60):
+        '''
+        Open a streaming GET response, read it with .read(size) instead of loading the whole body like httplib2 does.
+        :param url: URL, e.g. an export link or https://www.googleapis.com/drive/v3/files/<file_id>?alt=media.
+        :param headers: Extra headers, e.g. {'Range': 'bytes=0-1023'} (optional).
+        :param timeout: Socket timeout in seconds.
+        :return: http.client.HTTPResponse.
+        '''
+        def open_real():
+            token = self.credentials.get_access_token().access_token
+            request = urllib.request.Request(url, headers={**(headers or {}), 'Authorization': f'Bearer {token}'})
+            try:
+                return urllib.request.urlopen(request, timeout=timeout)
+            except urllib.error.HTTPError as error:
+                # Raise the same error type as googleapiclient
+                raise HttpError(httplib2.Response({'status': error.code, **dict(error.headers)}), error.read(), uri=url)
+
+        # The slot covers the time to the response headers, not the body
+        with self._slot(operation_name('GET', url)):
+            return self.cassette.open_stream(url, headers, open_real) if self.cassette is not None else open_real()
+
+    def _slot(self, operation):
+        return self.limiter.slot(operation) if self.limiter else contextlib.nullcontext({})
+
+    def _send(self, uri, method='GET', body=None, headers=None, *args, **kwargs):
+        operation = operation_name(method, uri)
+        for attempt in range(self.throttle_retries + 1):
+            with self._slot(operation) as outcome:
+                response, content = self.get_http().request(uri, method, body, headers, *args, **kwargs)
+                throttled = outcome['throttled'] = is_rate_limited_response(response.status, content)
+                outcome['error'] = response.status >= 500
+            if not throttled or attempt == self.throttle_retries:
+                return response, content
+            time.sleep(self.backoff_seconds * 2 ** attempt)
+
+    def _request(self, uri, method='GET', body=None, headers=None, *args, **kwargs):
+        if not self.single_flight or method != 'GET':
+            return self._send(uri, method, body, headers, *args, **kwargs)
+
+        key = (uri, tuple(sorted((headers or {}).items())))
+        with self._flights_lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+            else:
+                self.saved_calls += 1
+
+        if leader:
+            try:
+                flight.result = self._send(uri, method, body, headers, *args, **kwargs)
+            except BaseException as error:
+                flight.error = error
+            finally:
+                with self._flights_lock:
+                    del self._flights[key]
+                flight.done.set()
+        else:
+            flight.done.wait()
+
+        if flight.error is not None:
+            raise flight.error
+        # The response is read-only, googleapiclient parses a new body for each caller
+        return flight.result
+
+    @property
+    def request(self):
+        # A property (not a method) so googleapiclient can still read http.request.credentials
+        return self._request_function
+
+    def __getattr__(self, name):
+        return getattr(self.get_http(), name)
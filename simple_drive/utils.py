@@ -0,0 +1,189 @@
+import hashlib
+import mmap
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+
+from googleapiclient.errors import HttpError
+
+RATE_LIMIT_REASONS = ('rateLimitExceeded', 'userRateLimitExceeded', 'sharingRateLimitExceeded')
+
+
+def is_rate_limited(error):
+    '''
+    Check if an error is a Drive throttling response (429 or 403 rateLimitExceeded).
+    :param error: Any exception.
+    :return: True or False.
+    '''
+    if not isinstance(error, HttpError):
+        return False
+    return is_rate_limited_response(error.resp.status, error.content)
+
+
+def is_rate_limited_response(status, content):
+    '''
+    Check if a response is a Drive throttling response (429 or 403 rateLimitExceeded).
+    :param status: HTTP status.
+    :param content: Response body.
+    :return: True or False.
+    '''
+    if status == 429:
+        return True
+
+    if status == 403:
+        content = content.decode('utf-8', 'ignore') if isinstance(content, bytes) else str(content)
+        return any(reason in content for reason in RATE_LIMIT_REASONS)
+
+    return False
+
+
+def is_retryable(error):
+    '''
+    Check if an error is worth a retry: throttling or a 5xx server error.
+    :param error: Any exception.
+    :return: True or False.
+    '''
+    return is_rate_limited(error) or (isinstance(error, HttpError) and error.resp.status >= 500)
+
+
+def call_with_retries(func, retries=3, backoff_seconds=1):
+    '''
+    Call a function, retrying with exponential backoff on throttling and 5xx server errors.
+    :param func: A function without arguments.
+    :param retries: Number of retries.
+    :param backoff_seconds: First wait before a retry, doubled on each retry.
+    :return: The function result.
+    '''
+    for attempt in range(retries + 1):
+        try:
+            return func()
+        except Exception as error:
+            if not is_retryable(error) or attempt == retries:
+                raise
+            time.sleep(backoff_seconds * 2 ** attempt)
+
+
+def md5_file(file, chunk_size=1024 * 1024):
+    '''
+    Compute the MD5 checksum and size of a local file in a streaming pass.
+    :param file: Local file.
+    :param chunk_size: Bytes read per step.
+    :return: (md5 hex digest, size).
+    '''
+    md5 = hashlib.md5()
+    size = 0
+    with open(file, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            md5.update(chunk)
+            size += len(chunk)
+    return md5.hexdigest(), size
+
+
+def call_batched(service, requests, batch_size=50, max_workers=4, retries=3, backoff_seconds=1, idempotent=True):
+    '''
+    Execute many API requests as batch requests (one HTTP call per batch), several batches at a time.
+    Requests that fail with a throttling or server error are sent again in a later round, with exponential backoff.
+    :param service: A googleapiclient service, e.g. drive.service.
+    :param requests: List of functions without arguments that build a request, e.g. lambda: service.comments().create(...).
+    :param batch_size: Requests per batch, at most 100.
+    :param max_workers: Number of batches in flight.
+    :param retries: Number of retries of a request.
+    :param backoff_seconds: First wait before a retry round, doubled on each round.
+    :param idempotent: False for requests that must not run twice, e.g. creates. The requests of a batch call that failed as a whole (a connection or server error) may have been applied, they are returned with the error instead of being sent again. Throttled batch calls and per-request errors are still retried.
+    :return: List of (result, error) in the order of requests. error is None on success.
+    '''
+    batch_size = min(max(batch_size, 1), 100)
+    outcomes = [(None, None)] * len(requests)
+    pending = list(range(len(requests)))
+
+    def execute(indexes):
+        def callback(request_id, response, exception):
+            outcomes[int(request_id)] = (response, exception)
+
+        batch = service.new_batch_http_request(callback=callback)
+        for index in indexes:
+            batch.add(requests[index](), request_id=str(index))
+        batch.execute()
+
+    unknown = set()
+    for attempt in range(retries + 1):
+        if attempt:
+            time.sleep(backoff_seconds * 2 ** (attempt - 1))
+        batches = [pending[i:i + batch_size] for i in range(0, len(pending), batch_size)]
+        for indexes, _, error in iter_concurrently(execute, batches, max_workers=max_workers):
+            if error:
+                # The batch call itself failed, e.g. throttled as a whole
+                for index in indexes:
+                    outcomes[index] = (None, error)
+                if not idempotent and not is_rate_limited(error):
+                    # The server may have run the requests without answering
+                    unknown.update(indexes)
+        pending = [index for index in pending if index not in unknown and outcomes[index][1] is not None and is_retryable(outcomes[index][1])]
+        if not pending:
+            break
+    return outcomes
+
+
+def md5_file_mmap(file):
+    '''
+    Compute the MD5 checksum and size of a local file through a memory map, without copying it into Python buffers.
+    :param file: Local file.
+    :return: (md5 hex digest, size).
+    '''
+    size = os.path.getsize(file)
+    if size == 0:
+        return hashlib.md5().hexdigest(), 0
+    with open(file, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+        return hashlib.md5(m).hexdigest(), size
+
+
+def md5_files(files, processes=None):
+    '''
+    Compute the MD5 checksums of many local files in a process pool, so hashing uses every CPU core.
+    :param files: List of local files.
+    :param processes: Number of processes. None for the number of CPUs, 1 to hash in the current process.
+    :return: Generator of (file, (md5 hex digest, size), error) in completion order. error is None on success.
+    '''
+    if processes == 1 or len(files) < 2:
+        for file in files:
+            try:
+                yield file, md5_file_mmap(file), None
+            except OSError as error:
+                yield file, None, error
+        return
+
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        pending = {executor.submit(md5_file_mmap, file): file for file in files}
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                file = pending.pop(future)
+                error = future.exception()
+                yield file, None if error else future.result(), error
+
+
+def iter_concurrently(func, items, max_workers=8):
+    '''
+    Run a function for each item in a thread pool, keeping at most 2 * max_workers items in flight.
+    :param func: A function that takes an item.
+    :param items: Any iterable, consumed lazily.
+    :param max_workers: Number of threads.
+    :return: Generator of (item, result, error) in completion order. error is None on success.
+    '''
+    items = iter(items)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        pending = {}
+        while True:
+            for item in items:
+                pending[executor.submit(func, item)] = item
+                if len(pending) >= 2 * max_workers:
+                    break
+
+            if not pending:
+                return
+
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                item = pending.pop(future)
+                error = future.exception()
+                yield item, None if error else future.result(), error
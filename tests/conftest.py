@@ -0,0 +1,55 @@
+import os
+from datetime import datetime, timedelta
+
+import pytest
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+from simple_drive import Auth, Cassette, Drive
+
+from .fakes import FakeHttp
+
+
+@pytest.fixture(scope='session')
+def private_key():
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    return key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()).decode()
+
+
+@pytest.fixture
+def service_account(private_key):
+    '''
+    Build service account info with a throwaway key, nothing is sent to Google.
+    '''
+    def make(email='sa@project.iam.gserviceaccount.com'):
+        return {'type': 'service_account', 'project_id': 'project', 'private_key_id': '1', 'private_key': private_key,
+                'client_email': email, 'client_id': '1', 'token_uri': 'https://oauth2.googleapis.com/token'}
+    return make
+
+
+@pytest.fixture
+def make_drive(service_account):
+    '''
+    Build a Drive whose requests are answered by a handler instead of the network.
+    '''
+    def make(handler, **kwargs):
+        auth = Auth.from_service_account_info(service_account())
+        # A valid token, batch requests refresh expired credentials before sending
+        auth.credentials.access_token = 'token'
+        auth.credentials.token_expiry = datetime.utcnow() + timedelta(hours=1)
+        drive = Drive(auth=auth, verbose=False, **kwargs)
+        fake = FakeHttp(handler)
+        drive.http.get_http = lambda: fake
+        return drive, fake
+    return make
+
+
+@pytest.fixture
+def replay():
+    '''
+    Build a Drive that answers from a cassette of tests/cassettes, without credentials or waiting.
+    '''
+    def make(name, **kwargs):
+        cassette = Cassette(os.path.join(os.path.dirname(__file__), 'cassettes', name), mode='replay', time_scale=0)
+        return Drive(verbose=False, cassette=cassette, **kwargs)
+    return make
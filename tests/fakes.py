@@ -0,0 +1,48 @@
+import json
+import re
+from urllib.parse import parse_qs, urlparse
+
+import httplib2
+
+
+class FakeHttp:
+    '''
+    An httplib2.Http stand-in that answers with handler(method, uri, body, headers) -> (status, dict | bytes) or (status, dict | bytes, response headers).
+    Each part of a batch request is answered by the same handler, with the path of the part as uri and its JSON body as a dict.
+    '''
+    def __init__(self, handler):
+        self.handler = handler
+        self.batches = []
+        self.calls = []
+        self.timeout = None
+        self.redirect_codes = set()
+
+    def request(self, uri, method='GET', body=None, headers=None, *args, **kwargs):
+        self.calls.append((method, uri, body))
+        if urlparse(uri).path.startswith('/batch/'):
+            return self._batch(body)
+        status, content, *response_headers = self.handler(method, uri, body, headers or {})
+        if isinstance(content, (dict, list)):
+            content = json.dumps(content).encode()
+        return httplib2.Response({'status': status, 'content-type': 'application/json', **(response_headers[0] if response_headers else {})}), content
+
+    def _batch(self, body):
+        if isinstance(body, str):
+            body = body.encode()
+        parts = []
+        for part in re.split(rb'--=+\d+==', body.replace(b'\r\n', b'\n')):
+            content_id = re.search(rb'Content-ID: <([^>]+)>', part)
+            if not content_id:
+                continue
+            request = part.split(b'\n\n', 1)[1]
+            request_head, request_body = request.split(b'\n\n', 1) if b'\n\n' in request else (request, b'')
+            method, path = request_head.split(b'\n', 1)[0].decode().split()[:2]
+            status, content = self.handler(method, path, json.loads(request_body) if request_body.strip() else None, {})
+            parts.append(f'--BOUNDARY\r\nContent-Type: application/http\r\nContent-ID: <response-{content_id.group(1).decode()}>\r\n\r\n'
+                         f'HTTP/1.1 {status} OK\r\nContent-Type: application/json\r\n\r\n{json.dumps(content)}\r\n')
+        self.batches.append(len(parts))
+        return httplib2.Response({'status': 200, 'content-type': 'multipart/mixed; boundary=BOUNDARY'}), (''.join(parts) + '--BOUNDARY--').encode()
+
+
+def query_params(uri):
+    return {key: values[0] for key, values in parse_qs(urlparse(uri).query).items()}
@@ -0,0 +1,192 @@
+import json
+from urllib.parse import urlparse
+
+import pytest
+
+from .fakes import query_params
+
+FOLDER = 'application/vnd.google-apps.folder'
+
+
+def file(file_id, parent, size, mime_type='text/plain', owner='alice@corp.com', **kwargs):
+    return {'id': file_id, 'name': f'{file_id}.txt', 'mimeType': mime_type, 'size': str(size), 'parents': [parent],
+            'owners': [{'emailAddress': owner}], **kwargs}
+
+
+def folder(file_id, parent):
+    return {'id': file_id, 'name': file_id, 'mimeType': FOLDER, 'parents': [parent], 'owners': [{'emailAddress': 'alice@corp.com'}]}
+
+
+@pytest.fixture
+def tree_drive(make_drive):
+    '''
+    A Drive with the tree Root/{a, Sub/{b, c}}. drive.changes holds the changes pages, drive.listed the folders listed.
+    '''
+    files = [file('a', 'Root', 10), folder('Sub', 'Root'), file('b', 'Sub', 100, 'application/pdf', 'bob@corp.com'), file('c', 'Sub', 5)]
+    changes = {}
+    listed = []
+
+    def handler(method, uri, body, headers):
+        path = urlparse(uri).path
+        params = query_params(uri)
+        if path == '/drive/v3/changes/startPageToken':
+            return 200, {'startPageToken': 'Token1'}
+        if path == '/drive/v3/changes':
+            return 200, changes[params['pageToken']]
+        if path == '/drive/v3/files':
+            folder_id = params['q'].split("'")[1]
+            listed.append(folder_id)
+            return 200, {'files': [f for f in files if f['parents'] == [folder_id]]}
+        if path == '/drive/v3/files/Root':
+            return 200, {'id': 'Root', 'name': 'Root'}
+        raise AssertionError(f'Unexpected request {method} {uri}')
+
+    drive, fake = make_drive(handler)
+    drive.files = files
+    drive.changes = changes
+    drive.listed = listed
+    return drive
+
+
+def test_folder_sizes_aggregates_up_the_tree(tree_drive):
+    stats = tree_drive.Analytics.folder_sizes(folder_id='Root')
+
+    assert stats['Sub'] == {'name': 'Sub', 'size': 105, 'files': 2, 'folders': 0, 'mimeTypes': {'application/pdf': 100, 'text/plain': 5},
+                            'owners': {'bob@corp.com': 100, 'alice@corp.com': 5}}
+    assert stats['Root'] == {'name': 'Root', 'size': 115, 'files': 3, 'folders': 1, 'mimeTypes': {'application/pdf': 100, 'text/plain': 15},
+                             'owners': {'bob@corp.com': 100, 'alice@corp.com': 15}}
+    assert sorted(tree_drive.listed) == ['Root', 'Sub']
+
+
+def test_folder_sizes_applies_changes_to_the_cache(tree_drive, tmp_path):
+    cache_file = str(tmp_path / 'cache.json')
+    tree_drive.Analytics.folder_sizes(folder_id='Root', cache_file=cache_file)
+    tree_drive.listed.clear()
+
+    tree_drive.files.extend([folder('Moved', 'Root'), file('d', 'Moved', 50)])
+    tree_drive.changes['Token1'] = {'nextPageToken': 'Token2', 'changes': [
+        {'fileId': 'c', 'removed': True},
+        {'fileId': 'a', 'file': file('a', 'Root', 20)},
+        # A folder moved in from outside is crawled
+        {'fileId': 'Moved', 'file': folder('Moved', 'Root')},
+    ]}
+    tree_drive.changes['Token2'] = {'newStartPageToken': 'Token3', 'changes': [
+        # Moved out of the tree
+        {'fileId': 'b', 'file': file('b', 'Elsewhere', 100, 'application/pdf', 'bob@corp.com')},
+        {'fileId': 'Outside', 'file': file('Outside', 'Elsewhere', 1)},
+    ]}
+
+    stats = tree_drive.Analytics.folder_sizes(folder_id='Root', cache_file=cache_file)
+    assert tree_drive.listed == ['Moved']
+    assert stats['Root'] == {'name': 'Root', 'size': 70, 'files': 2, 'folders': 2, 'mimeTypes': {'text/plain': 70}, 'owners': {'alice@corp.com': 70}}
+    assert stats['Sub']['size'] == 0 and stats['Moved']['size'] == 50
+    with open(cache_file) as f:
+        assert json.load(f)['page_token'] == 'Token3'
+
+    # refresh crawls again
+    tree_drive.listed.clear()
+    tree_drive.Analytics.folder_sizes(folder_id='Root', cache_file=cache_file, refresh=True)
+    assert sorted(tree_drive.listed) == ['Moved', 'Root', 'Sub']
+
+
+def test_trashed_folder_is_removed_with_its_content(tree_drive, tmp_path):
+    cache_file = str(tmp_path / 'cache.json')
+    tree_drive.Analytics.folder_sizes(folder_id='Root', cache_file=cache_file)
+    tree_drive.changes['Token1'] = {'newStartPageToken': 'Token2', 'changes': [
+        {'fileId': 'Sub', 'file': {**folder('Sub', 'Root'), 'trashed': True}},
+        # Changes of the root itself keep it
+        {'fileId': 'Root', 'removed': True},
+    ]}
+
+    stats = tree_drive.Analytics.folder_sizes(folder_id='Root', cache_file=cache_file)
+    assert stats == {'Root': {'name': 'Root', 'size': 10, 'files': 1, 'folders': 0, 'mimeTypes': {'text/plain': 10}, 'owners': {'alice@corp.com': 10}}}
+
+
+def test_cache_of_another_folder_is_not_used(tree_drive, tmp_path):
+    cache_file = tmp_path / 'cache.json'
+    cache_file.write_text(json.dumps({'folder_id': 'OtherId', 'page_token': 'Token1', 'entries': {}}))
+
+    stats = tree_drive.Analytics.folder_sizes(folder_id='Root', cache_file=str(cache_file))
+    assert stats['Root']['size'] == 115
+    assert json.loads(cache_file.read_text())['folder_id'] == 'Root'
+
+
+DUPLICATES = [
+    file('a1', 'Root', 10, md5Checksum='aaa'),
+    file('b1', 'Root', 20, md5Checksum='bbb'),
+    file('a2', 'Sub', 10, md5Checksum='aaa'),
+    file('unique', 'Root', 10, md5Checksum='ccc'),
+    # The same checksum with another size is not a duplicate
+    file('b-other-size', 'Root', 21, md5Checksum='bbb'),
+    file('b2', 'Sub', 20, md5Checksum='bbb'),
+    file('a3', 'Root', 10, md5Checksum='aaa'),
+    # Google Workspace files have no checksum
+    {'id': 'doc', 'name': 'doc', 'parents': ['Root']},
+]
+
+
+@pytest.fixture
+def duplicates_drive(make_drive):
+    '''
+    A Drive whose file search returns DUPLICATES, drive.requests lists the other requests as (method, file ID, body).
+    '''
+    requests = []
+
+    def handler(method, uri, body, headers):
+        path = urlparse(uri).path
+        if method == 'GET' and path == '/drive/v3/files':
+            assert query_params(uri)['q'] == "(name contains 'report') and trashed=false"
+            return 200, {'files': DUPLICATES}
+        body = json.loads(body) if body else None
+        requests.append((method, path.split('/')[-1], body))
+        return 200, {'id': 'ShortcutId', **(body or {})}
+
+    drive, fake = make_drive(handler)
+    drive.requests = requests
+    return drive
+
+
+@pytest.mark.parametrize('max_in_memory', [1000000, 2])
+def test_find_duplicates(duplicates_drive, monkeypatch, max_in_memory):
+    analytics = duplicates_drive.Analytics
+    spilled = []
+    spill = analytics._spill
+    monkeypatch.setattr(analytics, '_spill', lambda groups: spilled.append(sum(map(len, groups.values()))) or spill(groups))
+
+    result = analytics.find_duplicates(query="name contains 'report'", max_in_memory=max_in_memory)
+    groups = sorted(result['groups'], key=lambda group: group['md5Checksum'])
+    assert groups == [
+        {'size': 10, 'md5Checksum': 'aaa', 'files': [{'id': 'a1', 'name': 'a1.txt', 'parent': 'Root'}, {'id': 'a2', 'name': 'a2.txt', 'parent': 'Sub'},
+                                                     {'id': 'a3', 'name': 'a3.txt', 'parent': 'Root'}]},
+        {'size': 20, 'md5Checksum': 'bbb', 'files': [{'id': 'b1', 'name': 'b1.txt', 'parent': 'Root'}, {'id': 'b2', 'name': 'b2.txt', 'parent': 'Sub'}]},
+    ]
+    assert result['reclaimable_bytes'] == 2 * 10 + 20
+    # Spilled once past max_in_memory files, the rest goes straight to disk
+    assert spilled == ([] if max_in_memory > len(DUPLICATES) else [max_in_memory + 1])
+    assert duplicates_drive.requests == []
+
+
+def test_find_duplicates_in_a_folder_tree(make_drive):
+    files = {'Root': [file('a1', 'Root', 10, md5Checksum='aaa'), folder('Sub', 'Root')], 'Sub': [file('a2', 'Sub', 10, md5Checksum='aaa')]}
+    drive, fake = make_drive(lambda method, uri, body, headers: (200, {'files': files[query_params(uri)['q'].split("'")[1]]}))
+
+    result = drive.Analytics.find_duplicates(folder_id='Root', max_in_memory=0)
+    assert [[f['id'] for f in group['files']] for group in result['groups']] == [['a1', 'a2']]
+
+
+@pytest.mark.parametrize('action, expected', [
+    ('trash', [('PATCH', 'a2', {'trashed': True}), ('PATCH', 'a3', {'trashed': True}), ('PATCH', 'b2', {'trashed': True})]),
+    ('shortcut', [('PATCH', 'a2', {'trashed': True}), ('PATCH', 'a3', {'trashed': True}), ('PATCH', 'b2', {'trashed': True}),
+                  ('POST', 'files', {'name': 'a2.txt', 'mimeType': 'application/vnd.google-apps.shortcut', 'shortcutDetails': {'targetId': 'a1'}, 'parents': ['Sub']}),
+                  ('POST', 'files', {'name': 'a3.txt', 'mimeType': 'application/vnd.google-apps.shortcut', 'shortcutDetails': {'targetId': 'a1'}, 'parents': ['Root']}),
+                  ('POST', 'files', {'name': 'b2.txt', 'mimeType': 'application/vnd.google-apps.shortcut', 'shortcutDetails': {'targetId': 'b1'}, 'parents': ['Sub']})]),
+])
+def test_find_duplicates_keeps_the_first_file(duplicates_drive, action, expected):
+    duplicates_drive.Analytics.find_duplicates(query="name contains 'report'", action=action)
+    assert sorted(duplicates_drive.requests, key=lambda request: (request[0] != 'PATCH', json.dumps(request, sort_keys=True))) == expected
+
+
+@pytest.mark.parametrize('kwargs', [{}, {'folder_id': 'Root', 'query': "name contains 'report'"}, {'folder_id': 'Root', 'action': 'delete'}])
+def test_find_duplicates_rejects_bad_arguments(duplicates_drive, kwargs):
+    with pytest.raises(ValueError):
+        duplicates_drive.Analytics.find_duplicates(**kwargs)
@@ -0,0 +1,68 @@
+import io
+import os
+import tarfile
+import tempfile
+import zipfile
+from types import SimpleNamespace
+
+import pytest
+
+from simple_drive.drive.files import Files, _ArchiveStream
+
+
+@pytest.fixture
+def files():
+    return Files(SimpleNamespace(print_if_verbose=lambda *args, **kwargs: None))
+
+
+def spool(data):
+    f = tempfile.SpooledTemporaryFile(max_size=1024)
+    f.write(data)
+    return f
+
+
+def results(contents):
+    for index, (name, data) in enumerate(contents):
+        file = {'id': f'file{index}', 'name': name, 'modifiedTime': '2024-06-01T00:00:00.000Z'}
+        yield ('', file), (name, spool(data)), None
+
+
+@pytest.mark.parametrize('format', ['zip', 'tar', 'tar.gz'])
+def test_archive_round_trip(files, format):
+    contents = [('a.txt', b'hello'), ('dir/b.bin', os.urandom(3000)), ('a.txt', b'same name')]
+    stream = _ArchiveStream(files._write_archive(format, results(contents)))
+    data = b''.join(stream)
+
+    assert stream.names == ['a (1).txt', 'a.txt', 'dir/b.bin']
+    if format == 'zip':
+        with zipfile.ZipFile(io.BytesIO(data)) as archive:
+            assert archive.read('a.txt') == b'hello'
+            assert archive.read('a (1).txt') == b'same name'
+            assert archive.read('dir/b.bin') == contents[1][1]
+    else:
+        with tarfile.open(fileobj=io.BytesIO(data)) as archive:
+            assert archive.extractfile('a.txt').read() == b'hello'
+            assert archive.extractfile('a (1).txt').read() == b'same name'
+            assert archive.extractfile('dir/b.bin').read() == contents[1][1]
+
+
+@pytest.mark.parametrize('format', ['zip', 'tar', 'tar.gz'])
+def test_archive_memory_is_bounded_per_chunk(files, format):
+    size = 8 * files.STREAM_CHUNK_SIZE
+    stream = _ArchiveStream(files._write_archive(format, results([('big.bin', os.urandom(size))])))
+    largest = max(len(chunk) for chunk in stream)
+    # Incompressible data, so compressed chunks are about as large as the input chunks
+    assert largest <= 2 * files.STREAM_CHUNK_SIZE
+
+
+def test_archive_skips_errors(files, capsys):
+    def failing():
+        yield ('', {'id': 'bad', 'name': 'x'}), None, IOError('boom')
+        yield from results([('ok.txt', b'ok')])
+
+    stream = _ArchiveStream(files._write_archive('tar', failing()))
+    data = b''.join(stream)
+    assert stream.names == ['ok.txt']
+    assert 'boom' in capsys.readouterr().out
+    with tarfile.open(fileobj=io.BytesIO(data)) as archive:
+        assert archive.getnames() == ['ok.txt']
@@ -0,0 +1,161 @@
+import asyncio
+import contextlib
+import io
+import json
+import os
+
+import pytest
+
+from simple_drive import LocalBackend, MemoryBackend, S3Backend
+from simple_drive.backends import AsyncStreamReader, AsyncStreamWriter
+
+MB = 1024 * 1024
+
+
+class FakeS3Client:
+    '''
+    A boto3 S3 client stand-in with the calls used by S3Backend, like a local MinIO.
+    '''
+    def __init__(self):
+        self.objects = {}
+        self.uploads = {}
+        self.aborted = []
+        self.calls = []
+
+    def put_object(self, Bucket, Key, Body):
+        self.calls.append('put_object')
+        self.objects[Bucket, Key] = bytes(Body)
+
+    def get_object(self, Bucket, Key):
+        return {'Body': io.BytesIO(self.objects[Bucket, Key])}
+
+    def create_multipart_upload(self, Bucket, Key):
+        self.calls.append('create_multipart_upload')
+        upload_id = f'upload-{len(self.uploads) + 1}'
+        self.uploads[upload_id] = {}
+        return {'UploadId': upload_id}
+
+    def upload_part(self, Bucket, Key, UploadId, PartNumber, Body):
+        self.calls.append('upload_part')
+        self.uploads[UploadId][PartNumber] = bytes(Body)
+        return {'ETag': f'"etag-{PartNumber}"'}
+
+    def complete_multipart_upload(self, Bucket, Key, UploadId, MultipartUpload):
+        self.calls.append('complete_multipart_upload')
+        parts = self.uploads.pop(UploadId)
+        assert [part['PartNumber'] for part in MultipartUpload['Parts']] == sorted(parts)
+        self.objects[Bucket, Key] = b''.join(parts[number] for number in sorted(parts))
+
+    def abort_multipart_upload(self, Bucket, Key, UploadId):
+        self.calls.append('abort_multipart_upload')
+        self.uploads.pop(UploadId)
+        self.aborted.append(Key)
+
+
+@pytest.fixture
+def s3():
+    return S3Backend(bucket='bucket', prefix='backup/', client=FakeS3Client(), part_size=5 * MB)
+
+
+def test_small_object_is_one_put(s3):
+    with s3.open_write('a.txt') as f:
+        f.write(b'hello')
+    assert s3.client.calls == ['put_object']
+    assert s3.open_read('a.txt').read() == b'hello'
+
+
+def test_multipart_upload_spans_several_parts(s3):
+    data = os.urandom(12 * MB)
+    with s3.open_write('big.bin') as f:
+        for i in range(0, len(data), MB):
+            f.write(data[i:i + MB])
+
+    assert s3.client.calls == ['create_multipart_upload', 'upload_part', 'upload_part', 'upload_part', 'complete_multipart_upload']
+    assert s3.client.objects['bucket', 'backup/big.bin'] == data
+
+
+def test_multipart_upload_is_aborted_on_exception(s3):
+    with pytest.raises(RuntimeError):
+        with s3.open_write('big.bin') as f:
+            f.write(os.urandom(6 * MB))
+            raise RuntimeError('transfer failed')
+
+    assert s3.client.calls == ['create_multipart_upload', 'upload_part', 'abort_multipart_upload']
+    assert s3.client.aborted == ['backup/big.bin']
+    assert ('bucket', 'backup/big.bin') not in s3.client.objects
+
+
+def test_part_size_below_the_s3_minimum_raises():
+    with pytest.raises(ValueError):
+        S3Backend(bucket='bucket', client=FakeS3Client(), part_size=MB)
+
+
+@pytest.fixture
+def drive(make_drive):
+    '''
+    A Drive with one file, AbcFileId, and a resumable upload endpoint that stores what it receives in drive.uploaded.
+    '''
+    uploaded = {}
+
+    def handler(method, uri, body, headers):
+        if method == 'POST' and uri.startswith('https://www.googleapis.com/upload/drive/v3/files'):
+            uploaded['metadata'] = json.loads(body)
+            return 200, b'', {'location': 'https://www.googleapis.com/upload/session'}
+        if method == 'PUT' and uri == 'https://www.googleapis.com/upload/session':
+            uploaded['content'] = uploaded.get('content', b'') + body
+            if headers['Content-Range'].endswith('/*'):
+                return 308, b''
+            return 200, {'id': 'NewFileId', 'name': uploaded['metadata']['name'], 'parents': uploaded['metadata'].get('parents')}
+        return 200, {'id': 'AbcFileId', 'name': 'report.csv'}
+
+    drive, fake = make_drive(handler)
+    content = b'a,b\n1,2\n' * 1000
+
+    @contextlib.contextmanager
+    def open_stream(url, headers=None):
+        assert url == 'https://www.googleapis.com/drive/v3/files/AbcFileId?alt=media&supportsAllDrives=true'
+        yield io.BytesIO(content)
+
+    drive.http.open_stream = open_stream
+    drive.content = content
+    drive.uploaded = uploaded
+    return drive
+
+
+@pytest.mark.parametrize('backend', ['s3', 'memory', 'local'])
+def test_drive_to_backend_to_drive(drive, s3, tmp_path, backend):
+    dest = {'s3': s3, 'memory': MemoryBackend(), 'local': LocalBackend(root=str(tmp_path))}[backend]
+
+    assert drive.Files.download(file_id='AbcFileId', dest=dest, dest_directory='exports') == 'exports/report.csv'
+    with contextlib.closing(dest.open_read('exports/report.csv')) as f:
+        assert f.read() == drive.content
+
+    new_file = drive.Files.upload(file='exports/report.csv', source=dest, dest_folder_id='FolderId')
+    assert new_file == {'id': 'NewFileId', 'name': 'report.csv', 'parents': ['FolderId']}
+    assert drive.uploaded['content'] == drive.content
+
+
+def test_async_streams(drive):
+    async def scenario():
+        loop = asyncio.get_running_loop()
+        received = bytearray()
+
+        class Stream:
+            def write(self, data):
+                received.extend(data)
+
+            async def drain(self):
+                await asyncio.sleep(0)
+
+        await loop.run_in_executor(None, lambda: drive.Files.download(file_id='AbcFileId', dest=AsyncStreamWriter(Stream(), loop)))
+
+        reader = asyncio.StreamReader()
+        reader.feed_data(b'uploaded from a socket')
+        reader.feed_eof()
+        new_file = await loop.run_in_executor(None, lambda: drive.Files.upload(file=AsyncStreamReader(reader, loop, name='socket.txt')))
+        return bytes(received), new_file
+
+    received, new_file = asyncio.run(scenario())
+    assert received == drive.content
+    assert new_file['name'] == 'socket.txt'
+    assert drive.uploaded['content'] == b'uploaded from a socket'
@@ -0,0 +1,114 @@
+import json
+import time
+
+import httplib2
+import pytest
+
+from simple_drive.utils import call_batched
+
+THROTTLED = {'error': {'code': 429, 'message': 'Rate limit exceeded', 'errors': [{'reason': 'rateLimitExceeded'}]}}
+
+
+def test_throttled_requests_are_sent_again_in_later_rounds(make_drive, monkeypatch):
+    throttles = {'busy': 2}
+
+    def handler(method, uri, body, headers):
+        if body['content'] in throttles and throttles[body['content']]:
+            throttles[body['content']] -= 1
+            return 429, THROTTLED
+        if body['content'] == 'bad':
+            return 400, {'error': {'code': 400, 'message': 'Invalid content'}}
+        return 200, {'id': f"comment-{body['content']}", 'content': body['content']}
+
+    drive, fake = make_drive(handler)
+    waits = []
+    monkeypatch.setattr(time, 'sleep', waits.append)
+    contents = [f'c{i}' for i in range(5)] + ['busy', 'bad']
+    requests = [lambda content=content: drive.service.comments().create(fileId='AbcFileId', body={'content': content}, fields='id, content')
+                for content in contents]
+
+    outcomes = call_batched(drive.service, requests, batch_size=3, max_workers=1, retries=3, backoff_seconds=1)
+
+    assert [result['id'] if result else None for result, error in outcomes] == [f'comment-c{i}' for i in range(5)] + ['comment-busy', None]
+    assert outcomes[-1][1].resp.status == 400
+    # 7 requests in batches of 3, then the throttled one alone in two retry rounds, the 400 is not retried
+    assert fake.batches == [3, 3, 1, 1, 1]
+    assert waits == [1, 2]
+
+
+def test_lasting_throttles_are_returned_as_errors(make_drive, monkeypatch):
+    drive, fake = make_drive(lambda method, uri, body, headers: (429, THROTTLED))
+    monkeypatch.setattr(time, 'sleep', lambda seconds: None)
+    requests = [lambda: drive.service.comments().create(fileId='AbcFileId', body={'content': 'x'}, fields='id')]
+
+    (result, error), = call_batched(drive.service, requests, retries=2)
+    assert result is None and error.resp.status == 429
+    assert fake.batches == [1, 1, 1]
+
+
+@pytest.mark.parametrize('batch_size, expected', [(0, [1, 1]), (500, [2])])
+def test_batch_size_is_clamped(make_drive, batch_size, expected):
+    drive, fake = make_drive(lambda method, uri, body, headers: (200, {'id': 'x'}))
+    requests = [lambda: drive.service.comments().create(fileId='AbcFileId', body={'content': 'x'}, fields='id')] * 2
+    call_batched(drive.service, requests, batch_size=batch_size, max_workers=1)
+    assert fake.batches == expected
+
+
+def failing_first_batch_call(fake, status):
+    '''
+    Make the first batch HTTP call fail as a whole. A server error comes after the server ran the requests, a throttle before.
+    '''
+    request = fake.request
+    failed = []
+
+    def flaky(uri, method='GET', body=None, headers=None, *args, **kwargs):
+        if '/batch/' in uri and not failed:
+            failed.append(uri)
+            if status >= 500:
+                request(uri, method, body, headers, *args, **kwargs)
+            content = THROTTLED if status == 429 else {'error': {'code': status, 'message': 'Backend Error'}}
+            return httplib2.Response({'status': status, 'content-type': 'application/json'}), json.dumps(content).encode()
+        return request(uri, method, body, headers, *args, **kwargs)
+
+    fake.request = flaky
+
+
+def test_batch_calls_that_failed_as_a_whole_are_sent_again(make_drive, monkeypatch):
+    created = []
+    drive, fake = make_drive(lambda method, uri, body, headers: (created.append(body['content']) or 200, {'id': body['content']}))
+    failing_first_batch_call(fake, 503)
+    monkeypatch.setattr(time, 'sleep', lambda seconds: None)
+
+    requests = [lambda: drive.service.comments().create(fileId='AbcFileId', body={'content': 'x'}, fields='id')]
+    assert call_batched(drive.service, requests) == [({'id': 'x'}, None)]
+    assert created == ['x', 'x']
+
+
+def test_comments_of_a_failed_batch_call_are_not_created_twice(make_drive, monkeypatch):
+    created = []
+    drive, fake = make_drive(lambda method, uri, body, headers: (created.append(body['content']) or 200, {'id': f"comment-{body['content']}"}))
+    failing_first_batch_call(fake, 503)
+    monkeypatch.setattr(time, 'sleep', lambda seconds: None)
+
+    results = drive.Comments.create_many([('AbcFileId', 'a'), ('AbcFileId', 'b')], batch_size=1, max_workers=1)
+    assert results == [None, {'id': 'comment-b'}]
+    assert created == ['a', 'b']
+
+
+def test_creates_are_retried_after_per_request_errors_and_throttled_batch_calls(make_drive, monkeypatch):
+    answers = {'a': [(503, {'error': {'code': 503, 'message': 'Backend Error'}})]}
+    created = []
+
+    def handler(method, uri, body, headers):
+        if answers.get(body['content']):
+            return answers[body['content']].pop()
+        created.append(body['content'])
+        return 200, {'id': f"reply-{body['content']}"}
+
+    drive, fake = make_drive(handler, throttle_retries=0)
+    failing_first_batch_call(fake, 429)
+    monkeypatch.setattr(time, 'sleep', lambda seconds: None)
+
+    results = drive.Replies.create_many([('AbcFileId', 'CommentId', 'a'), ('AbcFileId', 'CommentId', 'b')], batch_size=1, max_workers=1)
+    assert results == [{'id': 'reply-a'}, {'id': 'reply-b'}]
+    assert sorted(created) == ['a', 'b']
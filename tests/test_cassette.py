@@ -0,0 +1,58 @@
+import io
+
+import pytest
+from googleapiclient.errors import HttpError
+
+from simple_drive import Cassette, Drive, MemoryBackend
+
+
+def test_about_is_fetched_once(replay):
+    drive = replay('about.json')
+    assert drive.About.get_email_address() == 'me@corp.com'
+    # Only one response is recorded, a second request would raise
+    assert drive.About.get_email_address() == 'me@corp.com'
+
+
+def test_verified_download_fetches_a_corrupted_body_again(replay):
+    drive = replay('download.json')
+    backend = MemoryBackend()
+    assert drive.Files.download(file_id='AbcFileId', dest=backend, verify=True) == 'hello.txt'
+    assert backend.get('hello.txt') == b'hello'
+
+
+def test_download_errors_can_be_raised(replay):
+    drive = replay('download.json')
+    with pytest.raises(HttpError) as error:
+        drive.Files.download(file_id='GoneFileId', dest=io.BytesIO(), raise_errors=True)
+    assert error.value.resp.status == 404
+
+
+def test_throttles_are_replayed(replay):
+    drive = replay('throttled.json', backoff_seconds=0)
+    assert drive.Files.get(file_id='AbcFileId', fields='id') == {'id': 'AbcFileId'}
+    assert drive.limiter.metrics()['GET files']['throttles'] == 1
+
+
+def test_request_that_was_not_recorded_raises(replay):
+    drive = replay('about.json')
+    with pytest.raises(ValueError):
+        drive.Files.get(file_id='AbcFileId', fields='id')
+
+
+def test_record_then_replay(make_drive, tmp_path):
+    path = str(tmp_path / 'cassette.json')
+    drive, fake = make_drive(lambda method, uri, body, headers: (200, {'id': 'AbcFileId', 'name': 'a.txt'}))
+    with Cassette(path, mode='record') as cassette:
+        recording = cassette.wrap(fake)
+        drive.http.get_http = lambda: recording
+        assert drive.Files.get(file_id='AbcFileId', fields='id, name') == {'id': 'AbcFileId', 'name': 'a.txt'}
+
+    drive = Drive(verbose=False, cassette=Cassette(path, mode='replay', time_scale=0))
+    assert drive.Files.get(file_id='AbcFileId', fields='id, name') == {'id': 'AbcFileId', 'name': 'a.txt'}
+
+
+def test_drive_without_auth_needs_a_replay_cassette(tmp_path):
+    with pytest.raises(ValueError):
+        Drive(verbose=False)
+    with pytest.raises(ValueError):
+        Drive(verbose=False, cassette=Cassette(str(tmp_path / 'new.json'), mode='record'))
@@ -0,0 +1,72 @@
+import asyncio
+import json
+
+import pytest
+
+from simple_drive.drive.channels import WebhookReceiver, send_notification
+
+
+@pytest.fixture(autouse=True)
+def no_proxy(monkeypatch):
+    monkeypatch.setenv('no_proxy', '*')
+
+
+def test_notifications_reach_the_callback_with_parsed_headers():
+    notifications = []
+    with WebhookReceiver(host='127.0.0.1', port=0, token='secret', callback=notifications.append) as receiver:
+        assert send_notification(receiver.url, channel_id='ChannelId', resource_state='sync', token='secret', message_number=1) == 200
+        assert send_notification(receiver.url, channel_id='ChannelId', resource_id='ResourceId', token='secret', message_number=2,
+                                 changed='content,properties') == 200
+
+    assert [(n['channel_id'], n['resource_state'], n['message_number']) for n in notifications] == [('ChannelId', 'sync', '1'), ('ChannelId', 'change', '2')]
+    assert notifications[1]['resource_id'] == 'ResourceId'
+    assert notifications[1]['changed'] == 'content,properties'
+    assert notifications[1]['token'] == 'secret'
+    assert notifications[1]['expiration'].endswith('GMT')
+    assert receiver.queue.qsize() == 2
+
+
+def test_wrong_or_missing_token_is_rejected():
+    notifications = []
+    with WebhookReceiver(host='127.0.0.1', port=0, token='secret', callback=notifications.append) as receiver:
+        assert send_notification(receiver.url, channel_id='ChannelId', token='guess') == 403
+        assert send_notification(receiver.url, channel_id='ChannelId') == 403
+    assert notifications == []
+    assert receiver.queue.empty()
+
+
+def test_without_token_every_notification_is_accepted():
+    with WebhookReceiver(host='127.0.0.1', port=0) as receiver:
+        assert send_notification(receiver.url, channel_id='ChannelId', token='anything') == 200
+        assert receiver.queue.get(timeout=1)['channel_id'] == 'ChannelId'
+
+
+def test_notifications_go_to_an_async_queue():
+    async def scenario():
+        notifications = asyncio.Queue()
+        with WebhookReceiver(host='127.0.0.1', port=0, async_queue=notifications, loop=asyncio.get_running_loop()) as receiver:
+            status = await asyncio.to_thread(send_notification, receiver.url, 'ChannelId', resource_state='update')
+            notification = await asyncio.wait_for(notifications.get(), timeout=1)
+        return status, notification
+
+    status, notification = asyncio.run(scenario())
+    assert status == 200
+    assert notification['resource_state'] == 'update'
+
+
+def test_renew_replaces_the_channel_and_stops_the_old_one(make_drive):
+    def handler(method, uri, body, headers):
+        if uri.split('?')[0].endswith('/watch'):
+            channel = json.loads(body)
+            return 200, {'id': channel['id'], 'resourceId': 'ResourceId', 'address': channel['address'], 'token': channel.get('token')}
+        return 204, b''
+
+    drive, fake = make_drive(handler)
+    old = drive.Channels.watch_file(file_id='AbcFileId', address='https://example.com/hook', token='secret')
+    new = drive.Channels.renew(channel_id=old['id'])
+
+    assert new['id'] != old['id'] and new['token'] == 'secret'
+    assert list(drive.Channels.channels) == [new['id']]
+    method, uri, body = fake.calls[-1]
+    assert uri.startswith('https://www.googleapis.com/drive/v3/channels/stop')
+    assert json.loads(body) == {'id': old['id'], 'resourceId': 'ResourceId'}
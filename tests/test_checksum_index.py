@@ -0,0 +1,32 @@
+import threading
+import time
+
+from .fakes import query_params
+
+
+def test_folder_is_listed_once_by_concurrent_threads(make_drive):
+    def handler(method, uri, body, headers):
+        time.sleep(0.2)
+        return 200, {'files': [{'id': 'AbcFileId', 'name': 'a.txt', 'md5Checksum': 'abc', 'size': '1'}]}
+
+    drive, fake = make_drive(handler, single_flight=False)
+    indexes = []
+    threads = [threading.Thread(target=lambda: indexes.append(drive.Files.checksum_index('FolderId'))) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(fake.calls) == 1
+    assert query_params(fake.calls[0][1])['q'] == "'FolderId' in parents and trashed=false"
+    assert all(index == {'AbcFileId': {'id': 'AbcFileId', 'name': 'a.txt', 'md5Checksum': 'abc', 'size': '1'}} for index in indexes)
+
+
+def test_index_is_a_snapshot(make_drive):
+    drive, fake = make_drive(lambda method, uri, body, headers: (200, {'files': []}))
+    index = drive.Files.checksum_index('FolderId')
+    drive.Files._add_to_checksum_index('FolderId', {'id': 'NewFileId', 'name': 'b.txt', 'md5Checksum': 'def', 'size': '2'})
+
+    assert index == {}
+    assert list(drive.Files.checksum_index('FolderId')) == ['NewFileId']
+    assert len(fake.calls) == 1
@@ -0,0 +1,93 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import stat
+import time
+from datetime import datetime
+
+import httplib2
+import pytest
+from googleapiclient.errors import HttpError
+
+from simple_drive import cli
+
+
+def test_get_retries_server_errors_and_prints_only_json(make_drive, tmp_path, monkeypatch, capsys):
+    drive, fake = make_drive(lambda method, uri, body, headers: (200, {'id': 'AbcFileId', 'name': 'a.txt', 'mimeType': 'text/plain'}))
+    attempts = []
+
+    @contextlib.contextmanager
+    def open_stream(url, headers=None):
+        attempts.append(url)
+        if len(attempts) == 1:
+            raise HttpError(httplib2.Response({'status': 503}), b'{"error": {"code": 503, "message": "Backend Error"}}', uri=url)
+        yield io.BytesIO(b'hello')
+
+    drive.http.open_stream = open_stream
+    monkeypatch.setattr(time, 'sleep', lambda seconds: None)
+    args = argparse.Namespace(file_ids=['AbcFileId'], output=str(tmp_path), verify=False, jobs=1, retries=1)
+
+    assert cli.command_get(drive, args) == 0
+    assert len(attempts) == 2
+    assert (tmp_path / 'a.txt').read_bytes() == b'hello'
+    out = capsys.readouterr().out
+    assert [json.loads(line) for line in out.splitlines()] == [{'id': 'AbcFileId', 'name': 'a.txt', 'path': str(tmp_path / 'a.txt')}]
+
+
+def test_get_reports_lasting_errors_on_stderr(make_drive, tmp_path, monkeypatch, capsys):
+    drive, fake = make_drive(lambda method, uri, body, headers: (200, {'id': 'AbcFileId', 'name': 'a.txt', 'mimeType': 'text/plain'}))
+
+    def open_stream(url, headers=None):
+        raise HttpError(httplib2.Response({'status': 404}), b'{"error": {"code": 404, "message": "File not found"}}', uri=url)
+
+    drive.http.open_stream = open_stream
+    monkeypatch.setattr(time, 'sleep', lambda seconds: pytest.fail('a 404 was retried'))
+    args = argparse.Namespace(file_ids=['AbcFileId'], output=str(tmp_path), verify=False, jobs=1, retries=3)
+
+    assert cli.command_get(drive, args) == 1
+    captured = capsys.readouterr()
+    assert captured.out == ''
+    assert json.loads(captured.err)['item'] == 'AbcFileId'
+
+
+def test_library_messages_go_to_stderr(service_account, tmp_path, monkeypatch, capsys):
+    path = tmp_path / 'service_account.json'
+    path.write_text(json.dumps(service_account()))
+    monkeypatch.setenv('SIMPLE_DRIVE_CONFIG_DIR', str(tmp_path / 'config'))
+
+    def command_ls(drive, args):
+        print('An error occurred: boom')
+        cli.emit({'id': 'AbcFileId'})
+        return 0
+
+    monkeypatch.setattr(cli, 'command_ls', command_ls)
+    assert cli.main(['--service-account', str(path), 'ls', 'AbcFileId']) == 0
+    captured = capsys.readouterr()
+    assert captured.out == '{"id": "AbcFileId"}\n'
+    assert 'boom' in captured.err
+
+
+@pytest.mark.parametrize('existing', [False, True])
+def test_tokens_are_private_from_the_start(tmp_path, monkeypatch, existing):
+    monkeypatch.setenv('SIMPLE_DRIVE_CONFIG_DIR', str(tmp_path))
+    path = tmp_path / 'tokens.json'
+    if existing:
+        path.write_text('{}')
+        path.chmod(0o644)
+    modes = []
+    real_fdopen = os.fdopen
+
+    def fdopen(fd, *args, **kwargs):
+        # The mode when the token is about to be written
+        modes.append(stat.S_IMODE(os.fstat(fd).st_mode))
+        return real_fdopen(fd, *args, **kwargs)
+
+    monkeypatch.setattr(os, 'fdopen', fdopen)
+    credentials = argparse.Namespace(access_token='token', token_expiry=datetime(2030, 1, 1))
+    cli.save_token(credentials, 'key')
+
+    assert modes == [0o600]
+    assert stat.S_IMODE(path.stat().st_mode) == 0o600
+    assert json.loads(path.read_text()) == {'key': {'access_token': 'token', 'token_expiry': '2030-01-01T00:00:00'}}
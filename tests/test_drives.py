@@ -0,0 +1,98 @@
+from urllib.parse import urlparse
+
+import pytest
+
+from simple_drive import Roles
+
+from .fakes import query_params
+
+
+def drives_handler(pages):
+    # Shared drives in pages, then files per corpus: '' for My Drive, otherwise the driveId
+    def handler(method, uri, body, headers):
+        params = query_params(uri)
+        path = urlparse(uri).path
+        if path == '/drive/v3/drives':
+            return 200, pages[params.get('pageToken', '')]
+        if path == '/drive/v3/files':
+            drive_id = params.get('driveId', '')
+            return 200, {'files': [{'id': f'Shared{drive_id}', 'name': drive_id}, {'id': 'SameFileId', 'name': 'shortcut target'}] if drive_id else
+                         [{'id': 'MyFileId', 'name': 'mine'}, {'id': 'SameFileId', 'name': 'shortcut target'}]}
+        raise AssertionError(f'Unexpected request {method} {uri}')
+    return handler
+
+
+PAGES = {
+    '': {'drives': [{'id': 'Drive1', 'name': 'Team 1'}], 'nextPageToken': 'page2'},
+    'page2': {'drives': [{'id': 'Drive2', 'name': 'Team 2'}]},
+}
+
+
+def test_drives_list_follows_pages(make_drive):
+    drive, fake = make_drive(drives_handler(PAGES))
+    assert drive.Drives.list(query="name contains 'Team'", use_domain_admin_access=True) == [{'id': 'Drive1', 'name': 'Team 1'}, {'id': 'Drive2', 'name': 'Team 2'}]
+    params = [query_params(uri) for _, uri, _ in fake.calls]
+    assert [p.get('pageToken') for p in params] == [None, 'page2']
+    assert all(p['q'] == "name contains 'Team'" and p['useDomainAdminAccess'] == 'true' for p in params)
+
+
+def test_drives_create_rename_delete(make_drive):
+    drive, fake = make_drive(lambda method, uri, body, headers: (204, b'') if method == 'DELETE' else (200, {'id': 'Drive1', 'name': 'Team'}))
+
+    drive.Drives.create(name='Team')
+    drive.Drives.create(name='Team')
+    drive.Drives.rename(drive_id='Drive1', name='Team 2')
+    drive.Drives.delete(drive_id='Drive1')
+
+    (create_method, create_uri, create_body), (_, second_uri, _), (rename_method, rename_uri, rename_body), (delete_method, delete_uri, _) = fake.calls
+    assert (create_method, urlparse(create_uri).path) == ('POST', '/drive/v3/drives')
+    assert create_body == '{"name": "Team"}'
+    # A new requestId each time, Drive treats a repeated one as the same create
+    assert query_params(create_uri)['requestId'] != query_params(second_uri)['requestId']
+    assert (rename_method, urlparse(rename_uri).path, rename_body) == ('PATCH', '/drive/v3/drives/Drive1', '{"name": "Team 2"}')
+    assert (delete_method, urlparse(delete_uri).path) == ('DELETE', '/drive/v3/drives/Drive1')
+
+
+@pytest.mark.parametrize('kwargs, expected', [
+    ({}, {}),
+    ({'corpora': 'user'}, {'corpora': 'user', 'includeItemsFromAllDrives': 'false', 'supportsAllDrives': 'true'}),
+    ({'corpora': 'allDrives'}, {'corpora': 'allDrives', 'includeItemsFromAllDrives': 'true', 'supportsAllDrives': 'true'}),
+    ({'drive_id': 'Drive1'}, {'corpora': 'drive', 'driveId': 'Drive1', 'includeItemsFromAllDrives': 'true', 'supportsAllDrives': 'true'}),
+])
+def test_list_corpora_params(make_drive, kwargs, expected):
+    drive, fake = make_drive(lambda method, uri, body, headers: (200, {'files': [{'id': 'AbcFileId', 'name': 'a.txt'}]}))
+    assert drive.Files.list(**kwargs) == [{'id': 'AbcFileId', 'name': 'a.txt'}]
+    params = query_params(fake.calls[0][1])
+    assert {key: params[key] for key in ('corpora', 'driveId', 'includeItemsFromAllDrives', 'supportsAllDrives') if key in params} == expected
+
+
+def test_search_all_drives_lists_each_drive_and_merges_by_id(make_drive):
+    drive, fake = make_drive(drives_handler(PAGES))
+
+    files = drive.Files.search_all_drives("name contains 'a'", fields='name')
+    assert sorted(file['id'] for file in files) == ['MyFileId', 'SameFileId', 'SharedDrive1', 'SharedDrive2']
+
+    file_calls = [query_params(uri) for _, uri, _ in fake.calls if urlparse(uri).path == '/drive/v3/files']
+    assert sorted(params.get('driveId', '') for params in file_calls) == ['', 'Drive1', 'Drive2']
+    for params in file_calls:
+        assert params['q'] == "name contains 'a'"
+        # The id field is added to merge the drives
+        assert params['fields'] == 'nextPageToken, files(name,id)'
+        assert params.get('corpora') == ('drive' if 'driveId' in params else None)
+
+
+def test_search_all_drives_without_my_drive(make_drive):
+    drive, fake = make_drive(drives_handler(PAGES))
+
+    files = drive.Files.search_all_drives(include_my_drive=False)
+    assert sorted(file['id'] for file in files) == ['SameFileId', 'SharedDrive1', 'SharedDrive2']
+    assert all('driveId' in query_params(uri) for _, uri, _ in fake.calls if urlparse(uri).path == '/drive/v3/files')
+
+
+def test_file_calls_support_shared_drives(make_drive):
+    drive, fake = make_drive(lambda method, uri, body, headers: (200, {'id': 'AbcFileId', 'name': 'a.txt', 'parents': ['OldFolderId']}))
+
+    drive.Files.move(file_id='AbcFileId', dest_folder_id='NewFolderId')
+    drive.Permissions.add(file_id='AbcFileId', role=Roles.VIEWER, email='someone@corp.com')
+    assert len(fake.calls) == 3
+    assert all(query_params(uri)['supportsAllDrives'] == 'true' for _, uri, _ in fake.calls)
@@ -0,0 +1,101 @@
+import contextlib
+import io
+import os
+from types import SimpleNamespace
+
+import pytest
+
+from simple_drive.drive.files import Files
+
+from .fakes import query_params
+
+
+@pytest.fixture
+def opened():
+    return []
+
+
+@pytest.fixture
+def files(opened):
+    @contextlib.contextmanager
+    def open_stream(url, headers=None):
+        opened.append(url)
+        yield io.BytesIO('name,size\r\na.txt,1\r\n"b, c.txt",22\r\n'.encode())
+
+    return Files(SimpleNamespace(print_if_verbose=lambda *args, **kwargs: None, http=SimpleNamespace(open_stream=open_stream)))
+
+
+@pytest.mark.parametrize('gid, url', [
+    (None, 'https://docs.google.com/spreadsheets/d/SheetId/export?format=csv'),
+    (123, 'https://docs.google.com/spreadsheets/d/SheetId/export?format=csv&gid=123'),
+])
+def test_export_rows_uses_the_sheets_export_link(files, opened, gid, url):
+    rows = list(files.export_rows(file_id='SheetId', gid=gid))
+    # files.export caps exports at 10 MB, the Sheets export link does not
+    assert opened == [url]
+    assert rows == [['name', 'size'], ['a.txt', '1'], ['b, c.txt', '22']]
+
+
+def test_export_folder_keeps_files_with_the_same_name(make_drive, tmp_path):
+    docs = 'application/vnd.google-apps.document'
+    docx = 'application/vnd.openxmlformats-officedocument.wordprocessingml.document'
+
+    def doc(file_id):
+        return {'id': file_id, 'name': 'Report', 'mimeType': docs, 'exportLinks': {docx: f'https://docs.google.com/export/{file_id}?exportFormat=docx'}}
+
+    children = {
+        'RootId': [doc('Doc1'), doc('Doc2'), {'id': 'SubId', 'name': 'Sub', 'mimeType': 'application/vnd.google-apps.folder'}],
+        'SubId': [doc('Doc3')],
+    }
+    drive, fake = make_drive(lambda method, uri, body, headers: (200, {'files': children[query_params(uri)['q'].split("'")[1]]}))
+
+    @contextlib.contextmanager
+    def open_stream(url, headers=None):
+        yield io.BytesIO(url.split('/')[-1].split('?')[0].encode())
+
+    drive.http.open_stream = open_stream
+    paths = drive.Files.export_folder(folder_id='RootId', dest_directory=str(tmp_path))
+
+    assert sorted(os.path.relpath(path, tmp_path) for path in paths) == ['Report (1).docx', 'Report.docx', os.path.join('Sub', 'Report.docx')]
+    assert sorted((tmp_path / name).read_bytes() for name in ('Report.docx', 'Report (1).docx')) == [b'Doc1', b'Doc2']
+    assert (tmp_path / 'Sub' / 'Report.docx').read_bytes() == b'Doc3'
+
+
+def sheet_files(csv_text):
+    @contextlib.contextmanager
+    def open_stream(url, headers=None):
+        yield io.BytesIO(csv_text.encode())
+
+    return Files(SimpleNamespace(print_if_verbose=lambda *args, **kwargs: None, http=SimpleNamespace(open_stream=open_stream)))
+
+
+def test_record_batches_share_the_schema_of_the_first_batch():
+    pa = pytest.importorskip('pyarrow')
+    files = sheet_files('a,b,c\r\n1,2,x\r\n3,,y\r\n4,5,6\r\n')
+    batches = list(files.export_record_batches(file_id='SheetId', batch_size=2))
+
+    assert [batch.num_rows for batch in batches] == [2, 1]
+    assert all(batch.schema == batches[0].schema for batch in batches)
+    assert batches[0].schema == pa.schema([('a', pa.int64()), ('b', pa.int64()), ('c', pa.string())])
+    assert pa.Table.from_batches(batches).to_pydict() == {'a': [1, 3, 4], 'b': [2, None, 5], 'c': ['x', 'y', '6']}
+
+
+def test_record_batches_raise_when_a_later_value_does_not_fit():
+    pytest.importorskip('pyarrow')
+    files = sheet_files('a,b\r\n1,2\r\n3,4\r\n5,6.5\r\n')
+    batches = files.export_record_batches(file_id='SheetId', batch_size=2)
+    next(batches)
+    with pytest.raises(ValueError):
+        next(batches)
+
+
+def test_record_batches_with_a_schema():
+    pa = pytest.importorskip('pyarrow')
+    schema = pa.schema([('a', pa.int64()), ('b', pa.float64())])
+    files = sheet_files('a,b\r\n1,2\r\n3,4\r\n5,6.5\r\n')
+    batches = list(files.export_record_batches(file_id='SheetId', batch_size=2, schema=schema))
+
+    assert all(batch.schema == schema for batch in batches)
+    assert pa.Table.from_batches(batches).column('b').to_pylist() == [2.0, 4.0, 6.5]
+    with pytest.raises(ValueError):
+        list(files.export_record_batches(file_id='SheetId', schema=pa.schema([('a', pa.int64())])))
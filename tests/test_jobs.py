@@ -0,0 +1,75 @@
+import os
+import sqlite3
+import subprocess
+import sys
+import textwrap
+import time
+from types import SimpleNamespace
+
+import simple_drive
+from simple_drive import Auth, BulkJob, DrivePool
+
+from .fakes import FakeHttp
+
+
+def recording_drive(calls):
+    return SimpleNamespace(verbose=False, Files=SimpleNamespace(move=lambda file_id, dest_folder_id: calls.append(file_id) or {'id': file_id}))
+
+
+def test_killed_job_does_not_rerun_finished_operations(tmp_path):
+    journal = str(tmp_path / 'job.sqlite')
+    operations = [('Files.move', {'file_id': f'file-{index}', 'dest_folder_id': 'NewFolderId'}) for index in range(10)]
+    # Operation 4 kills the process once the first four are journaled, progress is not printed before the kill
+    script = textwrap.dedent(f'''
+        import os, sqlite3, time
+        from types import SimpleNamespace
+        from simple_drive import BulkJob
+
+        def move(file_id, dest_folder_id):
+            if file_id == 'file-4':
+                deadline = time.time() + 5
+                while time.time() < deadline:
+                    if sqlite3.connect({journal!r}).execute("SELECT COUNT(*) FROM operations WHERE status = 'done'").fetchone()[0] == 4:
+                        break
+                    time.sleep(0.01)
+                os._exit(1)
+            return {{'id': file_id}}
+
+        drive = SimpleNamespace(verbose=False, Files=SimpleNamespace(move=move))
+        BulkJob(drive, journal={journal!r}).run({operations!r}, max_workers=1, progress_seconds=3600)
+    ''')
+    process = subprocess.run([sys.executable, '-c', script], cwd=str(tmp_path), env={'PYTHONPATH': os.path.dirname(os.path.dirname(simple_drive.__file__))}, capture_output=True)
+    assert process.returncode == 1, process.stderr.decode()
+
+    finished = {row[0] for row in sqlite3.connect(journal).execute("SELECT json_extract(kwargs, '$.file_id') FROM operations WHERE status = 'done'")}
+    assert finished == {'file-0', 'file-1', 'file-2', 'file-3'}
+
+    calls = []
+    job = BulkJob(recording_drive(calls), journal=journal)
+    assert job.run(operations) == {'pending': 0, 'done': 10, 'failed': 0}
+    assert sorted(calls) == [f'file-{index}' for index in range(4, 10)]
+    job.close()
+
+
+def test_repeated_operations_run_once(tmp_path):
+    calls = []
+    job = BulkJob(recording_drive(calls), journal=str(tmp_path / 'job.sqlite'))
+    operation = ('Files.move', {'file_id': 'AbcFileId', 'dest_folder_id': 'NewFolderId'})
+
+    assert job.run([operation, operation, operation]) == {'pending': 0, 'done': 1, 'failed': 0}
+    assert calls == ['AbcFileId']
+    job.close()
+
+
+def test_pool_operations_retry_server_errors(service_account, tmp_path, monkeypatch):
+    pool = DrivePool([Auth.from_service_account_info(service_account())], verbose=False)
+    responses = iter([(503, {'error': {'code': 503, 'message': 'Backend Error'}}), (200, {'id': 'AbcFileId'})])
+    fake = FakeHttp(lambda method, uri, body, headers: next(responses))
+    for drive in pool.drives.values():
+        drive.http.get_http = lambda: fake
+    monkeypatch.setattr(time, 'sleep', lambda seconds: None)
+
+    job = BulkJob(pool, journal=str(tmp_path / 'job.sqlite'), backoff_seconds=0)
+    assert job.run([('Files.get', {'file_id': 'AbcFileId', 'fields': 'id'})]) == {'pending': 0, 'done': 1, 'failed': 0}
+    assert len(fake.calls) == 2
+    job.close()
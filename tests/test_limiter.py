@@ -0,0 +1,92 @@
+import threading
+import time
+
+import httplib2
+import pytest
+from googleapiclient.errors import HttpError
+
+from simple_drive.limiter import AdaptiveLimiter, operation_name
+
+
+@pytest.mark.parametrize('method, uri, expected', [
+    ('GET', 'https://www.googleapis.com/drive/v3/files?q=x', 'GET files'),
+    ('GET', 'https://www.googleapis.com/drive/v3/files/AbcFileId?alt=media', 'GET files'),
+    ('POST', 'https://www.googleapis.com/drive/v3/files/AbcFileId/permissions/123', 'POST files.permissions'),
+    ('PUT', 'https://www.googleapis.com/upload/drive/v3/files/AbcFileId?uploadType=resumable', 'PUT upload.files'),
+    ('POST', 'https://www.googleapis.com/batch/drive/v3', 'POST batch'),
+    ('GET', 'https://docs.google.com/spreadsheets/d/SheetId/export?format=csv&gid=0', 'GET spreadsheets.export'),
+    ('GET', 'https://docs.google.com/spreadsheets/d/OtherSheetId/export?format=csv', 'GET spreadsheets.export'),
+])
+def test_operation_name(method, uri, expected):
+    assert operation_name(method, uri) == expected
+
+
+def test_throttles_cut_the_limit_once_per_round_trip():
+    limiter = AdaptiveLimiter(initial_limit=8, decrease=0.5)
+    started = [limiter.acquire('GET files') for _ in range(3)]
+    time.sleep(0.01)
+    # Three calls in flight throttled together count as one signal
+    for start in started:
+        limiter.release('GET files', start, throttled=True)
+
+    metrics = limiter.metrics()['GET files']
+    assert metrics['limit'] == 4
+    assert metrics['throttles'] == 3
+    assert metrics['in_flight'] == 0
+
+
+def test_limit_never_goes_below_min_limit():
+    limiter = AdaptiveLimiter(initial_limit=2, min_limit=1)
+    for _ in range(5):
+        limiter.release('GET files', limiter.acquire('GET files') - 1, error=True)
+    assert limiter.metrics()['GET files']['limit'] == 1
+    assert limiter.metrics()['GET files']['errors'] == 5
+
+
+def test_limit_grows_while_saturated():
+    limiter = AdaptiveLimiter(initial_limit=2, max_limit=3)
+    for _ in range(50):
+        limit = limiter.metrics().get('GET files', {'limit': 2})['limit']
+        started = [limiter.acquire('GET files') for _ in range(limit)]
+        for start in started:
+            limiter.release('GET files', start)
+    assert limiter.metrics()['GET files']['limit'] == 3
+
+
+def test_acquire_waits_for_a_free_slot():
+    limiter = AdaptiveLimiter(initial_limit=1)
+    started = limiter.acquire('GET files')
+    acquired = threading.Event()
+
+    def worker():
+        limiter.release('GET files', limiter.acquire('GET files'))
+        acquired.set()
+
+    thread = threading.Thread(target=worker)
+    thread.start()
+    assert not acquired.wait(0.1)
+    assert limiter.metrics()['GET files']['waiting'] == 1
+    limiter.release('GET files', started)
+    assert acquired.wait(1)
+    thread.join()
+
+
+def test_slot_classifies_exceptions():
+    limiter = AdaptiveLimiter()
+    throttled = HttpError(httplib2.Response({'status': 429}), b'{"error": {"code": 429, "errors": [{"reason": "rateLimitExceeded"}]}}')
+    for error in (throttled, HttpError(httplib2.Response({'status': 503}), b'{}'), ValueError('not an API error')):
+        with pytest.raises(type(error)):
+            with limiter.slot('export'):
+                raise error
+    with limiter.slot('export'):
+        pass
+
+    with pytest.raises(HttpError):
+        with limiter.slot('export'):
+            raise HttpError(httplib2.Response({'status': 404}), b'{}')
+    with limiter.slot('export') as outcome:
+        outcome['throttled'] = True
+
+    metrics = limiter.metrics()['export']
+    # A 404 says nothing about the load, an exception that is not an API error is counted like a failed connection
+    assert (metrics['throttles'], metrics['errors'], metrics['successes']) == (2, 2, 2)
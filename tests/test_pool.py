@@ -0,0 +1,54 @@
+import time
+
+import pytest
+
+from simple_drive import Auth, DrivePool
+
+from .fakes import FakeHttp
+
+
+def test_every_service_account_is_delegated_to_every_subject(service_account):
+    auths = [Auth.from_service_account_info(service_account(email)) for email in ('sa1@p.iam.gserviceaccount.com', 'sa2@p.iam.gserviceaccount.com')]
+    pool = DrivePool(auths, subjects=['u1@corp.com', 'u2@corp.com'], verbose=False)
+
+    assert sorted(pool.accounts) == ['sa1@p.iam.gserviceaccount.com/u1@corp.com', 'sa1@p.iam.gserviceaccount.com/u2@corp.com',
+                                     'sa2@p.iam.gserviceaccount.com/u1@corp.com', 'sa2@p.iam.gserviceaccount.com/u2@corp.com']
+
+
+def test_impersonated_email_picks_one_of_its_accounts(service_account):
+    auths = [Auth.from_service_account_info(service_account(email)) for email in ('sa1@p.iam.gserviceaccount.com', 'sa2@p.iam.gserviceaccount.com')]
+    pool = DrivePool(auths, subjects=['u1@corp.com', 'u2@corp.com'], verbose=False)
+
+    drive = pool.get(account='u2@corp.com')
+    name = next(name for name, account_drive in pool.drives.items() if account_drive is drive)
+    assert pool.subjects[name] == 'u2@corp.com'
+    with pytest.raises(ValueError):
+        pool.get(account='nobody@corp.com')
+
+
+def test_service_accounts_without_subjects(service_account):
+    auths = [Auth.from_service_account_info(service_account(email)) for email in ('sa1@p.iam.gserviceaccount.com', 'sa2@p.iam.gserviceaccount.com')]
+    pool = DrivePool(auths, verbose=False)
+    assert pool.accounts == ['sa1@p.iam.gserviceaccount.com', 'sa2@p.iam.gserviceaccount.com']
+
+
+def test_duplicate_accounts_raise(service_account):
+    auths = [Auth.from_service_account_info(service_account()) for _ in range(2)]
+    with pytest.raises(ValueError):
+        DrivePool(auths, verbose=False)
+
+
+def test_throttles_move_to_another_account_without_waiting(service_account, monkeypatch):
+    auths = [Auth.from_service_account_info(service_account(email)) for email in ('sa1@p.iam.gserviceaccount.com', 'sa2@p.iam.gserviceaccount.com')]
+    pool = DrivePool(auths, verbose=False)
+    throttled = {'error': {'code': 429, 'message': 'Rate limit', 'errors': [{'reason': 'rateLimitExceeded'}]}}
+    fakes = {}
+    for name, drive in pool.drives.items():
+        fakes[name] = FakeHttp(lambda method, uri, body, headers, name=name: (429, throttled) if name.startswith('sa1') else (200, {'id': 'AbcFileId'}))
+        drive.http.get_http = lambda fake=fakes[name]: fake
+    monkeypatch.setattr(time, 'sleep', lambda seconds: pytest.fail('a throttled request waited'))
+
+    for _ in range(3):
+        assert pool.run(lambda drive: drive.Files.get(file_id='AbcFileId', fields='id')) == {'id': 'AbcFileId'}
+    assert len(fakes['sa1@p.iam.gserviceaccount.com'].calls) == 1
+    assert pool.stats['sa1@p.iam.gserviceaccount.com']['throttles'] == 1
@@ -0,0 +1,83 @@
+import pytest
+
+from simple_drive.constants import Query, SearchTerms
+
+
+def parent_ids(count):
+    return [f'folder{i}' for i in range(count)]
+
+
+def test_compile_nested():
+    query = Query.all_of(SearchTerms.name_contains('a'),
+                         Query.any_of(SearchTerms.name_equal('x'), SearchTerms.name_equal('y')),
+                         ~Query.any_of(SearchTerms.trashed_equal(True)))
+    assert query.compile() == "name contains 'a' and (name = 'x' or name = 'y') and (not (trashed=true))"
+
+
+def test_compile_flattens_same_operator():
+    query = Query.any_of(SearchTerms.name_equal('x')) | Query.any_of(SearchTerms.name_equal('y'), SearchTerms.name_equal('z'))
+    assert query.compile() == "name = 'x' or name = 'y' or name = 'z'"
+
+
+def test_compile_escapes_quotes():
+    assert Query.all_of(SearchTerms.name_equal("it's")).compile() == "name = 'it\\'s'"
+
+
+def test_split_short_query_is_unchanged():
+    query = Query.any_in(SearchTerms.parent_id, parent_ids(3))
+    assert query.split() == [query.compile()]
+
+
+def test_split_flat_or():
+    queries = Query.any_in(SearchTerms.parent_id, parent_ids(60)).split(max_terms=20)
+    assert all(query.count(' in parents') <= 20 for query in queries)
+    assert sorted(query for queries_part in queries for query in queries_part.split(' or ')) == \
+           sorted(SearchTerms.parent_id(folder_id) for folder_id in parent_ids(60))
+
+
+def test_split_nested_or_two_levels_deep():
+    inner = Query.any_in(SearchTerms.parent_id, parent_ids(60))
+    query = Query.all_of(SearchTerms.name_contains('a'),
+                         Query.any_of(SearchTerms.name_equal('x'), SearchTerms.name_equal('y'),
+                                      Query.all_of(SearchTerms.trashed_equal(False), inner)))
+    queries = query.split(max_terms=20)
+
+    assert all(q.count(' in parents') <= 20 for q in queries)
+    assert all(q.startswith("name contains 'a' and ") for q in queries)
+    # Every branch of the or-expressions ends up in exactly one query
+    found = [folder_id for folder_id in parent_ids(60) for q in queries if f"'{folder_id}' in parents" in q]
+    assert sorted(found) == sorted(parent_ids(60))
+    assert sum("name = 'x'" in q for q in queries) == 1
+    assert sum("name = 'y'" in q for q in queries) == 1
+    assert all("trashed=false" in q for q in queries if ' in parents' in q)
+
+
+def test_split_picks_the_largest_or_expression():
+    small = Query.any_of(SearchTerms.name_equal('x'), SearchTerms.name_equal('y'))
+    large = Query.any_in(SearchTerms.parent_id, parent_ids(30))
+    queries = Query.all_of(small, Query.all_of(SearchTerms.trashed_equal(False), large)).split(max_terms=20)
+    # Only the large or-expression needs cutting, the small one stays whole in every query
+    assert len(queries) == 2
+    assert all("(name = 'x' or name = 'y')" in q for q in queries)
+
+
+def test_largest_or_path_is_relative_to_the_node():
+    inner = Query.any_in(SearchTerms.parent_id, parent_ids(60))
+    branch = Query.any_of(SearchTerms.name_equal('x'), Query.all_of(SearchTerms.trashed_equal(False), inner))
+    query = Query.all_of(SearchTerms.name_contains('a'), branch)
+    # The or-expression of 61 terms wins over its 60-term child, at any depth of the tree
+    assert query._largest_or_path() == (1,)
+    assert branch._largest_or_path() == ()
+    assert branch.children[1]._largest_or_path() == (1,)
+
+
+def test_split_by_length():
+    queries = Query.any_in(SearchTerms.parent_id, parent_ids(100)).split(max_length=500)
+    assert len(queries) > 1
+    assert all(len(q) <= 500 for q in queries)
+
+
+def test_split_without_or_raises():
+    query = Query.all_of(*[SearchTerms.name_contains(str(i)) for i in range(10)])
+    with pytest.raises(ValueError):
+        query.split(max_terms=5)
@@ -0,0 +1,80 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+import simple_drive
+
+from simple_drive.drive.records import FileTable
+
+FILES = [
+    {'id': 'AbcFileId', 'name': 'a.txt', 'mimeType': 'text/plain', 'size': '5', 'parents': ['FolderId'],
+     'owners': [{'emailAddress': 'me@corp.com'}], 'md5Checksum': 'abc', 'modifiedTime': '2024-06-01T10:00:00.000Z', 'createdTime': '2024-05-01T10:00:00.000Z'},
+    {'id': 'DefFolderId', 'name': 'folder', 'mimeType': 'application/vnd.google-apps.folder', 'parents': ['FolderId'],
+     'modifiedTime': '2024-06-02T10:00:00.000Z'},
+]
+
+
+@pytest.fixture
+def table():
+    table = FileTable()
+    table.extend(FILES)
+    return table
+
+
+def test_records(table):
+    assert len(table) == 2
+    assert table[0].to_dict() == {'id': 'AbcFileId', 'name': 'a.txt', 'mimeType': 'text/plain', 'size': 5, 'parent': 'FolderId', 'owner': 'me@corp.com',
+                                  'md5Checksum': 'abc', 'modifiedTime': '2024-06-01T10:00:00.000Z', 'createdTime': '2024-05-01T10:00:00.000Z'}
+    assert table[1].size is None and table[1].owner is None and table[1].createdTime is None
+    assert [record.id for record in table] == ['AbcFileId', 'DefFolderId']
+
+
+def test_interned_strings(table):
+    assert table.columns['parent'][0] is table.columns['parent'][1]
+
+
+def test_extend_with_a_table(table):
+    other = FileTable()
+    other.extend(table)
+    other.extend(table)
+    assert [record.id for record in other] == ['AbcFileId', 'DefFolderId'] * 2
+
+
+def test_to_pandas(table):
+    pd = pytest.importorskip('pandas')
+    df = table.to_pandas()
+    assert df['size'].tolist() == [5, pd.NA]
+    assert isinstance(df['mimeType'].dtype, pd.CategoricalDtype)
+    assert df['createdTime'].isna().tolist() == [False, True]
+    assert df['modifiedTime'][0] == pd.Timestamp('2024-06-01T10:00:00Z')
+
+
+def test_to_arrow(table):
+    pa = pytest.importorskip('pyarrow')
+    arrow_table = table.to_arrow()
+    assert arrow_table.column('size').to_pylist() == [5, None]
+    assert pa.types.is_dictionary(arrow_table.schema.field('owner').type)
+    assert arrow_table.schema.field('modifiedTime').type == pa.timestamp('ms', tz='UTC')
+
+
+@pytest.mark.parametrize('method', ['to_pandas', 'to_arrow'])
+def test_table_can_grow_after_export(table, method):
+    pytest.importorskip('pandas' if method == 'to_pandas' else 'pyarrow')
+    exported = getattr(table, method)()
+    table.append({'id': 'GhiFileId', 'name': 'b.txt', 'size': '7'})
+    assert len(table) == 3
+    assert len(exported) == 2
+
+
+def test_to_arrow_without_numpy():
+    pytest.importorskip('pyarrow')
+    # numpy is not a dependency, block it in a fresh interpreter
+    script = ("import sys; sys.modules['numpy'] = None\n"
+              "from simple_drive.drive.records import FileTable\n"
+              "table = FileTable()\n"
+              "table.extend([{'id': 'AbcFileId', 'size': '5'}, {'id': 'DefFolderId'}])\n"
+              "print(table.to_arrow().column('size').to_pylist())")
+    process = subprocess.run([sys.executable, '-c', script], env={'PYTHONPATH': os.path.dirname(os.path.dirname(simple_drive.__file__))}, capture_output=True)
+    assert process.stdout.decode().strip() == '[5, None]', process.stderr.decode()
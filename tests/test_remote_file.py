@@ -0,0 +1,29 @@
+import io
+
+import pytest
+
+
+def test_blocks_are_fetched_by_range_and_cached(replay):
+    drive = replay('remote_file.json')
+    with drive.Files.open(file_id='AbcFileId', block_size=4, read_ahead=2) as file:
+        assert (file.name, file.size) == ('digits.txt', 10)
+        assert file.read(3) == b'012'
+        # A sequential read fetches the next two blocks in one request
+        assert file.read(3) == b'345'
+        assert file.seek(-2, io.SEEK_END) == 8
+        assert file.read() == b'89'
+        file.seek(0)
+        assert file.read() == b'0123456789'
+        assert file.stats['requests'] == 2
+        assert file.stats['bytes_fetched'] == 10
+        assert file.read() == b''
+
+
+def test_seek_errors(replay):
+    drive = replay('remote_file.json')
+    file = drive.Files.open(file_id='AbcFileId', block_size=4)
+    with pytest.raises(ValueError):
+        file.seek(-1)
+    file.close()
+    with pytest.raises(ValueError):
+        file.read(1)
@@ -0,0 +1,215 @@
+import json
+import os
+import re
+from urllib.parse import urlparse
+
+import pytest
+
+from .fakes import query_params
+
+
+@pytest.fixture
+def upload_drive(make_drive):
+    '''
+    A Drive whose upload endpoint updates AbcFileId, simple or resumable, and keeps what it receives in drive.uploaded.
+    '''
+    uploaded = {'content': b'', 'body': b'', 'params': None}
+
+    def handler(method, uri, body, headers):
+        if uri.startswith('https://www.googleapis.com/upload/drive/v3/files/AbcFileId'):
+            assert method == 'PATCH'
+            uploaded['params'] = query_params(uri)
+            if uploaded['params']['uploadType'] == 'resumable':
+                return 200, b'', {'location': 'https://www.googleapis.com/upload/session'}
+            uploaded['body'] = body
+            return 200, {'id': 'AbcFileId', 'name': 'report.csv', 'headRevisionId': 'Rev2'}
+        if method == 'PUT' and uri == 'https://www.googleapis.com/upload/session':
+            uploaded['content'] += body if isinstance(body, bytes) else body.read()
+            start, end, total = map(int, re.match(r'bytes (\d+)-(\d+)/(\d+)', headers['Content-Range']).groups())
+            if end + 1 < total:
+                return 308, b'', {'range': f'bytes=0-{end}'}
+            return 200, {'id': 'AbcFileId', 'name': 'report.csv', 'headRevisionId': 'Rev2'}
+        if uri.startswith('https://www.googleapis.com/drive/v3/files?'):
+            return 200, {'files': [{'id': 'AbcFileId', 'name': 'report.csv', 'md5Checksum': 'old', 'size': '3'}]}
+        raise AssertionError(f'Unexpected request {method} {uri}')
+
+    drive, fake = make_drive(handler)
+    drive.uploaded = uploaded
+    return drive
+
+
+def test_update_content_keeps_the_file_id(upload_drive, tmp_path):
+    path = tmp_path / 'report.csv'
+    path.write_bytes(b'a,b\n1,2\n')
+
+    file = upload_drive.Files.update_content(file_id='AbcFileId', file=str(path), keep_revision_forever=True)
+    assert file['id'] == 'AbcFileId' and file['headRevisionId'] == 'Rev2'
+    assert upload_drive.uploaded['params']['uploadType'] == 'media'
+    assert upload_drive.uploaded['params']['keepRevisionForever'] == 'true'
+    assert upload_drive.uploaded['body'] == b'a,b\n1,2\n'
+
+
+def test_update_content_resumable(upload_drive, tmp_path):
+    path = tmp_path / 'report.csv'
+    content = bytes(range(256)) * 4096  # 1 MB, 4 chunks of 256 KB
+    path.write_bytes(content)
+
+    file = upload_drive.Files.update_content(file_id='AbcFileId', file=str(path), resumable_threshold=1024, chunk_size=256 * 1024)
+    assert file['id'] == 'AbcFileId'
+    assert upload_drive.uploaded['params']['uploadType'] == 'resumable'
+    assert upload_drive.uploaded['params']['keepRevisionForever'] == 'false'
+    assert upload_drive.uploaded['content'] == content
+
+
+def test_upload_with_revision_dedupe_updates_the_file_with_the_same_name(upload_drive, tmp_path):
+    path = tmp_path / 'report.csv'
+    path.write_bytes(b'new')
+
+    file = upload_drive.Files.upload(file=str(path), dest_folder_id='FolderId', dedupe='revision')
+    assert file['id'] == 'AbcFileId'
+    assert upload_drive.uploaded['body'] == b'new'
+    assert upload_drive.Files.checksum_index('FolderId')['AbcFileId']['md5Checksum'] == '22af645d1859cb5ca6da0c484f1f37ea'
+
+
+REVISIONS = {
+    'AbcFileId': [
+        {'id': 'Rev1', 'modifiedTime': '2024-01-01T00:00:00.000Z'},
+        {'id': 'Rev2', 'modifiedTime': '2024-02-01T00:00:00.000Z', 'keepForever': True},
+        {'id': 'Rev3', 'modifiedTime': '2024-03-01T00:00:00.000Z'},
+        {'id': 'Rev5', 'modifiedTime': '2024-05-01T00:00:00.000Z'},
+        {'id': 'Rev4', 'modifiedTime': '2024-04-01T00:00:00.000Z'},
+    ],
+    'DefFileId': [
+        {'id': 'Rev1', 'modifiedTime': '2024-01-01T00:00:00.000Z'},
+    ],
+}
+
+
+@pytest.fixture
+def revisions_drive(make_drive):
+    deleted = []
+
+    def handler(method, uri, body, headers):
+        path = urlparse(uri).path.split('/')
+        file_id = path[4]
+        if method == 'GET' and path[5:] == ['revisions']:
+            return 200, {'revisions': REVISIONS[file_id]}
+        if method == 'DELETE' and path[5] == 'revisions':
+            deleted.append((file_id, path[6]))
+            return 204, b''
+        raise AssertionError(f'Unexpected request {method} {uri}')
+
+    drive, fake = make_drive(handler)
+    drive.deleted = deleted
+    return drive
+
+
+@pytest.mark.parametrize('kwargs, expected', [
+    ({'keep_last': 2}, [('AbcFileId', 'Rev1'), ('AbcFileId', 'Rev3')]),
+    ({'keep_last': 2, 'keep_forever': False}, [('AbcFileId', 'Rev1'), ('AbcFileId', 'Rev2'), ('AbcFileId', 'Rev3')]),
+    ({'keep_last': 1, 'older_than': '2024-03-01T00:00:00Z'}, [('AbcFileId', 'Rev1')]),
+    # The head revision is kept even with keep_last=0
+    ({'keep_last': 0, 'keep_forever': False}, [('AbcFileId', 'Rev1'), ('AbcFileId', 'Rev2'), ('AbcFileId', 'Rev3'), ('AbcFileId', 'Rev4')]),
+])
+def test_prune(revisions_drive, kwargs, expected):
+    deleted = revisions_drive.Revisions.prune(file_ids=['AbcFileId', 'DefFileId'], **kwargs)
+    assert sorted(deleted) == expected
+    assert sorted(revisions_drive.deleted) == expected
+
+
+def test_prune_reports_failed_deletes(make_drive, capsys):
+    def handler(method, uri, body, headers):
+        if method == 'GET':
+            return 200, {'revisions': REVISIONS['AbcFileId']}
+        if uri.split('?')[0].endswith('/Rev1'):
+            return 403, {'error': {'code': 403, 'message': 'The revision cannot be deleted'}}
+        return 204, b''
+
+    drive, fake = make_drive(handler)
+    assert sorted(drive.Revisions.prune(file_ids='AbcFileId', keep_last=1, keep_forever=False)) == [('AbcFileId', 'Rev2'), ('AbcFileId', 'Rev3'), ('AbcFileId', 'Rev4')]
+    assert 'The revision cannot be deleted' in capsys.readouterr().out
+
+
+@pytest.fixture
+def history_drive(make_drive):
+    '''
+    A Drive with a binary file whose name has a slash, and a Sheet exported per revision. drive.fetched lists the content requests.
+    '''
+    xlsx = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+    files = {
+        'AbcFileId': {'id': 'AbcFileId', 'name': 'notes/2024.txt', 'mimeType': 'text/plain'},
+        'SheetId': {'id': 'SheetId', 'name': 'Budget', 'mimeType': 'application/vnd.google-apps.spreadsheet'},
+    }
+    revisions = {
+        'AbcFileId': [{'id': 'Rev1', 'md5Checksum': 'm1', 'modifiedTime': '2024-01-01T00:00:00.000Z'},
+                      {'id': 'Rev2', 'md5Checksum': 'm2', 'modifiedTime': '2024-02-01T00:00:00.000Z'}],
+        'SheetId': [{'id': '1', 'modifiedTime': '2024-01-01T00:00:00.000Z',
+                     'exportLinks': {xlsx: 'https://docs.google.com/spreadsheets/export?id=SheetId&revision=1&exportFormat=xlsx'}}],
+    }
+    fetched = []
+
+    def handler(method, uri, body, headers):
+        if uri.startswith('https://docs.google.com/'):
+            fetched.append(uri)
+            return 200, b'xlsx of ' + query_params(uri)['revision'].encode()
+        path = urlparse(uri).path.split('/')
+        if path[5:] == ['revisions']:
+            return 200, {'revisions': revisions[path[4]]}
+        if path[5:6] == ['revisions']:
+            fetched.append(uri)
+            if path[6] == 'Broken':
+                return 403, {'error': {'code': 403, 'message': 'Revision not downloadable'}}
+            return 200, f'{path[4]} {path[6]}'.encode()
+        return 200, files[path[4]]
+
+    drive, fake = make_drive(handler)
+    drive.revisions = revisions
+    drive.fetched = fetched
+    return drive
+
+
+def read_manifest(directory):
+    return [json.loads(line) for line in (directory / 'manifest.jsonl').read_text().splitlines()]
+
+
+def test_download_history(history_drive, tmp_path):
+    downloaded = history_drive.Revisions.download_history(file_ids=['AbcFileId', 'SheetId'], dest_directory=str(tmp_path))
+
+    assert sorted(entry['path'] for entry in downloaded) == [os.path.join('AbcFileId', 'Rev1_notes_2024.txt'), os.path.join('AbcFileId', 'Rev2_notes_2024.txt'),
+                                                             os.path.join('SheetId', '1_Budget.xlsx')]
+    assert (tmp_path / 'AbcFileId' / 'Rev2_notes_2024.txt').read_bytes() == b'AbcFileId Rev2'
+    assert (tmp_path / 'SheetId' / '1_Budget.xlsx').read_bytes() == b'xlsx of 1'
+    assert sorted(downloaded, key=lambda entry: entry['path']) == sorted(read_manifest(tmp_path), key=lambda entry: entry['path'])
+    assert {entry['revision_id']: entry['md5Checksum'] for entry in downloaded} == {'Rev1': 'm1', 'Rev2': 'm2', '1': None}
+
+
+def test_download_history_skips_revisions_in_the_manifest(history_drive, tmp_path):
+    history_drive.Revisions.download_history(file_ids=['AbcFileId', 'SheetId'], dest_directory=str(tmp_path))
+    history_drive.fetched.clear()
+
+    assert history_drive.Revisions.download_history(file_ids=['AbcFileId', 'SheetId'], dest_directory=str(tmp_path)) == []
+    assert history_drive.fetched == []
+
+    # A new revision, a deleted local file and a changed checksum are downloaded again
+    history_drive.revisions['AbcFileId'].append({'id': 'Rev3', 'md5Checksum': 'm3', 'modifiedTime': '2024-03-01T00:00:00.000Z'})
+    history_drive.revisions['AbcFileId'][0]['md5Checksum'] = 'changed'
+    (tmp_path / 'SheetId' / '1_Budget.xlsx').unlink()
+    downloaded = history_drive.Revisions.download_history(file_ids='AbcFileId', dest_directory=str(tmp_path))
+    downloaded += history_drive.Revisions.download_history(file_ids='SheetId', dest_directory=str(tmp_path))
+    assert sorted(entry['revision_id'] for entry in downloaded) == ['1', 'Rev1', 'Rev3']
+    assert len(read_manifest(tmp_path)) == 6
+
+
+def test_download_history_reports_failed_revisions(history_drive, tmp_path, capsys):
+    history_drive.revisions['AbcFileId'].append({'id': 'Broken', 'md5Checksum': 'm4', 'modifiedTime': '2024-04-01T00:00:00.000Z'})
+
+    downloaded = history_drive.Revisions.download_history(file_ids='AbcFileId', dest_directory=str(tmp_path))
+    assert sorted(entry['revision_id'] for entry in downloaded) == ['Rev1', 'Rev2']
+    assert 'Broken' not in {entry['revision_id'] for entry in read_manifest(tmp_path)}
+    assert 'Revision not downloadable' in capsys.readouterr().out
+
+
+def test_download_sanitizes_the_file_name(history_drive, tmp_path):
+    path = history_drive.Revisions.download(file_id='AbcFileId', revision_id='Rev1', dest_directory=str(tmp_path))
+    assert path == os.path.join(str(tmp_path), 'Rev1_notes_2024.txt')
+    assert (tmp_path / 'Rev1_notes_2024.txt').read_bytes() == b'AbcFileId Rev1'
@@ -0,0 +1,92 @@
+import threading
+import time
+
+import pytest
+from googleapiclient.errors import HttpError
+
+from simple_drive.utils import iter_concurrently
+
+
+def blocking_handler(release, response):
+    # Answers once release is set, so concurrent requests overlap
+    def handler(method, uri, body, headers):
+        assert release.wait(timeout=5)
+        return response
+    return handler
+
+
+def run_concurrently(drive, release, func, count, expected_saved):
+    results = []
+    thread = threading.Thread(target=lambda: results.extend(iter_concurrently(lambda _: func(), range(count), max_workers=count)))
+    thread.start()
+    deadline = time.time() + 5
+    while drive.http.saved_calls < expected_saved and time.time() < deadline:
+        time.sleep(0.01)
+    release.set()
+    thread.join(timeout=5)
+    return [(result, error) for _, result, error in results]
+
+
+def test_concurrent_identical_gets_share_one_call(make_drive):
+    release = threading.Event()
+    drive, fake = make_drive(blocking_handler(release, (200, {'id': 'AbcFileId', 'name': 'a.txt'})))
+
+    results = run_concurrently(drive, release, lambda: drive.Files.get(file_id='AbcFileId', fields='id, name'), 8, expected_saved=7)
+    assert results == [({'id': 'AbcFileId', 'name': 'a.txt'}, None)] * 8
+    assert len(fake.calls) == 1
+    assert drive.http.saved_calls == 7
+
+
+def test_errors_are_shared_then_the_next_get_is_sent_again(make_drive):
+    release = threading.Event()
+    drive, fake = make_drive(blocking_handler(release, (404, {'error': {'code': 404, 'message': 'File not found'}})))
+
+    results = run_concurrently(drive, release, lambda: drive.Files.get(file_id='GoneFileId', fields='id'), 4, expected_saved=3)
+    assert len(fake.calls) == 1
+    assert all(result is None and isinstance(error, HttpError) and error.resp.status == 404 for result, error in results)
+
+    # A finished call is not a cache
+    with pytest.raises(HttpError):
+        drive.Files.get(file_id='GoneFileId', fields='id')
+    assert len(fake.calls) == 2
+
+
+def test_different_gets_and_writes_are_not_shared(make_drive):
+    # Each of the 4 requests must reach the handler for any of them to be answered
+    barrier = threading.Barrier(4, timeout=5)
+
+    def handler(method, uri, body, headers):
+        barrier.wait()
+        return 200, {'id': 'AbcFileId'}
+
+    drive, fake = make_drive(handler)
+    calls = [lambda: drive.Files.get(file_id='AbcFileId', fields='id'), lambda: drive.Files.get(file_id='AbcFileId', fields='id, name'),
+             lambda: drive.Files.rename(file_id='AbcFileId', name='b.txt'), lambda: drive.Files.rename(file_id='AbcFileId', name='b.txt')]
+    results = list(iter_concurrently(lambda call: call(), calls, max_workers=4))
+
+    assert [error for _, _, error in results] == [None] * 4
+    assert len(fake.calls) == 4
+    assert drive.http.saved_calls == 0
+
+
+def test_single_flight_can_be_turned_off(make_drive):
+    release = threading.Event()
+    drive, fake = make_drive(blocking_handler(release, (200, {'id': 'AbcFileId'})), single_flight=False)
+
+    results = run_concurrently(drive, release, lambda: drive.Files.get(file_id='AbcFileId', fields='id'), 4, expected_saved=0)
+    assert results == [({'id': 'AbcFileId'}, None)] * 4
+    assert len(fake.calls) == 4
+    assert drive.http.saved_calls == 0
+
+
+def test_permissions_reuse_the_cached_email_address(make_drive):
+    def handler(method, uri, body, headers):
+        if '/about' in uri:
+            return 200, {'user': {'emailAddress': 'me@corp.com'}}
+        return 200, {'id': 'PermissionId', 'pendingOwner': True}
+
+    drive, fake = make_drive(handler)
+    assert drive.About.get_email_address() == 'me@corp.com'
+    drive.Permissions.transfer_ownership(file_id='AbcFileId', email='you@corp.com')
+    drive.Permissions.transfer_ownership(file_id='DefFileId', email='you@corp.com')
+    assert sum('/about' in uri for _, uri, _ in fake.calls) == 1
@@ -0,0 +1,24 @@
+import json
+import re
+
+import pytest
+
+from .fakes import query_params
+
+
+@pytest.mark.parametrize('content', [b'hello', b''])
+def test_upload_returns_v3_file_info(make_drive, tmp_path, content):
+    def handler(method, uri, body, headers):
+        assert (method, uri.split('?')[0]) == ('POST', 'https://www.googleapis.com/upload/drive/v3/files')
+        assert query_params(uri)['supportsAllDrives'] == 'true'
+        # A multipart upload, the metadata part first
+        metadata = json.loads(re.search(rb'^\{.*\}$', body, re.MULTILINE).group())
+        return 200, {'id': 'NewFileId', 'name': metadata['name'], 'mimeType': 'text/plain', 'size': str(len(content)), 'parents': metadata['parents']}
+
+    drive, fake = make_drive(handler)
+    path = tmp_path / 'a.txt'
+    path.write_bytes(content)
+
+    file = drive.Files.upload(file=str(path), dest_folder_id='FolderId', rename='b.txt')
+    assert file == {'id': 'NewFileId', 'name': 'b.txt', 'mimeType': 'text/plain', 'size': str(len(content)), 'parents': ['FolderId']}
+    assert len(fake.calls) == 1